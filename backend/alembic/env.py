@@ -0,0 +1,60 @@
+"""Alembic environment: migrates the database configured in app settings"""
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from app.config import settings
+import app.models  # noqa: F401  (registers every model on the metadata)
+from app.models.base import Base
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """
+    On PostgreSQL vehicles is partitioned (0004): its partitions are not
+    models, and its unique vehicle_id index also carries created_at.
+    """
+    if context.get_context().dialect.name != "postgresql":
+        return True
+    if type_ == "table" and reflected and compare_to is None and name.startswith("vehicles_"):
+        return False
+    return not (type_ == "index" and name == "ix_vehicles_vehicle_id")
+
+
+def database_url() -> str:
+    """``-x url=...`` on the command line wins over DATABASE_URL"""
+    return context.get_x_argument(as_dictionary=True).get("url", settings.database_url)
+
+
+def run_migrations_offline():
+    """Emit SQL for the migrations without connecting (``alembic upgrade head --sql``)"""
+    context.configure(
+        url=database_url(),
+        target_metadata=target_metadata,
+        include_object=include_object,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Apply the migrations over a dedicated, unpooled connection"""
+    engine = create_engine(database_url(), poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,146 @@
+"""Initial schema (tables init_db() used to create on app import)
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-19 05:38:17.668428
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('cities',
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('state', sa.String(length=255), nullable=False),
+    sa.Column('latitude', sa.Float(), nullable=False),
+    sa.Column('longitude', sa.Float(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('population', sa.String(length=255), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_cities_id'), 'cities', ['id'], unique=False)
+    op.create_index(op.f('ix_cities_name'), 'cities', ['name'], unique=True)
+    op.create_table('intersections',
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('city_id', sa.Integer(), nullable=False),
+    sa.Column('latitude', sa.Float(), nullable=False),
+    sa.Column('longitude', sa.Float(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('num_lanes', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['city_id'], ['cities.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_intersections_id'), 'intersections', ['id'], unique=False)
+    op.create_index(op.f('ix_intersections_name'), 'intersections', ['name'], unique=False)
+    op.create_table('lanes',
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('intersection_id', sa.Integer(), nullable=False),
+    sa.Column('direction', sa.Enum('NORTH', 'SOUTH', 'EAST', 'WEST', name='direction'), nullable=False),
+    sa.Column('capacity', sa.Integer(), nullable=False),
+    sa.Column('length', sa.Float(), nullable=False),
+    sa.Column('width', sa.Float(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['intersection_id'], ['intersections.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_lanes_id'), 'lanes', ['id'], unique=False)
+    op.create_table('signals',
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('intersection_id', sa.Integer(), nullable=False),
+    sa.Column('state', sa.Enum('GREEN', 'YELLOW', 'RED', name='signalstate'), nullable=False),
+    sa.Column('green_duration', sa.Integer(), nullable=False),
+    sa.Column('yellow_duration', sa.Integer(), nullable=False),
+    sa.Column('red_duration', sa.Integer(), nullable=False),
+    sa.Column('remaining_time', sa.Float(), nullable=False),
+    sa.Column('is_optimized', sa.Boolean(), nullable=True),
+    sa.Column('adaptive_green_duration', sa.Integer(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['intersection_id'], ['intersections.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_signals_id'), 'signals', ['id'], unique=False)
+    op.create_table('simulation_states',
+    sa.Column('city_id', sa.Integer(), nullable=False),
+    sa.Column('intersection_id', sa.Integer(), nullable=True),
+    sa.Column('simulation_time', sa.Float(), nullable=False),
+    sa.Column('is_running', sa.Integer(), nullable=False),
+    sa.Column('total_vehicles', sa.Integer(), nullable=False),
+    sa.Column('vehicles_exited', sa.Integer(), nullable=False),
+    sa.Column('total_waiting_time', sa.Float(), nullable=False),
+    sa.Column('avg_waiting_time', sa.Float(), nullable=False),
+    sa.Column('congestion_score', sa.Float(), nullable=False),
+    sa.Column('vehicles_per_minute', sa.Float(), nullable=False),
+    sa.Column('state_metadata', sa.JSON(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['city_id'], ['cities.id'], ),
+    sa.ForeignKeyConstraint(['intersection_id'], ['intersections.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_simulation_states_city_id'), 'simulation_states', ['city_id'], unique=False)
+    op.create_index(op.f('ix_simulation_states_id'), 'simulation_states', ['id'], unique=False)
+    op.create_table('vehicles',
+    sa.Column('vehicle_id', sa.String(length=50), nullable=False),
+    sa.Column('vehicle_type', sa.Enum('CAR', 'BUS', 'TRUCK', 'TWO_WHEELER', 'AUTO', 'AMBULANCE', 'FIRE_ENGINE', 'POLICE', name='vehicletype'), nullable=False),
+    sa.Column('intersection_id', sa.Integer(), nullable=False),
+    sa.Column('lane_id', sa.Integer(), nullable=True),
+    sa.Column('position', sa.Float(), nullable=False),
+    sa.Column('speed', sa.Float(), nullable=False),
+    sa.Column('max_speed', sa.Float(), nullable=False),
+    sa.Column('length', sa.Float(), nullable=False),
+    sa.Column('width', sa.Float(), nullable=False),
+    sa.Column('weight', sa.Float(), nullable=False),
+    sa.Column('state', sa.Enum('WAITING', 'MOVING', 'STOPPED', 'EXITED', name='vehiclestate'), nullable=False),
+    sa.Column('is_emergency', sa.Boolean(), nullable=False),
+    sa.Column('waiting_time', sa.Integer(), nullable=False),
+    sa.Column('entry_time', sa.Float(), nullable=False),
+    sa.Column('exit_time', sa.Float(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['intersection_id'], ['intersections.id'], ),
+    sa.ForeignKeyConstraint(['lane_id'], ['lanes.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_vehicles_id'), 'vehicles', ['id'], unique=False)
+    op.create_index(op.f('ix_vehicles_vehicle_id'), 'vehicles', ['vehicle_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_vehicles_vehicle_id'), table_name='vehicles')
+    op.drop_index(op.f('ix_vehicles_id'), table_name='vehicles')
+    op.drop_table('vehicles')
+    op.drop_index(op.f('ix_simulation_states_id'), table_name='simulation_states')
+    op.drop_index(op.f('ix_simulation_states_city_id'), table_name='simulation_states')
+    op.drop_table('simulation_states')
+    op.drop_index(op.f('ix_signals_id'), table_name='signals')
+    op.drop_table('signals')
+    op.drop_index(op.f('ix_lanes_id'), table_name='lanes')
+    op.drop_table('lanes')
+    op.drop_index(op.f('ix_intersections_name'), table_name='intersections')
+    op.drop_index(op.f('ix_intersections_id'), table_name='intersections')
+    op.drop_table('intersections')
+    op.drop_index(op.f('ix_cities_name'), table_name='cities')
+    op.drop_index(op.f('ix_cities_id'), table_name='cities')
+    op.drop_table('cities')
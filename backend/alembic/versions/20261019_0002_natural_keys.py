@@ -0,0 +1,37 @@
+"""Unique natural keys for intersections, lanes and signals (bulk upsert targets)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 05:40:34.035261
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, constraint, columns); batch mode lets SQLite rebuild the table
+CONSTRAINTS = [
+    ("intersections", "uq_intersections_city_id_name", ["city_id", "name"]),
+    ("lanes", "uq_lanes_intersection_id_name", ["intersection_id", "name"]),
+    ("signals", "uq_signals_intersection_id_name", ["intersection_id", "name"]),
+]
+
+
+def upgrade() -> None:
+    for table, name, columns in CONSTRAINTS:
+        with op.batch_alter_table(table) as batch:
+            batch.create_unique_constraint(name, columns)
+
+
+def downgrade() -> None:
+    for table, name, _ in reversed(CONSTRAINTS):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_constraint(name, type_="unique")
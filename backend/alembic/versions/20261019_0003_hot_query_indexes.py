@@ -0,0 +1,46 @@
+"""Composite and partial indexes for the hot simulation queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 05:44:55.031349
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ACTIVE = "state <> 'EXITED'"
+
+# (name, table, columns, dialect options)
+INDEXES = [
+    ("ix_vehicles_active_intersection_id", "vehicles", ["intersection_id", "id"],
+     {"postgresql_where": sa.text(ACTIVE), "sqlite_where": sa.text(ACTIVE)}),
+    ("ix_vehicles_lane_id_position", "vehicles", ["lane_id", "position"], {}),
+    ("ix_vehicles_intersection_id_state", "vehicles", ["intersection_id", "state"], {}),
+    ("ix_vehicles_emergency_intersection_id", "vehicles", ["intersection_id"],
+     {"postgresql_where": sa.text("is_emergency"), "sqlite_where": sa.text("is_emergency = 1")}),
+    ("ix_simulation_states_intersection_id", "simulation_states", ["intersection_id"], {}),
+]
+
+
+def upgrade() -> None:
+    # On PostgreSQL build without locking out writes to a live vehicles table;
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, **options)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
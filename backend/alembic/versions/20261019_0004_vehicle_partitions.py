@@ -0,0 +1,97 @@
+"""Partition vehicles by day of created_at (PostgreSQL); simulation run bound
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 06:20:11.418203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Secondary indexes of vehicles as of 0003, as (name, definition). On the
+# partitioned table unique keys must include the partition key.
+INDEXES = [
+    ("ix_vehicles_id", "(id)"),
+    ("ix_vehicles_active_intersection_id", "(intersection_id, id) WHERE state <> 'EXITED'"),
+    ("ix_vehicles_lane_id_position", "(lane_id, position)"),
+    ("ix_vehicles_intersection_id_state", "(intersection_id, state)"),
+    ("ix_vehicles_emergency_intersection_id", "(intersection_id) WHERE is_emergency"),
+]
+
+FOREIGN_KEYS = [
+    "ALTER TABLE vehicles ADD CONSTRAINT vehicles_intersection_id_fkey "
+    "FOREIGN KEY (intersection_id) REFERENCES intersections (id)",
+    "ALTER TABLE vehicles ADD CONSTRAINT vehicles_lane_id_fkey "
+    "FOREIGN KEY (lane_id) REFERENCES lanes (id)",
+]
+
+# Existing rows stay where they are: the old table becomes the partition
+# for everything up to tomorrow (no copy), followed by three daily partitions.
+# Later days are created by app.services.partitions.
+ATTACH_LEGACY = """
+DO $$
+DECLARE
+    boundary date := greatest(current_date, (SELECT max(created_at)::date FROM vehicles_legacy)) + 1;
+BEGIN
+    EXECUTE format('ALTER TABLE vehicles ATTACH PARTITION vehicles_legacy FOR VALUES FROM (MINVALUE) TO (%L)', boundary);
+    FOR n IN 0..2 LOOP
+        EXECUTE format(
+            'CREATE TABLE vehicles_p%s PARTITION OF vehicles FOR VALUES FROM (%L) TO (%L)',
+            to_char(boundary + n, 'YYYYMMDD'), boundary + n, boundary + n + 1
+        );
+    END LOOP;
+END $$
+"""
+
+
+def upgrade() -> None:
+    op.add_column('simulation_states', sa.Column('active_since', sa.DateTime(), nullable=True))
+    if op.get_context().dialect.name != "postgresql":
+        return
+
+    op.execute("ALTER TABLE vehicles RENAME TO vehicles_legacy")
+    op.execute("ALTER TABLE vehicles_legacy RENAME CONSTRAINT vehicles_pkey TO vehicles_legacy_pkey")
+    op.execute("ALTER INDEX ix_vehicles_vehicle_id RENAME TO ix_vehicles_legacy_vehicle_id")
+    for name, _ in INDEXES:
+        op.execute(f"ALTER INDEX {name} RENAME TO {name.replace('ix_vehicles_', 'ix_vehicles_legacy_')}")
+
+    op.execute("CREATE TABLE vehicles (LIKE vehicles_legacy INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)")
+    op.execute("ALTER SEQUENCE vehicles_id_seq OWNED BY vehicles.id")
+    op.execute("ALTER TABLE vehicles ADD CONSTRAINT vehicles_pkey PRIMARY KEY (id, created_at)")
+    for statement in FOREIGN_KEYS:
+        op.execute(statement)
+    op.execute("CREATE UNIQUE INDEX ix_vehicles_vehicle_id ON vehicles (vehicle_id, created_at)")
+    for name, definition in INDEXES:
+        op.execute(f"CREATE INDEX {name} ON vehicles {definition}")
+
+    op.execute(ATTACH_LEGACY)
+    # Catches rows for days maintenance has not created yet, so inserts never fail
+    op.execute("CREATE TABLE vehicles_default PARTITION OF vehicles DEFAULT")
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name == "postgresql":
+        op.execute("CREATE TABLE vehicles_flat (LIKE vehicles INCLUDING DEFAULTS)")
+        op.execute("INSERT INTO vehicles_flat SELECT * FROM vehicles")
+        op.execute("ALTER SEQUENCE vehicles_id_seq OWNED BY vehicles_flat.id")
+        op.execute("DROP TABLE vehicles")
+        op.execute("ALTER TABLE vehicles_flat RENAME TO vehicles")
+        op.execute("ALTER TABLE vehicles ADD CONSTRAINT vehicles_pkey PRIMARY KEY (id)")
+        for statement in FOREIGN_KEYS:
+            op.execute(statement)
+        op.execute("CREATE UNIQUE INDEX ix_vehicles_vehicle_id ON vehicles (vehicle_id)")
+        for name, definition in INDEXES:
+            op.execute(f"CREATE INDEX {name} ON vehicles {definition}")
+
+    with op.batch_alter_table('simulation_states') as batch:
+        batch.drop_column('active_since')
@@ -1,27 +1,37 @@
 """City routes"""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.city import City
 from app.schemas.city import CityCreate, CityUpdate, CityResponse
+from app.services.response_cache import response_cache
 
 router = APIRouter(prefix="/api/cities", tags=["cities"])
 
+_city_list = TypeAdapter(list[CityResponse])
+
 
 @router.get("", response_model=list[CityResponse])
-def get_cities(db: Session = Depends(get_db)):
+def get_cities(request: Request, db: Session = Depends(get_db)):
     """Get all cities"""
-    cities = db.query(City).all()
-    return cities
+    def load():
+        cities = db.query(City).all()
+        return _city_list.dump_json(_city_list.validate_python(cities, from_attributes=True))
+    
+    return response_cache.respond(request, "cities", "all", load)
 
 
 @router.get("/{city_id}", response_model=CityResponse)
-def get_city(city_id: int, db: Session = Depends(get_db)):
+def get_city(city_id: int, request: Request, db: Session = Depends(get_db)):
     """Get city by ID"""
-    city = db.query(City).filter(City.id == city_id).first()
-    if not city:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="City not found")
-    return city
+    def load():
+        city = db.query(City).filter(City.id == city_id).first()
+        if not city:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="City not found")
+        return CityResponse.model_validate(city).model_dump_json().encode()
+    
+    return response_cache.respond(request, "cities", f"id:{city_id}", load)
 
 
 @router.post("", response_model=CityResponse, status_code=status.HTTP_201_CREATED)
@@ -38,6 +48,7 @@ def create_city(city: CityCreate, db: Session = Depends(get_db)):
     new_city = City(**city.model_dump())
     db.add(new_city)
     db.commit()
+    response_cache.invalidate("cities")
     db.refresh(new_city)
     return new_city
 
@@ -54,6 +65,7 @@ def update_city(city_id: int, city_update: CityUpdate, db: Session = Depends(get
         setattr(city, field, value)
     
     db.commit()
+    response_cache.invalidate("cities")
     db.refresh(city)
     return city
 
@@ -67,3 +79,5 @@ def delete_city(city_id: int, db: Session = Depends(get_db)):
     
     db.delete(city)
     db.commit()
+    # Intersections are deleted with their city
+    response_cache.invalidate("cities", "intersections")
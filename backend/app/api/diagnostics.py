@@ -0,0 +1,56 @@
+"""Diagnostics routes"""
+from fastapi import APIRouter, status
+from app.database import engine
+from app.services.cache import cache_stats, caches
+from app.services.db_metrics import db_metrics
+from app.services.partitions import is_partitioned, list_partitions
+from app.services.spatial import intersection_index
+
+router = APIRouter(prefix="/api/diagnostics", tags=["diagnostics"])
+
+
+@router.get("/db")
+def get_db_metrics(top: int = 50):
+    """Pool occupancy, checkout wait and per-statement latency histograms"""
+    return db_metrics.snapshot(top=top)
+
+
+@router.post("/db/reset", status_code=status.HTTP_204_NO_CONTENT)
+def reset_db_metrics():
+    """Clear collected histograms (pool occupancy is always live)"""
+    db_metrics.reset()
+
+
+@router.get("/cache")
+def get_cache_stats():
+    """Hit/miss counts, L1 size and Redis latency for every cache"""
+    return cache_stats()
+
+
+@router.post("/cache/reset", status_code=status.HTTP_204_NO_CONTENT)
+def reset_cache_stats():
+    """Clear cache counters (cached entries are kept)"""
+    for cache in caches.values():
+        cache.stats.reset()
+
+
+@router.get("/spatial")
+def get_spatial_index_stats():
+    """Size of the intersection spatial index and how long its last rebuild took"""
+    return intersection_index.snapshot()
+
+
+@router.get("/partitions")
+def get_vehicle_partitions():
+    """Vehicle partitions with their upper bound and estimated row count"""
+    with engine.connect() as conn:
+        if not is_partitioned(conn):
+            return {"partitioned": False, "partitions": []}
+        partitions = list_partitions(conn)
+    return {
+        "partitioned": True,
+        "partitions": [
+            {"name": p.name, "until": p.upper.isoformat() if p.upper else None, "rows": p.rows}
+            for p in partitions
+        ],
+    }
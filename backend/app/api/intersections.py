@@ -1,30 +1,72 @@
 """Intersection routes"""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.intersection import Intersection
 from app.models.city import City
-from app.schemas.intersection import IntersectionCreate, IntersectionUpdate, IntersectionResponse
+from app.schemas.intersection import (
+    IntersectionCreate, IntersectionUpdate, IntersectionResponse, IntersectionLocation, NearbyIntersection,
+)
+from app.services.response_cache import response_cache
+from app.services.spatial import intersection_index
 
 router = APIRouter(prefix="/api/intersections", tags=["intersections"])
 
+_intersection_list = TypeAdapter(list[IntersectionResponse])
+
 
 @router.get("", response_model=list[IntersectionResponse])
-def get_intersections(city_id: int = None, db: Session = Depends(get_db)):
+def get_intersections(request: Request, city_id: int = None, db: Session = Depends(get_db)):
     """Get all intersections, optionally filtered by city"""
-    query = db.query(Intersection)
-    if city_id:
-        query = query.filter(Intersection.city_id == city_id)
-    return query.all()
+    def load():
+        query = db.query(Intersection)
+        if city_id:
+            query = query.filter(Intersection.city_id == city_id)
+        intersections = _intersection_list.validate_python(query.all(), from_attributes=True)
+        return _intersection_list.dump_json(intersections)
+    
+    return response_cache.respond(request, "intersections", f"city:{city_id or 'all'}", load)
+
+
+@router.get("/within", response_model=list[IntersectionLocation])
+def get_intersections_within(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    city_id: int = None,
+    limit: int = Query(default=5000, ge=1, le=50000),
+    db: Session = Depends(get_db),
+):
+    """Intersections inside a map viewport, from the in-memory spatial index"""
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Bounding box minimum exceeds maximum")
+    return intersection_index.within(db, min_lat, min_lon, max_lat, max_lon, city_id, limit)
+
+
+@router.get("/nearest", response_model=list[NearbyIntersection])
+def get_nearest_intersections(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(default=5, ge=1, le=100),
+    max_distance_m: float = Query(default=None, gt=0),
+    db: Session = Depends(get_db),
+):
+    """The k intersections closest to a point, nearest first"""
+    return intersection_index.nearest(db, lat, lon, k, max_distance_m)
 
 
 @router.get("/{intersection_id}", response_model=IntersectionResponse)
-def get_intersection(intersection_id: int, db: Session = Depends(get_db)):
+def get_intersection(intersection_id: int, request: Request, db: Session = Depends(get_db)):
     """Get intersection by ID"""
-    intersection = db.query(Intersection).filter(Intersection.id == intersection_id).first()
-    if not intersection:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Intersection not found")
-    return intersection
+    def load():
+        intersection = db.query(Intersection).filter(Intersection.id == intersection_id).first()
+        if not intersection:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Intersection not found")
+        return IntersectionResponse.model_validate(intersection).model_dump_json().encode()
+    
+    return response_cache.respond(request, "intersections", f"id:{intersection_id}", load)
 
 
 @router.post("", response_model=IntersectionResponse, status_code=status.HTTP_201_CREATED)
@@ -35,9 +77,21 @@ def create_intersection(intersection: IntersectionCreate, db: Session = Depends(
     if not city:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="City not found")
     
+    # Names are unique within a city
+    existing = db.query(Intersection).filter(
+        Intersection.city_id == intersection.city_id,
+        Intersection.name == intersection.name,
+    ).first()
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Intersection with this name already exists in this city"
+        )
+    
     new_intersection = Intersection(**intersection.model_dump())
     db.add(new_intersection)
     db.commit()
+    response_cache.invalidate("intersections")
     db.refresh(new_intersection)
     return new_intersection
 
@@ -54,10 +108,22 @@ def update_intersection(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Intersection not found")
     
     update_data = intersection_update.model_dump(exclude_unset=True)
+    if update_data.get("name") not in (None, intersection.name):
+        existing = db.query(Intersection).filter(
+            Intersection.city_id == intersection.city_id,
+            Intersection.name == update_data["name"],
+        ).first()
+        if existing:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Intersection with this name already exists in this city"
+            )
+    
     for field, value in update_data.items():
         setattr(intersection, field, value)
     
     db.commit()
+    response_cache.invalidate("intersections")
     db.refresh(intersection)
     return intersection
 
@@ -71,3 +137,4 @@ def delete_intersection(intersection_id: int, db: Session = Depends(get_db)):
     
     db.delete(intersection)
     db.commit()
+    response_cache.invalidate("intersections")
@@ -1,16 +1,34 @@
 """Simulation routes"""
 import asyncio
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+import json
+import logging
+import time
+import uuid
+from dataclasses import asdict
+from typing import Dict, Optional, Set
+from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks, WebSocket, WebSocketDisconnect, Response
+from starlette.concurrency import run_in_threadpool
+from starlette.websockets import WebSocketState
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import get_db, get_async_db, SessionLocal
 from app.models.simulation_state import SimulationState
 from app.models.intersection import Intersection
+from app.models.city import City
 from app.models.lane import Lane
-from app.models.vehicle import Vehicle
 from app.models.signal import Signal
-from app.schemas.simulation import SimulationStart, SimulationMetrics, LaneMetrics, SignalMetrics
-from app.simulation import VehicleSimulation
+from app.schemas.simulation import SimulationStart, SimulationMetrics, LaneMetrics, SignalMetrics, TickProfiling, TickCaptureStart
+from app.simulation import LiveSnapshot, VehicleSimulation, change_feed, live_state, run_windows
+from app.simulation.change_feed import FEED_FIELDS, feed_row
 from app.optimization import SignalOptimizer
+from app.services.streaming import TickBroadcaster
+from app.services.tick_capture import tick_capture
+from app.services.tick_profiler import tick_profiler
+from app.services.viewport import Viewport, ViewportRequest
+from app.services.metrics_cache import metrics_cache
+from app.services.response_cache import response_cache
+from app.services.coordination import WORKER_ID, simulation_leases, simulation_registry
 from app.config import settings
 
 router = APIRouter(prefix="/api/simulation", tags=["simulation"])
@@ -18,8 +36,7 @@ router = APIRouter(prefix="/api/simulation", tags=["simulation"])
 vehicle_sim = VehicleSimulation()
 signal_optimizer = SignalOptimizer()
 
-# Store simulation state in memory
-_simulations = {}
+logger = logging.getLogger(__name__)
 
 
 @router.post("/start")
@@ -46,20 +63,16 @@ def start_simulation(sim_start: SimulationStart, db: Session = Depends(get_db)):
         sim_state.is_running = 1
     
     db.commit()
+    run_windows.start(db, sim_start.intersection_id)
     
-    _simulations[sim_start.intersection_id] = {
-        "running": True,
-        "duration": sim_start.duration,
-        "speed_factor": sim_start.speed_factor,
-        "elapsed": 0,
-    }
+    simulation_registry.start(sim_start.intersection_id, sim_start.duration, sim_start.speed_factor)
+    change_feed.bump(sim_start.intersection_id)
     
     return {"status": "started", "intersection_id": sim_start.intersection_id}
 
 
-@router.post("/stop/{intersection_id}")
-def stop_simulation(intersection_id: int, db: Session = Depends(get_db)):
-    """Stop simulation"""
+def finish_simulation(db: Session, intersection_id: int):
+    """Mark a simulation stopped everywhere: database, run registry and live state"""
     sim_state = db.query(SimulationState).filter(
         SimulationState.intersection_id == intersection_id
     ).first()
@@ -68,12 +81,50 @@ def stop_simulation(intersection_id: int, db: Session = Depends(get_db)):
         sim_state.is_running = 0
         db.commit()
     
-    if intersection_id in _simulations:
-        _simulations[intersection_id]["running"] = False
-    
+    simulation_registry.stop(intersection_id)
+    if live_state.enabled:
+        live_state.evict(db, intersection_id)
+    change_feed.bump(intersection_id)
+
+
+@router.post("/stop/{intersection_id}")
+def stop_simulation(intersection_id: int, db: Session = Depends(get_db)):
+    """Stop simulation"""
+    finish_simulation(db, intersection_id)
     return {"status": "stopped", "intersection_id": intersection_id}
 
 
+def optimized_signal_changes(timings: Dict[int, int]) -> Dict[int, Dict]:
+    """Live-state fields an optimizer run changes, per signal id"""
+    return {
+        signal_id: {"adaptive_green_duration": green_time, "is_optimized": True}
+        for signal_id, green_time in timings.items()
+    }
+
+
+@router.post("/optimize/city/{city_id}")
+def optimize_city_signals(city_id: int, db: Session = Depends(get_db)):
+    """Optimize signal timings for every intersection in a city"""
+    city = db.query(City).filter(City.id == city_id).first()
+    if not city:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="City not found")
+    
+    if live_state.enabled:
+        # Optimize against current traffic, then hand only the new timings to the live state
+        live_state.flush_all(db)
+    result = signal_optimizer.optimize_city(db, city_id)
+    for intersection_id, timings in result["optimized_timings"].items():
+        if live_state.enabled:
+            live_state.apply_signal_changes(intersection_id, optimized_signal_changes(timings))
+        change_feed.bump(intersection_id)
+    
+    return {
+        "status": "optimized",
+        "city_id": city_id,
+        **result,
+    }
+
+
 @router.post("/optimize/{intersection_id}")
 def optimize_signals(intersection_id: int, db: Session = Depends(get_db)):
     """Optimize signal timings for intersection"""
@@ -81,11 +132,24 @@ def optimize_signals(intersection_id: int, db: Session = Depends(get_db)):
     if not intersection:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Intersection not found")
     
+    if live_state.enabled:
+        live_state.flush(db, intersection_id)
+    
     # Run optimization
     optimized_timings = signal_optimizer.optimize_signal_timing(db, intersection_id)
     
     # Check for emergency vehicles
     emergency_detected = signal_optimizer.detect_emergency_corridor(db, intersection_id)
+    if live_state.enabled:
+        changes = optimized_signal_changes(optimized_timings)
+        if emergency_detected:
+            # The corridor does override the phase, as written to the database
+            for signal_id, state, remaining_time in db.query(Signal.id, Signal.state, Signal.remaining_time).filter(
+                Signal.intersection_id == intersection_id
+            ):
+                changes.setdefault(signal_id, {}).update(state=state, remaining_time=remaining_time)
+        live_state.apply_signal_changes(intersection_id, changes)
+    change_feed.bump(intersection_id)
     
     return {
         "status": "optimized",
@@ -96,40 +160,49 @@ def optimize_signals(intersection_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/metrics/{intersection_id}", response_model=SimulationMetrics)
-def get_simulation_metrics(intersection_id: int, db: Session = Depends(get_db)):
-    """Get current simulation metrics"""
-    intersection = db.query(Intersection).filter(Intersection.id == intersection_id).first()
-    if not intersection:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Intersection not found")
+async def get_simulation_metrics(intersection_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Get current simulation metrics (computed at most once per tick)"""
+    entry = metrics_cache.peek(intersection_id)
+    if entry is None:
+        intersection = await db.scalar(select(Intersection.id).where(Intersection.id == intersection_id))
+        if not intersection:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Intersection not found")
+        
+        entry = await metrics_cache.aget_or_compute(
+            db, intersection_id, lambda session: build_simulation_metrics(session, intersection_id).model_dump()
+        )
     
-    # Get vehicle metrics
-    vehicle_metrics = vehicle_sim.get_simulation_metrics(db, intersection_id)
+    return Response(content=entry.body, media_type="application/json")
+
+
+def build_simulation_metrics(db: Session, intersection_id: int, snapshot: Optional[LiveSnapshot] = None) -> SimulationMetrics:
+    """Compute the metrics snapshot for an intersection (from ``snapshot`` when given)"""
+    # One snapshot (Redis or database) feeds every figure below
+    if snapshot is None:
+        snapshot = live_state.current(db, intersection_id, vehicle_sim.simulation_time)
+    vehicle_metrics = vehicle_sim.snapshot_metrics(snapshot)
+    lane_scores = signal_optimizer.snapshot_congestion(snapshot)
     
     # Get congestion score
-    congestion_score = signal_optimizer.predict_congestion_level(db, intersection_id)
+    congestion_score = min(100.0, sum(lane_scores.values()) / len(lane_scores)) if lane_scores else 0
     
     # Get lane metrics
-    lanes = db.query(Lane).filter(Lane.intersection_id == intersection_id).all()
     lane_metrics = []
-    
-    for lane in lanes:
-        vehicles = db.query(Vehicle).filter(Vehicle.lane_id == lane.id).all()
-        active_vehicles = [v for v in vehicles if v.state.value != "EXITED"]
+    for lane in snapshot.lanes:
+        active_vehicles = [v for v in snapshot.vehicles if v.lane_id == lane.id]
         
         lane_metrics.append(LaneMetrics(
             lane_id=lane.id,
             lane_name=lane.name,
             vehicle_count=len(active_vehicles),
-            congestion_score=signal_optimizer.calculate_congestion_score(lane, db),
+            congestion_score=lane_scores[lane.id],
             avg_wait_time=sum(v.waiting_time for v in active_vehicles) / len(active_vehicles) if active_vehicles else 0,
             throughput=vehicle_metrics.get("throughput", 0),
         ))
     
     # Get signal metrics
-    signals = db.query(Signal).filter(Signal.intersection_id == intersection_id).all()
     signal_metrics = []
-    
-    for signal in signals:
+    for signal in snapshot.signals:
         signal_metrics.append(SignalMetrics(
             signal_id=signal.id,
             signal_name=signal.name,
@@ -140,8 +213,8 @@ def get_simulation_metrics(intersection_id: int, db: Session = Depends(get_db)):
         ))
     
     return SimulationMetrics(
-        simulation_time=vehicle_sim.simulation_time,
-        is_running=bool(_simulations.get(intersection_id, {}).get("running")),
+        simulation_time=snapshot.simulation_time,
+        is_running=simulation_registry.is_running(intersection_id),
         total_vehicles=vehicle_metrics.get("total_vehicles", 0),
         vehicles_exited=vehicle_metrics.get("exited_vehicles", 0),
         avg_waiting_time=vehicle_metrics.get("avg_waiting_time", 0),
@@ -153,17 +226,436 @@ def get_simulation_metrics(intersection_id: int, db: Session = Depends(get_db)):
     )
 
 
+def build_scene_geometry(db: Session, intersection_id: int) -> Optional[bytes]:
+    """Serialized static layout of an intersection (None if it does not exist)"""
+    intersection = db.query(Intersection).filter(Intersection.id == intersection_id).first()
+    if not intersection:
+        return None
+    lanes = db.query(Lane).filter(Lane.intersection_id == intersection_id).order_by(Lane.id).all()
+    signals = db.query(Signal).filter(Signal.intersection_id == intersection_id).order_by(Signal.id).all()
+    return json.dumps({
+        "intersection": {
+            "id": intersection.id,
+            "name": intersection.name,
+            "city_id": intersection.city_id,
+            "latitude": intersection.latitude,
+            "longitude": intersection.longitude,
+            "num_lanes": intersection.num_lanes,
+        },
+        "lanes": [
+            {
+                "id": lane.id,
+                "name": lane.name,
+                "direction": lane.direction.value,
+                "length": lane.length,
+                "width": lane.width,
+                "capacity": lane.capacity,
+            }
+            for lane in lanes
+        ],
+        "signals": [
+            {
+                "id": signal.id,
+                "name": signal.name,
+                "green_duration": signal.green_duration,
+                "yellow_duration": signal.yellow_duration,
+                "red_duration": signal.red_duration,
+            }
+            for signal in signals
+        ],
+    }).encode()
+
+
+# A tick published while the scene's snapshot is read forces a re-read
+SCENE_READ_ATTEMPTS = 3
+# Seconds a client waits after ticks kept outrunning every attempt
+SCENE_RETRY_AFTER = 1
+
+
+def read_scene_state(db: Session, intersection_id: int) -> Optional[dict]:
+    """
+    Version, metrics and vehicle rows of one tick, all taken from a single
+    live snapshot read in one transaction (repeatable read on PostgreSQL,
+    so the snapshot's queries agree). Ticks publish their feed version only
+    after committing, so an unchanged version across the read means no tick
+    was published in between; None if one was.
+    """
+    # Start a fresh transaction so its isolation level can still be chosen
+    db.rollback()
+    if db.get_bind().dialect.name == "postgresql":
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    try:
+        version = change_feed.version(db, intersection_id)
+        snapshot = live_state.current(db, intersection_id, vehicle_sim.simulation_time)
+        metrics = build_simulation_metrics(db, intersection_id, snapshot)
+        if change_feed.version(db, intersection_id) != version:
+            return None
+    finally:
+        db.rollback()
+    return {
+        "version": version,
+        "vehicles": [feed_row(v) for v in snapshot.vehicles],
+        "metrics": metrics.model_dump_json().encode(),
+    }
+
+
+@router.get("/scene/{intersection_id}")
+async def get_scene(intersection_id: int, geometry_key: str = None, db: AsyncSession = Depends(get_async_db)):
+    """
+    Everything the map view needs for one frame. ``geometry`` (lanes,
+    signals, directions, lengths) only changes when the intersection is
+    edited; pass the last ``geometry_key`` back to have it omitted. The
+    dynamic part (vehicles as positional rows, metrics including signal
+    phases) always comes from one snapshot of the tick named by ``version``;
+    if ticks keep landing during the read, the request gets a 503.
+    """
+    cache_key = f"geometry:{intersection_id}"
+    generation = await response_cache.ageneration("intersections")
+    geometry = await response_cache.aget("intersections", cache_key, generation)
+    if geometry is None:
+        body = await db.run_sync(lambda session: build_scene_geometry(session, intersection_id))
+        if body is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Intersection not found")
+        geometry = await response_cache.aput("intersections", cache_key, body, generation)
+
+    for _ in range(SCENE_READ_ATTEMPTS):
+        state = await db.run_sync(lambda session: read_scene_state(session, intersection_id))
+        if state is not None:
+            break
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Simulation ticked during every scene read",
+            headers={"Retry-After": str(SCENE_RETRY_AFTER)},
+        )
+
+    current_key = geometry.etag.strip('"')
+    head = json.dumps({
+        "intersection_id": intersection_id,
+        "version": state["version"],
+        "geometry_key": current_key,
+        "vehicles": {"fields": FEED_FIELDS, "rows": state["vehicles"]},
+    })
+    # Splice the already-serialized parts in instead of re-encoding them
+    parts = [
+        head[:-1].encode(),
+        b',"geometry":',
+        b"null" if geometry_key == current_key else geometry.body,
+        b',"metrics":',
+        state["metrics"],
+        b"}",
+    ]
+    return Response(content=b"".join(parts), media_type="application/json", headers={"Cache-Control": "no-cache"})
+
+
+def build_stream_frame(intersection_id: int) -> dict:
+    """Compute one stream frame (metrics + active vehicles) for an intersection"""
+    db = SessionLocal()
+    try:
+        metrics = metrics_cache.get_or_compute(
+            db, intersection_id, lambda: build_simulation_metrics(db, intersection_id).model_dump()
+        )
+        snapshot = live_state.current(db, intersection_id, vehicle_sim.simulation_time)
+        return {
+            "type": "tick",
+            "intersection_id": intersection_id,
+            "metrics": metrics.payload,
+            "vehicles": [asdict(v) for v in snapshot.vehicles],
+        }
+    finally:
+        db.close()
+
+
+stream_broadcaster = TickBroadcaster(
+    compute=build_stream_frame,
+    interval=1.0 / settings.stream_rate_hz,
+    max_lag=settings.stream_max_lag,
+)
+
+
+def _intersection_exists(intersection_id: int) -> bool:
+    db = SessionLocal()
+    try:
+        return db.query(Intersection.id).filter(Intersection.id == intersection_id).first() is not None
+    finally:
+        db.close()
+
+
+def _in_session(fn, *args):
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+@router.websocket("/ws/viewport")
+async def stream_viewport(websocket: WebSocket):
+    """
+    Push vehicles inside a map viewport. The client sends
+    {"min_lat", "min_lon", "max_lat", "max_lon", "zoom"} (optionally
+    "city_id") and may send a new viewport at any time; it takes effect
+    immediately and intersections still in view are not resent.
+    """
+    await websocket.accept()
+    viewport = Viewport()
+    # Viewport requests and error replies from the reader, None once the client is gone
+    inbox: asyncio.Queue = asyncio.Queue()
+
+    async def read_requests():
+        try:
+            while True:
+                text = await websocket.receive_text()
+                try:
+                    await inbox.put(ViewportRequest.parse(json.loads(text)))
+                except json.JSONDecodeError:
+                    await inbox.put({"type": "error", "detail": "Viewport message must be JSON"})
+                except ValueError as exc:
+                    await inbox.put({"type": "error", "detail": str(exc)})
+        except WebSocketDisconnect:
+            pass
+        finally:
+            await inbox.put(None)
+
+    reader = asyncio.create_task(read_requests())
+    interval = 1.0 / settings.stream_rate_hz
+    try:
+        while True:
+            # Idle until the first viewport; afterwards tick, or react at once to a new one
+            try:
+                item = await asyncio.wait_for(inbox.get(), interval if viewport.mode else None)
+            except asyncio.TimeoutError:
+                item = {}
+            if item is None:
+                break
+            if isinstance(item, ViewportRequest):
+                await run_in_threadpool(_in_session, viewport.update, item)
+            elif item:
+                await websocket.send_text(json.dumps(item))
+                continue
+            frame = await run_in_threadpool(_in_session, viewport.frame)
+            if frame is not None:
+                await websocket.send_text(json.dumps(frame))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        reader.cancel()
+
+
+@router.websocket("/ws/{intersection_id}")
+async def stream_simulation(websocket: WebSocket, intersection_id: int):
+    """Push live simulation frames for an intersection"""
+    await websocket.accept()
+    if not await run_in_threadpool(_intersection_exists, intersection_id):
+        # Closed after accepting so browsers see 1008 (not 1006) and stop reconnecting
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    subscription = stream_broadcaster.subscribe(intersection_id)
+    
+    async def watch_disconnect():
+        # Clients only listen; any inbound frame other than a disconnect is ignored
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+        subscription.close()
+    
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        while True:
+            message = await subscription.get()
+            if message is None:
+                break
+            await websocket.send_text(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        watcher.cancel()
+        stream_broadcaster.unsubscribe(subscription)
+        if websocket.client_state == WebSocketState.CONNECTED:
+            # Dropped for lagging: tell the client to reconnect later
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+
+
+@router.get("/stream/{intersection_id}/subscribers")
+def get_stream_subscribers(intersection_id: int):
+    """Number of live stream subscribers for an intersection"""
+    return {
+        "intersection_id": intersection_id,
+        "subscribers": stream_broadcaster.subscriber_count(intersection_id),
+        "total_subscribers": stream_broadcaster.subscriber_count(),
+    }
+
+
+def run_tick(db: Session, intersection_id: int, dt: float):
+    """One simulation tick plus the periodic signal optimization"""
+    with tick_profiler.tick(intersection_id) as timer, tick_capture.tick(intersection_id):
+        # Update vehicle movements
+        snapshot = vehicle_sim.simulate_step(db, intersection_id, dt, timer)
+        
+        # Periodically optimize signals
+        if int(vehicle_sim.simulation_time) % 10 == 0:  # Every 10 seconds
+            if snapshot is not None:
+                signal_optimizer.optimize_snapshot(snapshot)
+                live_state.save(snapshot)
+            else:
+                signal_optimizer.optimize_signal_timing(db, intersection_id)
+            change_feed.bump(intersection_id)
+            if timer:
+                timer.lap("optimizer")
+
+
 @router.post("/step/{intersection_id}")
-def simulation_step(intersection_id: int, dt: float = settings.simulation_tick_interval, db: Session = Depends(get_db)):
+async def simulation_step(
+    intersection_id: int,
+    dt: float = settings.simulation_tick_interval,
+    db: AsyncSession = Depends(get_async_db),
+):
     """Advance simulation by one step"""
-    if intersection_id not in _simulations or not _simulations[intersection_id]["running"]:
+    if not simulation_registry.is_running(intersection_id):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Simulation not running")
+    if settings.simulation_autorun:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Simulation is advanced by the server")
     
-    # Update vehicle movements
-    vehicle_sim.simulate_step(db, intersection_id, dt)
-    
-    # Periodically optimize signals
-    if int(vehicle_sim.simulation_time) % 10 == 0:  # Every 10 seconds
-        signal_optimizer.optimize_signal_timing(db, intersection_id)
+    # Only one request at a time, on any worker, may step an intersection
+    holder = f"{WORKER_ID}:step:{uuid.uuid4().hex}"
+    if not simulation_leases.acquire(intersection_id, holder):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Simulation is being stepped elsewhere")
+    try:
+        await db.run_sync(lambda session: run_tick(session, intersection_id, dt))
+    finally:
+        simulation_leases.release(intersection_id, holder)
     
     return {"status": "stepped", "simulation_time": vehicle_sim.simulation_time}
+
+
+@router.get("/profile/{intersection_id}")
+def get_tick_profile(intersection_id: int):
+    """Per-phase tick time histograms and the overrun count for an intersection"""
+    return tick_profiler.snapshot(intersection_id)
+
+
+@router.put("/profile")
+def set_tick_profiling(profiling: TickProfiling):
+    """Switch tick phase timers on or off for this worker"""
+    tick_profiler.enabled = profiling.enabled
+    return {"enabled": tick_profiler.enabled}
+
+
+@router.post("/profile/reset", status_code=status.HTTP_204_NO_CONTENT)
+def reset_tick_profiles():
+    """Clear collected tick histograms (the on/off switch is kept)"""
+    tick_profiler.reset()
+
+
+@router.post("/profile/{intersection_id}/capture", status_code=status.HTTP_202_ACCEPTED)
+async def start_tick_capture(
+    intersection_id: int, capture: TickCaptureStart, response: Response, wait: bool = False, top: int = 25
+):
+    """
+    Sample the stacks of this worker's next ``ticks`` ticks of an
+    intersection, or of its ticks for ``seconds``, whichever ends first.
+    With ``wait`` the response is the finished report; otherwise poll the GET.
+    """
+    if capture.ticks is None and capture.seconds is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Give ticks, seconds or both")
+    started = tick_capture.start(intersection_id, capture.ticks, capture.seconds)
+    if started is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A capture is already running for this intersection")
+    if wait:
+        await run_in_threadpool(started.finished.wait, started.seconds)
+        response.status_code = status.HTTP_200_OK
+    return tick_capture.report(intersection_id, top)
+
+
+@router.get("/profile/{intersection_id}/capture")
+def get_tick_capture(intersection_id: int, top: int = 25):
+    """Progress and top-functions table of the intersection's last capture"""
+    report = tick_capture.report(intersection_id, top)
+    if report is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No capture for this intersection")
+    return report
+
+
+@router.get("/profile/{intersection_id}/capture/collapsed")
+def get_tick_capture_stacks(intersection_id: int):
+    """The last capture as collapsed stacks, one ``frame;frame;frame count`` line each, for flame graphs"""
+    stacks = tick_capture.collapsed(intersection_id)
+    if stacks is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No capture for this intersection")
+    return Response(content=stacks, media_type="text/plain")
+
+
+@router.delete("/profile/{intersection_id}/capture", status_code=status.HTTP_204_NO_CONTENT)
+def discard_tick_capture(intersection_id: int):
+    """Stop the intersection's capture if it is running and drop its results"""
+    if not tick_capture.discard(intersection_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No capture for this intersection")
+
+
+@router.get("/status/{intersection_id}")
+def get_simulation_status(intersection_id: int):
+    """Run state of a simulation and the worker currently ticking it"""
+    simulation = simulation_registry.get(intersection_id)
+    if simulation is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Simulation not found")
+    return {
+        "intersection_id": intersection_id,
+        **simulation,
+        "owner": simulation_leases.owner(intersection_id),
+    }
+
+
+def tick_owned_simulations(owned: Set[int]):
+    """
+    One autorun pass: take or renew the lease of every running simulation
+    and tick the ones this worker holds. ``owned`` carries leases between
+    passes so stopped simulations are released promptly.
+    """
+    running = simulation_registry.running()
+    for intersection_id in owned - running.keys():
+        simulation_leases.release(intersection_id)
+        owned.discard(intersection_id)
+    
+    db = SessionLocal()
+    try:
+        for intersection_id, simulation in running.items():
+            if not simulation_leases.acquire(intersection_id):
+                owned.discard(intersection_id)
+                continue
+            owned.add(intersection_id)
+            
+            dt = settings.simulation_tick_interval * simulation["speed_factor"]
+            try:
+                run_tick(db, intersection_id, dt)
+            except Exception:
+                db.rollback()
+                logger.exception("Tick failed for intersection %s", intersection_id)
+                continue
+            
+            if simulation_registry.advance(intersection_id, dt) >= simulation["duration"]:
+                finish_simulation(db, intersection_id)
+                simulation_leases.release(intersection_id)
+                owned.discard(intersection_id)
+    finally:
+        db.close()
+
+
+async def run_simulation_ticker():
+    """Autorun loop: advance owned simulations once per tick interval until cancelled"""
+    owned: Set[int] = set()
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                await run_in_threadpool(tick_owned_simulations, owned)
+            except Exception:
+                logger.exception("Simulation ticker pass failed")
+            elapsed = time.monotonic() - started
+            await asyncio.sleep(max(0.0, settings.simulation_tick_interval - elapsed))
+    finally:
+        # Hand intersections over immediately instead of after the lease TTL
+        for intersection_id in owned:
+            try:
+                simulation_leases.release(intersection_id)
+            except Exception:
+                logger.exception("Could not release lease for intersection %s", intersection_id)
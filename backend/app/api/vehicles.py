@@ -1,56 +1,188 @@
 """Vehicle routes"""
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, get_async_db, AsyncSessionLocal, SessionLocal
 from app.models.vehicle import Vehicle, VehicleType
-from app.models.lane import Lane
-from app.schemas.vehicle import VehicleCreate, VehicleResponse
-from app.simulation import VehicleSimulation
+from app.schemas.vehicle import VehicleCreate, VehicleResponse, VehicleStateEnum, VehicleTypeEnum
+from app.services.injection import InjectionQueue, InjectionQueueFull, InjectionRejected
+from app.services.wire_format import encode_columnar, msgpack_response, uint32_bytes, wants_msgpack
+from app.simulation import VehicleSimulation, change_feed
 
 router = APIRouter(prefix="/api/vehicles", tags=["vehicles"])
 
 vehicle_sim = VehicleSimulation()
 
+injection_queue = InjectionQueue(
+    session_factory=SessionLocal,
+    simulation=vehicle_sim,
+    window=settings.injection_batch_window,
+    max_pending=settings.injection_queue_max,
+    batch_max=settings.injection_batch_max,
+)
+
 
 @router.post("/inject", response_model=VehicleResponse, status_code=status.HTTP_201_CREATED)
-def inject_vehicle(vehicle: VehicleCreate, db: Session = Depends(get_db)):
-    """Inject a new vehicle into the simulation"""
-    # Verify lane exists
-    lane = db.query(Lane).filter(Lane.id == vehicle.lane_id).first()
-    if not lane:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Lane not found")
-    
-    # Check lane capacity
-    active_vehicles = db.query(Vehicle).filter(
-        Vehicle.lane_id == vehicle.lane_id,
-        Vehicle.position < lane.length
-    ).count()
-    
-    if active_vehicles >= lane.capacity:
+async def inject_vehicle(vehicle: VehicleCreate):
+    """Inject a new vehicle into the simulation (committed with concurrent injections once per tick)"""
+    try:
+        return await injection_queue.submit(vehicle)
+    except InjectionRejected as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    except InjectionQueueFull as exc:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Injection queue is full",
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+
+VEHICLE_FIELDS = list(VehicleResponse.model_fields)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _projection(fields: Optional[str]) -> List[str]:
+    """Resolve a comma-separated field list; ``id`` is always included for cursors"""
+    if not fields:
+        return VEHICLE_FIELDS
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = sorted(set(requested) - set(VEHICLE_FIELDS))
+    if unknown:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, 
-            detail="Lane is at capacity"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}",
         )
+    return ["id"] + [f for f in VEHICLE_FIELDS if f in requested and f != "id"]
+
+
+def _vehicle_select(
+    columns: List[str],
+    intersection_id: Optional[int],
+    state: Optional[VehicleStateEnum],
+    lane_id: Optional[int],
+    vehicle_type: Optional[VehicleTypeEnum],
+    is_emergency: Optional[bool],
+    after_id: Optional[int],
+):
+    """Column-projected, id-ordered vehicle query with the listing filters applied"""
+    stmt = select(*(getattr(Vehicle, c) for c in columns))
+    if intersection_id:
+        stmt = stmt.where(Vehicle.intersection_id == intersection_id)
+    if state is not None:
+        stmt = stmt.where(Vehicle.state == state.value)
+    if lane_id is not None:
+        stmt = stmt.where(Vehicle.lane_id == lane_id)
+    if vehicle_type is not None:
+        stmt = stmt.where(Vehicle.vehicle_type == vehicle_type.value)
+    if is_emergency is not None:
+        stmt = stmt.where(Vehicle.is_emergency == is_emergency)
+    if after_id is not None:
+        stmt = stmt.where(Vehicle.id > after_id)
+    return stmt.order_by(Vehicle.id)
+
+
+@router.get("", response_model=list[VehicleResponse])
+async def get_vehicles(
+    request: Request,
+    intersection_id: int = None,
+    state: VehicleStateEnum = None,
+    lane_id: int = None,
+    vehicle_type: VehicleTypeEnum = None,
+    is_emergency: bool = None,
+    after_id: int = None,
+    limit: int = Query(settings.vehicle_page_size, ge=1, le=settings.vehicle_page_max),
+    fields: str = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Get vehicles one page at a time, ordered by id.
+    When more rows exist the ``X-Next-Cursor`` header holds the ``after_id``
+    for the next page. ``fields`` limits the returned columns. Clients
+    sending ``Accept: application/x-msgpack`` get a columnar binary page.
+    """
+    columns = _projection(fields)
+    stmt = _vehicle_select(columns, intersection_id, state, lane_id, vehicle_type, is_emergency, after_id)
+    rows = (await db.execute(stmt.limit(limit + 1))).all()
     
-    # Add vehicle to simulation
-    new_vehicle = vehicle_sim.add_vehicle(
-        db=db,
-        intersection_id=vehicle.intersection_id,
-        lane_id=vehicle.lane_id,
-        vehicle_type=VehicleType(vehicle.vehicle_type),
-        is_emergency=vehicle.is_emergency
-    )
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = str(rows[-1].id)
     
-    return new_vehicle
+    if wants_msgpack(request):
+        return msgpack_response(encode_columnar(columns, rows), headers)
+    body = json.dumps([dict(zip(columns, row)) for row in rows], default=_json_default)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
-@router.get("", response_model=list[VehicleResponse])
-def get_vehicles(intersection_id: int = None, db: Session = Depends(get_db)):
-    """Get all active vehicles, optionally filtered by intersection"""
-    query = db.query(Vehicle)
-    if intersection_id:
-        query = query.filter(Vehicle.intersection_id == intersection_id)
-    return query.all()
+@router.get("/stream")
+async def stream_vehicles(
+    intersection_id: int = None,
+    state: VehicleStateEnum = None,
+    lane_id: int = None,
+    vehicle_type: VehicleTypeEnum = None,
+    is_emergency: bool = None,
+    after_id: int = None,
+    fields: str = None,
+):
+    """
+    Stream every matching vehicle as newline-delimited JSON. Rows are read
+    from a server-side cursor in batches, so memory stays flat however
+    large the result is.
+    """
+    columns = _projection(fields)
+    stmt = _vehicle_select(columns, intersection_id, state, lane_id, vehicle_type, is_emergency, after_id)
+    
+    async def generate():
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(stmt.execution_options(yield_per=settings.vehicle_stream_batch))
+            async for batch in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(columns, row)), default=_json_default) + "\n"
+                    for row in batch
+                )
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@router.get("/changes")
+def get_vehicle_changes(
+    request: Request,
+    intersection_id: int,
+    since: int = None,
+    origin: int = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Vehicles added, changed or removed at an intersection since a version.
+    Rows are positional arrays described by ``fields``; pass the returned
+    ``version`` and ``origin`` back as ``since`` and ``origin`` on the next
+    call. Versions count from a worker's own origin, so a cursor another
+    worker issued gets a ``full`` response, which replaces the client's
+    state instead of patching it.
+    """
+    changes = change_feed.changes_since(db, intersection_id, since, origin)
+    if wants_msgpack(request):
+        return msgpack_response(encode_columnar(
+            changes["fields"],
+            changes["upserts"],
+            origin=changes["origin"],
+            version=changes["version"],
+            full=changes["full"],
+            removed=uint32_bytes(changes["removed"]),
+        ))
+    return changes
 
 
 @router.get("/{vehicle_id}", response_model=VehicleResponse)
@@ -1,15 +1,63 @@
 """Database initialization and session management"""
+from typing import AsyncIterator
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 from app.config import settings
 from app.models.base import Base
+from app.services import query_accounting
+from app.services.db_metrics import (
+    db_metrics,
+    install_idle_pre_ping,
+    InstrumentedAsyncQueuePool,
+    InstrumentedQueuePool,
+)
+
+
+def _engine_options(url: str, pool_size: int, max_overflow: int, pool_timeout: float, poolclass) -> dict:
+    """Pool and cache options shared by the sync and async engines"""
+    options = {
+        "echo": settings.db_echo,
+        "query_cache_size": settings.db_statement_cache_size,
+    }
+    # SQLite picks its own pool; the sizing knobs only apply to server databases
+    if not url.startswith("sqlite"):
+        options.update(
+            poolclass=poolclass if settings.db_instrumentation else None,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=settings.db_pre_ping == "always",
+        )
+        if options["poolclass"] is None:
+            del options["poolclass"]
+    return options
+
+
+def _configure_engine(engine, name: str):
+    """Attach the pre-ping policy and instrumentation to a (sync) engine"""
+    if settings.db_pre_ping == "idle" and engine.dialect.name != "sqlite":
+        install_idle_pre_ping(engine, settings.db_pre_ping_idle_seconds)
+    if settings.db_instrumentation:
+        db_metrics.instrument(engine, name)
+    if settings.query_accounting:
+        query_accounting.install(engine)
+
 
 # Create database engine
 engine = create_engine(
     settings.database_url,
-    echo=settings.debug,
-    pool_pre_ping=True,
+    **_engine_options(
+        settings.database_url,
+        settings.db_pool_size,
+        settings.db_max_overflow,
+        settings.db_pool_timeout,
+        InstrumentedQueuePool,
+    ),
 )
+_configure_engine(engine, "sync")
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -24,8 +72,61 @@ def get_db() -> Session:
         db.close()
 
 
+# Async drivers for each sync dialect we support
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+_async_engine = None
+_async_session_factory = None
+
+
+def async_database_url(url: str) -> str:
+    """Translate the configured (sync) database URL to its async driver"""
+    parsed = make_url(url)
+    return parsed.set(drivername=_ASYNC_DRIVERS.get(parsed.get_backend_name(), parsed.drivername)).render_as_string(
+        hide_password=False
+    )
+
+
+def get_async_engine() -> AsyncEngine:
+    """Async engine, created on first use so the async driver is only imported when needed"""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        url = async_database_url(settings.database_url)
+        options = _engine_options(
+            url,
+            settings.async_db_pool_size,
+            settings.async_db_max_overflow,
+            settings.async_db_pool_timeout,
+            InstrumentedAsyncQueuePool,
+        )
+        if url.startswith("postgresql+asyncpg"):
+            options["connect_args"] = {
+                "prepared_statement_cache_size": settings.async_db_prepared_statement_cache_size,
+            }
+        _async_engine = create_async_engine(url, **options)
+        _configure_engine(_async_engine.sync_engine, "async")
+        # expire_on_commit=False: attribute access after commit must not trigger lazy IO
+        _async_session_factory = async_sessionmaker(_async_engine, expire_on_commit=False)
+    return _async_engine
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    """New async session"""
+    get_async_engine()
+    return _async_session_factory()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Get async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def init_db():
-    """Initialize database tables"""
+    """Create tables directly from the models (throwaway databases; deployments run alembic)"""
     Base.metadata.create_all(bind=engine)
 
 
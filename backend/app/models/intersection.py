@@ -1,5 +1,5 @@
 """Intersection model"""
-from sqlalchemy import Column, String, Float, Integer, ForeignKey, Text
+from sqlalchemy import Column, String, Float, Integer, ForeignKey, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from .base import BaseModel
 
@@ -7,6 +7,8 @@ from .base import BaseModel
 class Intersection(BaseModel):
     """Represents a traffic intersection"""
     __tablename__ = "intersections"
+    # Natural key, used by bulk loaders to upsert
+    __table_args__ = (UniqueConstraint("city_id", "name", name="uq_intersections_city_id_name"),)
     
     name = Column(String(255), nullable=False, index=True)
     city_id = Column(Integer, ForeignKey("cities.id"), nullable=False)
@@ -17,8 +19,8 @@ class Intersection(BaseModel):
     
     # Relationships
     city = relationship("City", back_populates="intersections")
-    lanes = relationship("Lane", back_populates="intersection", cascade="all, delete-orphan")
-    signals = relationship("Signal", back_populates="intersection", cascade="all, delete-orphan")
+    lanes = relationship("Lane", back_populates="intersection", cascade="all, delete-orphan", order_by="Lane.id")
+    signals = relationship("Signal", back_populates="intersection", cascade="all, delete-orphan", order_by="Signal.id")
     vehicles = relationship("Vehicle", back_populates="intersection")
     
     def __repr__(self):
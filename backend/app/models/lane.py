@@ -1,5 +1,5 @@
 """Lane model"""
-from sqlalchemy import Column, String, Float, Integer, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, String, Float, Integer, ForeignKey, Enum as SQLEnum, UniqueConstraint
 from sqlalchemy.orm import relationship
 from enum import Enum
 from .base import BaseModel
@@ -16,6 +16,7 @@ class Direction(str, Enum):
 class Lane(BaseModel):
     """Represents a lane in an intersection"""
     __tablename__ = "lanes"
+    __table_args__ = (UniqueConstraint("intersection_id", "name", name="uq_lanes_intersection_id_name"),)
     
     name = Column(String(255), nullable=False)
     intersection_id = Column(Integer, ForeignKey("intersections.id"), nullable=False)
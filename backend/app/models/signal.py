@@ -1,5 +1,5 @@
 """Signal model"""
-from sqlalchemy import Column, String, Integer, Float, ForeignKey, Enum as SQLEnum, Boolean
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, Enum as SQLEnum, Boolean, UniqueConstraint
 from sqlalchemy.orm import relationship
 from enum import Enum
 from .base import BaseModel
@@ -15,6 +15,7 @@ class SignalState(str, Enum):
 class Signal(BaseModel):
     """Represents a traffic signal"""
     __tablename__ = "signals"
+    __table_args__ = (UniqueConstraint("intersection_id", "name", name="uq_signals_intersection_id_name"),)
     
     name = Column(String(255), nullable=False)
     intersection_id = Column(Integer, ForeignKey("intersections.id"), nullable=False)
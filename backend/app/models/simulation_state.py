@@ -1,5 +1,5 @@
 """Simulation state model"""
-from sqlalchemy import Column, String, Float, Integer, ForeignKey, JSON
+from sqlalchemy import Column, String, Float, Integer, ForeignKey, JSON, DateTime
 from sqlalchemy.orm import relationship
 from .base import BaseModel
 
@@ -9,11 +9,13 @@ class SimulationState(BaseModel):
     __tablename__ = "simulation_states"
     
     city_id = Column(Integer, ForeignKey("cities.id"), nullable=False, index=True)
-    intersection_id = Column(Integer, ForeignKey("intersections.id"), nullable=True)
+    intersection_id = Column(Integer, ForeignKey("intersections.id"), nullable=True, index=True)
     
     # Simulation timing
     simulation_time = Column(Float, default=0.0, nullable=False)
     is_running = Column(Integer, default=0, nullable=False)  # 0 = stopped, 1 = running
+    # No vehicle still active in the current run was created before this
+    active_since = Column(DateTime, nullable=True)
     
     # Metrics
     total_vehicles = Column(Integer, default=0, nullable=False)
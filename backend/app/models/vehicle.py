@@ -1,5 +1,5 @@
 """Vehicle model"""
-from sqlalchemy import Column, String, Integer, Float, ForeignKey, Enum as SQLEnum, Boolean
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, Enum as SQLEnum, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from enum import Enum
 from .base import BaseModel
@@ -28,6 +28,24 @@ class VehicleState(str, Enum):
 class Vehicle(BaseModel):
     """Represents a vehicle in the simulation"""
     __tablename__ = "vehicles"
+    __table_args__ = (
+        # Active vehicles of an intersection in id order (simulation tick,
+        # live-state snapshot, change feed). Exited vehicles, most of the
+        # table once a simulation has run for a while, are left out.
+        Index(
+            "ix_vehicles_active_intersection_id", "intersection_id", "id",
+            postgresql_where=text("state <> 'EXITED'"), sqlite_where=text("state <> 'EXITED'"),
+        ),
+        # Lane occupancy (position < length) for injection and per-lane counts
+        Index("ix_vehicles_lane_id_position", "lane_id", "position"),
+        # Exited counts and state-filtered listings
+        Index("ix_vehicles_intersection_id_state", "intersection_id", "state"),
+        # Emergency corridor detection; emergency vehicles are few
+        Index(
+            "ix_vehicles_emergency_intersection_id", "intersection_id",
+            postgresql_where=text("is_emergency"), sqlite_where=text("is_emergency = 1"),
+        ),
+    )
     
     vehicle_id = Column(String(50), unique=True, nullable=False, index=True)
     vehicle_type = Column(SQLEnum(VehicleType), nullable=False)
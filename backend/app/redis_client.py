@@ -1,19 +1,29 @@
 """Redis connection and utilities"""
 import redis
+import redis.asyncio
 import json
 from app.config import settings
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
 
 # Create Redis client
 redis_client = redis.from_url(settings.redis_url, decode_responses=True)
 
 
+# Async client for coroutine handlers, so Redis round trips never block the event loop
+async_redis_client = redis.asyncio.from_url(settings.redis_url, decode_responses=True)
+
+
 def get_redis():
     """Get Redis client"""
     return redis_client
 
 
+def get_async_redis():
+    """Get async Redis client"""
+    return async_redis_client
+
+
 def cache_get(key: str) -> Optional[Any]:
     """Get cached value"""
     value = redis_client.get(key)
@@ -22,6 +32,13 @@ def cache_get(key: str) -> Optional[Any]:
     return None
 
 
+def cache_get_many(keys: Sequence[str]) -> Dict[str, Any]:
+    """Get several cached values in one round trip (MGET); missing keys are omitted"""
+    if not keys:
+        return {}
+    return {key: json.loads(value) for key, value in zip(keys, redis_client.mget(keys)) if value}
+
+
 def cache_set(key: str, value: Any, ttl: int = 3600):
     """Set cached value"""
     redis_client.setex(key, ttl, json.dumps(value))
@@ -32,8 +49,20 @@ def cache_delete(key: str):
     redis_client.delete(key)
 
 
-def cache_clear_pattern(pattern: str):
-    """Clear all keys matching pattern"""
-    keys = redis_client.keys(pattern)
+def scan_delete(client, pattern: str, batch: int = 500) -> int:
+    """Delete keys matching ``pattern`` incrementally (SCAN + UNLINK in batches)"""
+    deleted = 0
+    keys: List[str] = []
+    for key in client.scan_iter(match=pattern, count=batch):
+        keys.append(key)
+        if len(keys) >= batch:
+            deleted += client.unlink(*keys)
+            keys = []
     if keys:
-        redis_client.delete(*keys)
+        deleted += client.unlink(*keys)
+    return deleted
+
+
+def cache_clear_pattern(pattern: str) -> int:
+    """Clear all keys matching pattern without blocking Redis (never KEYS)"""
+    return scan_delete(redis_client, pattern)
@@ -15,6 +15,8 @@ __all__ = [
     "IntersectionCreate",
     "IntersectionUpdate",
     "IntersectionResponse",
+    "IntersectionLocation",
+    "NearbyIntersection",
     # Lane schemas
     "LaneCreate",
     "LaneResponse",
@@ -29,6 +31,8 @@ __all__ = [
     "VehicleType",
     # Simulation schemas
     "SimulationStart",
+    "TickProfiling",
+    "TickCaptureStart",
     "SimulationMetrics",
     "TrafficMetrics",
 ]
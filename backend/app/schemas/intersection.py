@@ -36,3 +36,17 @@ class IntersectionResponse(IntersectionBase):
     
     class Config:
         from_attributes = True
+
+
+class IntersectionLocation(BaseModel):
+    """Map marker for an intersection: where it is, without its details"""
+    id: int
+    name: str
+    city_id: int
+    latitude: float
+    longitude: float
+
+
+class NearbyIntersection(IntersectionLocation):
+    """Intersection found by a nearest-neighbour search"""
+    distance_m: float
@@ -10,6 +10,17 @@ class SimulationStart(BaseModel):
     speed_factor: float = Field(default=1.0, ge=0.1, le=10.0)
 
 
+class TickProfiling(BaseModel):
+    """Schema for switching tick phase timers"""
+    enabled: bool
+
+
+class TickCaptureStart(BaseModel):
+    """Schema for sampling an intersection's next ticks (until either limit is reached)"""
+    ticks: Optional[int] = Field(default=None, ge=1, le=100000)
+    seconds: Optional[float] = Field(default=None, gt=0)
+
+
 class LaneMetrics(BaseModel):
     """Lane traffic metrics"""
     lane_id: int
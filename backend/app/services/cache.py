@@ -0,0 +1,389 @@
+"""Two-level cache: bounded in-process LRU over Redis, with tag-based invalidation"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+import redis
+
+from app.redis_client import get_async_redis, get_redis, scan_delete
+from app.services.db_metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Per tag: (version in Redis, version bumped by this process)
+TagVector = Tuple[Tuple[int, int], ...]
+
+
+class LocalLRU:
+    """Bounded LRU whose entries also expire ``ttl`` seconds after being stored"""
+
+    def __init__(self, max_entries: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CacheStats:
+    """Hit/miss counters and Redis round-trip latency for one cache"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.l1_hits = 0
+            self.l2_hits = 0
+            self.misses = 0
+            self.sets = 0
+            self.invalidations = 0
+            self.errors = 0
+            self.redis_latency = Histogram()
+
+    def count(self, **increments: int):
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def observe(self, elapsed_seconds: float):
+        with self._lock:
+            self.redis_latency.observe(elapsed_seconds * 1000)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            lookups = self.l1_hits + self.l2_hits + self.misses
+            return {
+                "l1_hits": self.l1_hits,
+                "l2_hits": self.l2_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.l1_hits + self.l2_hits) / lookups, 4) if lookups else None,
+                "sets": self.sets,
+                "invalidations": self.invalidations,
+                "errors": self.errors,
+                "redis_latency": self.redis_latency.snapshot(),
+            }
+
+
+class TaggedCache:
+    """
+    Text values (JSON bodies) cached in-process (L1) and in Redis (L2).
+
+    Every key is stored under the current versions of its tags, so
+    invalidating a tag is one INCR: entries written under the old version
+    are simply never read again and expire by TTL. Nothing ever scans the
+    keyspace. Other workers see a tag bump within ``tag_refresh`` seconds;
+    this process sees its own bumps immediately, even with Redis down.
+
+    A version vector read before computing a value and passed back when
+    storing it makes the write race-free: if the tag was invalidated in
+    between, the value lands under a stale version and is never served.
+    """
+
+    REDIS_RETRY_SECONDS = 5.0
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: int = 300,
+        l1_entries: int = 1024,
+        l1_ttl: float = 30.0,
+        tag_refresh: float = 1.0,
+        client_factory: Callable = get_redis,
+        async_client_factory: Callable = get_async_redis,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.tag_refresh = tag_refresh
+        self.stats = CacheStats()
+        self._l1 = LocalLRU(l1_entries, l1_ttl, clock)
+        self._client_factory = client_factory
+        self._async_client_factory = async_client_factory
+        self._clock = clock
+        self._local_tags: Dict[str, int] = {}
+        self._remote_tags: Dict[str, Tuple[int, float]] = {}
+        self._pending_tags: Set[str] = set()
+        self._lock = threading.Lock()
+        self._redis_down_until = 0.0
+        caches[namespace] = self
+
+    # Keys
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.namespace}:tag:{tag}"
+
+    def _data_key(self, key: str, vector: TagVector) -> str:
+        if not vector:
+            return f"{self.namespace}:{key}"
+        return f"{self.namespace}:{key}@" + ".".join(str(remote) for remote, _ in vector)
+
+    # Tag versions
+
+    def _stale_tags(self, tags: Sequence[str]) -> List[str]:
+        now = self._clock()
+        with self._lock:
+            return [
+                tag for tag in tags
+                if tag not in self._remote_tags or now - self._remote_tags[tag][1] >= self.tag_refresh
+            ]
+
+    def _store_tags(self, tags: Sequence[str], values: Sequence[Optional[str]]):
+        now = self._clock()
+        with self._lock:
+            for tag, value in zip(tags, values):
+                self._remote_tags[tag] = (int(value or 0), now)
+
+    def _vector(self, tags: Sequence[str]) -> TagVector:
+        with self._lock:
+            return tuple(
+                (self._remote_tags.get(tag, (0, 0.0))[0], self._local_tags.get(tag, 0)) for tag in tags
+            )
+
+    def versions(self, tags: Sequence[str] = ()) -> TagVector:
+        """Current version vector of ``tags``; at most one MGET, only when a tag is due a refresh"""
+        if self._pending_tags and self._available():
+            self._replay_invalidations()
+        stale = self._stale_tags(tags)
+        if stale:
+            values = self._call(lambda client: client.mget([self._tag_key(t) for t in stale]))
+            if values is not None:
+                self._store_tags(stale, values)
+        return self._vector(tags)
+
+    async def aversions(self, tags: Sequence[str] = ()) -> TagVector:
+        """Async counterpart of ``versions``"""
+        if self._pending_tags and self._available():
+            # Rare (only after an outage), so the blocking replay is acceptable
+            self._replay_invalidations()
+        stale = self._stale_tags(tags)
+        if stale:
+            values = await self._acall(lambda client: client.mget([self._tag_key(t) for t in stale]))
+            if values is not None:
+                self._store_tags(stale, values)
+        return self._vector(tags)
+
+    # Reads
+
+    def _l1_lookup(self, keys: Sequence[str], vector: TagVector) -> Tuple[Dict[str, str], List[str]]:
+        found: Dict[str, str] = {}
+        missing: List[str] = []
+        for key in keys:
+            value = self._l1.get((key, vector))
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        self.stats.count(l1_hits=len(found))
+        return found, missing
+
+    def _l2_merge(self, found: Dict[str, str], missing: List[str], vector: TagVector, values: Optional[List]):
+        hits = 0
+        for key, value in zip(missing, values or [None] * len(missing)):
+            if value is not None:
+                found[key] = value
+                self._l1.put((key, vector), value)
+                hits += 1
+        self.stats.count(l2_hits=hits, misses=len(missing) - hits)
+        return found
+
+    def get_many(self, keys: Sequence[str], tags: Sequence[str] = (), vector: Optional[TagVector] = None) -> Dict[str, str]:
+        """Values for ``keys`` that are cached; L1 first, then one MGET for the rest"""
+        vector = self.versions(tags) if vector is None else vector
+        found, missing = self._l1_lookup(keys, vector)
+        if missing:
+            values = self._call(lambda client: client.mget([self._data_key(k, vector) for k in missing]))
+            self._l2_merge(found, missing, vector, values)
+        return found
+
+    async def aget_many(
+        self, keys: Sequence[str], tags: Sequence[str] = (), vector: Optional[TagVector] = None
+    ) -> Dict[str, str]:
+        """Async counterpart of ``get_many``"""
+        vector = await self.aversions(tags) if vector is None else vector
+        found, missing = self._l1_lookup(keys, vector)
+        if missing:
+            values = await self._acall(lambda client: client.mget([self._data_key(k, vector) for k in missing]))
+            self._l2_merge(found, missing, vector, values)
+        return found
+
+    def get(self, key: str, tags: Sequence[str] = (), vector: Optional[TagVector] = None) -> Optional[str]:
+        return self.get_many([key], tags, vector).get(key)
+
+    async def aget(self, key: str, tags: Sequence[str] = (), vector: Optional[TagVector] = None) -> Optional[str]:
+        return (await self.aget_many([key], tags, vector)).get(key)
+
+    # Writes
+
+    def _pipeline_set(self, client, items: Dict[str, str], vector: TagVector, ttl: Optional[int]):
+        pipe = client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.setex(self._data_key(key, vector), ttl or self.ttl, value)
+        return pipe
+
+    def _l1_store(self, items: Dict[str, str], vector: TagVector):
+        for key, value in items.items():
+            self._l1.put((key, vector), value)
+        self.stats.count(sets=len(items))
+
+    def set_many(
+        self,
+        items: Dict[str, str],
+        tags: Sequence[str] = (),
+        vector: Optional[TagVector] = None,
+        ttl: Optional[int] = None,
+    ):
+        """Store values under ``vector`` (default: the tags' current versions) in one pipeline"""
+        vector = self.versions(tags) if vector is None else vector
+        self._l1_store(items, vector)
+        self._call(lambda client: self._pipeline_set(client, items, vector, ttl).execute())
+
+    async def aset_many(
+        self,
+        items: Dict[str, str],
+        tags: Sequence[str] = (),
+        vector: Optional[TagVector] = None,
+        ttl: Optional[int] = None,
+    ):
+        """Async counterpart of ``set_many``"""
+        vector = await self.aversions(tags) if vector is None else vector
+        self._l1_store(items, vector)
+        await self._acall(lambda client: self._pipeline_set(client, items, vector, ttl).execute())
+
+    def set(self, key: str, value: str, tags: Sequence[str] = (), vector: Optional[TagVector] = None, ttl: Optional[int] = None):
+        self.set_many({key: value}, tags, vector, ttl)
+
+    async def aset(
+        self, key: str, value: str, tags: Sequence[str] = (), vector: Optional[TagVector] = None, ttl: Optional[int] = None
+    ):
+        await self.aset_many({key: value}, tags, vector, ttl)
+
+    def get_or_set(self, key: str, load: Callable[[], str], tags: Sequence[str] = ()) -> str:
+        """Cached value, or ``load()`` stored under the versions read before loading"""
+        vector = self.versions(tags)
+        value = self.get(key, vector=vector)
+        if value is None:
+            value = load()
+            self.set(key, value, vector=vector)
+        return value
+
+    # Invalidation and cleanup
+
+    def invalidate(self, *tags: str):
+        """Retire every entry carrying any of ``tags``: one pipelined INCR, no key scan"""
+        with self._lock:
+            for tag in tags:
+                self._local_tags[tag] = self._local_tags.get(tag, 0) + 1
+        self.stats.count(invalidations=len(tags))
+
+        def incr(client):
+            pipe = client.pipeline(transaction=False)
+            for tag in tags:
+                pipe.incr(self._tag_key(tag))
+            return pipe.execute()
+
+        values = self._call(incr)
+        if values is not None:
+            self._store_tags(tags, values)
+        else:
+            # Replayed once Redis is back, so L2 never serves the retired entries
+            with self._lock:
+                self._pending_tags.update(tags)
+
+    def _replay_invalidations(self):
+        with self._lock:
+            pending, self._pending_tags = self._pending_tags, set()
+        if pending:
+            self.invalidate(*pending)
+
+    def clear(self, match: str = "*", batch: int = 500) -> int:
+        """
+        Delete this namespace's Redis keys matching ``match`` with SCAN and
+        batched UNLINK, so Redis never blocks on a whole-keyspace walk.
+        Also empties L1. Returns the number of keys removed.
+        """
+        self._l1.clear()
+
+        def scan(client):
+            return scan_delete(client, f"{self.namespace}:{match}", batch)
+
+        return self._call(scan) or 0
+
+    def snapshot(self) -> Dict:
+        """JSON-ready stats"""
+        return {"namespace": self.namespace, "l1_entries": len(self._l1), **self.stats.snapshot()}
+
+    # Redis access with a circuit breaker
+
+    def _available(self) -> bool:
+        return self._clock() >= self._redis_down_until
+
+    def _call(self, operation: Callable[[Any], Any]) -> Optional[Any]:
+        if not self._available():
+            return None
+        started = time.perf_counter()
+        try:
+            return operation(self._client_factory())
+        except redis.RedisError as exc:
+            self._failed(exc)
+            return None
+        finally:
+            self.stats.observe(time.perf_counter() - started)
+
+    async def _acall(self, operation: Callable[[Any], Any]) -> Optional[Any]:
+        if not self._available():
+            return None
+        started = time.perf_counter()
+        try:
+            return await operation(self._async_client_factory())
+        except redis.RedisError as exc:
+            self._failed(exc)
+            return None
+        finally:
+            self.stats.observe(time.perf_counter() - started)
+
+    def _failed(self, exc: Exception):
+        # Serve from L1 only for a while instead of paying a failed round trip per read
+        logger.warning("Cache %s L2 unavailable: %s", self.namespace, exc)
+        self.stats.count(errors=1)
+        self._redis_down_until = self._clock() + self.REDIS_RETRY_SECONDS
+
+
+# Every cache by namespace, for the diagnostics endpoint
+caches: Dict[str, TaggedCache] = {}
+
+
+def cache_stats(namespaces: Optional[Iterable[str]] = None) -> List[Dict]:
+    """Stats for every registered cache, or the named ones"""
+    selected = caches if namespaces is None else {n: caches[n] for n in namespaces if n in caches}
+    return [cache.snapshot() for cache in selected.values()]
@@ -0,0 +1,309 @@
+"""Cross-worker simulation run state, ownership leases and change fan-out"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+import redis
+
+from app.config import settings
+from app.redis_client import get_async_redis, get_redis
+from app.simulation.change_feed import change_feed
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process in leases and pub/sub messages
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class LocalSimulationRegistry:
+    """Run state of each simulation, kept in this process"""
+
+    def __init__(self):
+        self._simulations: Dict[int, Dict] = {}
+        self._lock = threading.Lock()
+
+    def start(self, intersection_id: int, duration: int, speed_factor: float):
+        with self._lock:
+            self._simulations[intersection_id] = {
+                "running": True,
+                "duration": duration,
+                "speed_factor": speed_factor,
+                "elapsed": 0.0,
+            }
+
+    def stop(self, intersection_id: int):
+        with self._lock:
+            if intersection_id in self._simulations:
+                self._simulations[intersection_id]["running"] = False
+
+    def get(self, intersection_id: int) -> Optional[Dict]:
+        with self._lock:
+            simulation = self._simulations.get(intersection_id)
+            return dict(simulation) if simulation else None
+
+    def is_running(self, intersection_id: int) -> bool:
+        simulation = self.get(intersection_id)
+        return bool(simulation and simulation["running"])
+
+    def running(self) -> Dict[int, Dict]:
+        """Every running simulation by intersection id"""
+        with self._lock:
+            return {i: dict(s) for i, s in self._simulations.items() if s["running"]}
+
+    def advance(self, intersection_id: int, seconds: float) -> float:
+        """Add simulated time to a run; returns the new elapsed total"""
+        with self._lock:
+            simulation = self._simulations[intersection_id]
+            simulation["elapsed"] += seconds
+            return simulation["elapsed"]
+
+
+class RedisSimulationRegistry:
+    """
+    Run state shared by every worker. Each simulation is a Redis hash and
+    running ones are indexed in a set; fields are updated individually so a
+    stop never races with a ticker advancing ``elapsed``.
+    """
+
+    ACTIVE_KEY = "sim:active"
+
+    def __init__(self, client_factory: Callable = get_redis):
+        self._client_factory = client_factory
+
+    @staticmethod
+    def _key(intersection_id: int) -> str:
+        return f"sim:{intersection_id}"
+
+    @staticmethod
+    def _decode(raw: Dict[str, str]) -> Optional[Dict]:
+        if not raw:
+            return None
+        return {
+            "running": raw["running"] == "1",
+            "duration": int(raw["duration"]),
+            "speed_factor": float(raw["speed_factor"]),
+            "elapsed": float(raw["elapsed"]),
+        }
+
+    def start(self, intersection_id: int, duration: int, speed_factor: float):
+        pipe = self._client_factory().pipeline(transaction=True)
+        pipe.hset(self._key(intersection_id), mapping={
+            "running": 1,
+            "duration": duration,
+            "speed_factor": speed_factor,
+            "elapsed": 0.0,
+        })
+        pipe.sadd(self.ACTIVE_KEY, intersection_id)
+        pipe.execute()
+
+    def stop(self, intersection_id: int):
+        pipe = self._client_factory().pipeline(transaction=True)
+        pipe.srem(self.ACTIVE_KEY, intersection_id)
+        if self._client_factory().exists(self._key(intersection_id)):
+            pipe.hset(self._key(intersection_id), "running", 0)
+        pipe.execute()
+
+    def get(self, intersection_id: int) -> Optional[Dict]:
+        return self._decode(self._client_factory().hgetall(self._key(intersection_id)))
+
+    def is_running(self, intersection_id: int) -> bool:
+        simulation = self.get(intersection_id)
+        return bool(simulation and simulation["running"])
+
+    def running(self) -> Dict[int, Dict]:
+        """Every running simulation by intersection id"""
+        client = self._client_factory()
+        ids = [int(i) for i in client.smembers(self.ACTIVE_KEY)]
+        pipe = client.pipeline(transaction=False)
+        for intersection_id in ids:
+            pipe.hgetall(self._key(intersection_id))
+        simulations = zip(ids, (self._decode(raw) for raw in pipe.execute())) if ids else []
+        return {i: s for i, s in simulations if s and s["running"]}
+
+    def advance(self, intersection_id: int, seconds: float) -> float:
+        """Add simulated time to a run; returns the new elapsed total"""
+        return float(self._client_factory().hincrbyfloat(self._key(intersection_id), "elapsed", seconds))
+
+
+class LocalLeases:
+    """
+    Time-limited ownership of intersections within one process. ``table``
+    may be shared between instances to stand in for a shared store.
+    """
+
+    def __init__(
+        self,
+        worker_id: str = WORKER_ID,
+        ttl: float = 5.0,
+        table: Optional[Dict[int, Tuple[str, float]]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.worker_id = worker_id
+        self.ttl = ttl
+        self._table = table if table is not None else {}
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def acquire(self, intersection_id: int, holder: Optional[str] = None) -> bool:
+        """Take or renew the lease; False while someone else holds it"""
+        holder = holder or self.worker_id
+        with self._lock:
+            now = self._clock()
+            current = self._table.get(intersection_id)
+            if current is not None and current[0] != holder and current[1] > now:
+                return False
+            self._table[intersection_id] = (holder, now + self.ttl)
+            return True
+
+    def release(self, intersection_id: int, holder: Optional[str] = None):
+        holder = holder or self.worker_id
+        with self._lock:
+            current = self._table.get(intersection_id)
+            if current is not None and current[0] == holder:
+                del self._table[intersection_id]
+
+    def owner(self, intersection_id: int) -> Optional[str]:
+        with self._lock:
+            current = self._table.get(intersection_id)
+            return current[0] if current is not None and current[1] > self._clock() else None
+
+
+class RedisLeases:
+    """
+    Ownership leases in Redis. Acquire and renew are one atomic script, so
+    a worker only extends a lease it still holds; a worker that stops
+    renewing loses the intersection after ``ttl`` and another takes over.
+    """
+
+    ACQUIRE = """
+    local owner = redis.call('get', KEYS[1])
+    if not owner then
+        redis.call('set', KEYS[1], ARGV[1], 'px', ARGV[2])
+        return 1
+    elseif owner == ARGV[1] then
+        redis.call('pexpire', KEYS[1], ARGV[2])
+        return 1
+    end
+    return 0
+    """
+    RELEASE = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('del', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, worker_id: str = WORKER_ID, ttl: float = 5.0, client_factory: Callable = get_redis):
+        self.worker_id = worker_id
+        self.ttl = ttl
+        self._client_factory = client_factory
+        self._scripts = {}
+
+    @staticmethod
+    def _key(intersection_id: int) -> str:
+        return f"sim:lease:{intersection_id}"
+
+    def _script(self, source: str):
+        script = self._scripts.get(source)
+        if script is None:
+            script = self._scripts[source] = self._client_factory().register_script(source)
+        return script
+
+    def acquire(self, intersection_id: int, holder: Optional[str] = None) -> bool:
+        """Take or renew the lease; False while someone else holds it"""
+        args = [holder or self.worker_id, int(self.ttl * 1000)]
+        return bool(self._script(self.ACQUIRE)(keys=[self._key(intersection_id)], args=args))
+
+    def release(self, intersection_id: int, holder: Optional[str] = None):
+        self._script(self.RELEASE)(keys=[self._key(intersection_id)], args=[holder or self.worker_id])
+
+    def owner(self, intersection_id: int) -> Optional[str]:
+        return self._client_factory().get(self._key(intersection_id))
+
+
+class ChangeBus:
+    """
+    Fans change-feed updates out to the other workers over Redis pub/sub,
+    so every worker's feed and tick-keyed caches follow simulations ticked
+    elsewhere. Ticks carry every vehicle row, so a missed message is healed
+    by the next one.
+    """
+
+    CHANNEL_PREFIX = "sim:changes:"
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        worker_id: str = WORKER_ID,
+        client_factory: Callable = get_redis,
+        async_client_factory: Callable = get_async_redis,
+    ):
+        self.enabled = enabled
+        self.worker_id = worker_id
+        self._client_factory = client_factory
+        self._async_client_factory = async_client_factory
+
+    def publish(self, intersection_id: int, rows: Optional[List[Tuple]]):
+        """Change-feed listener: announce a local change"""
+        if not self.enabled:
+            return
+        message = json.dumps({"worker": self.worker_id, "intersection_id": intersection_id, "rows": rows})
+        try:
+            self._client_factory().publish(f"{self.CHANNEL_PREFIX}{intersection_id}", message)
+        except redis.RedisError as exc:
+            # The tick itself succeeded; peers catch up on the next one
+            logger.warning("Change fan-out failed: %s", exc)
+
+    def decode(self, data: str) -> Optional[Dict]:
+        """Parse a message, ignoring this worker's own"""
+        message = json.loads(data)
+        return None if message["worker"] == self.worker_id else message
+
+    async def listen(self, handle: Callable[[Dict], None], retry_seconds: float = 1.0):
+        """
+        Apply other workers' changes until cancelled. A message that fails
+        to decode or apply is logged and skipped; connection errors
+        resubscribe after ``retry_seconds``.
+        """
+        while True:
+            pubsub = self._async_client_factory().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(f"{self.CHANNEL_PREFIX}*")
+                async for raw in pubsub.listen():
+                    try:
+                        message = self.decode(raw["data"])
+                        if message is not None:
+                            handle(message)
+                    except Exception:
+                        # The next tick from that worker carries its rows again
+                        logger.exception("Skipping change message %r", raw.get("data"))
+            except redis.RedisError as exc:
+                logger.warning("Change subscription lost: %s", exc)
+                await asyncio.sleep(retry_seconds)
+            finally:
+                await pubsub.close()
+
+
+def apply_remote_change(message: Dict):
+    """Replay another worker's change on this worker's change feed"""
+    if message["rows"] is None:
+        change_feed.bump(message["intersection_id"], notify=False)
+    else:
+        change_feed.apply_rows(message["intersection_id"], message["rows"])
+
+
+if settings.simulation_coordination == "redis":
+    simulation_registry = RedisSimulationRegistry()
+    simulation_leases = RedisLeases(ttl=settings.simulation_lease_ttl)
+else:
+    simulation_registry = LocalSimulationRegistry()
+    simulation_leases = LocalLeases(ttl=settings.simulation_lease_ttl)
+
+change_bus = ChangeBus(enabled=settings.simulation_coordination == "redis")
+change_feed.listeners.append(change_bus.publish)
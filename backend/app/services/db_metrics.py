@@ -0,0 +1,201 @@
+"""Connection pool and statement instrumentation"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+# Upper bounds (milliseconds) shared by every latency histogram
+LATENCY_BUCKETS_MS = [0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\((?:\s*(?:\?|%\([^)]*\)s|\$\d+)\s*,?)+\)")
+
+
+def statement_shape(statement: str, max_length: int = 200) -> str:
+    """Normalize SQL so the same query with different bind counts groups together"""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _IN_LIST.sub("(...)", shape)
+    return shape[:max_length]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (cumulative on export)"""
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value_ms: float):
+        self.counts[bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile; None past the last bound"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return None
+
+    def snapshot(self) -> Dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets + [float("inf")], self.counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "sum_ms": round(self.total, 3),
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "buckets": buckets,
+        }
+
+
+class DatabaseMetrics:
+    """Collects checkout wait times, pool saturation and per-statement latency"""
+
+    def __init__(self, max_statements: int = 500):
+        self.max_statements = max_statements
+        self.checkout_wait = Histogram()
+        self.checkout_timeouts = 0
+        self.statements: Dict[str, Histogram] = {}
+        self.engines: Dict[str, Engine] = {}
+        self._lock = threading.Lock()
+
+    def observe_checkout(self, wait_seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.checkout_wait.observe(wait_seconds * 1000)
+            if timed_out:
+                self.checkout_timeouts += 1
+
+    def observe_statement(self, statement: str, elapsed_seconds: float):
+        shape = statement_shape(statement)
+        with self._lock:
+            histogram = self.statements.get(shape)
+            if histogram is None:
+                # Bound memory: unseen shapes past the limit share one bucket
+                if len(self.statements) >= self.max_statements:
+                    shape = "<other>"
+                    histogram = self.statements.get(shape)
+                if histogram is None:
+                    histogram = self.statements[shape] = Histogram()
+            histogram.observe(elapsed_seconds * 1000)
+
+    def instrument(self, engine: Engine, name: str):
+        """Attach statement timing to an engine and track its pool"""
+        self.engines[name] = engine
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info["query_started"].pop()
+            self.observe_statement(statement, time.perf_counter() - started)
+
+        @event.listens_for(engine, "handle_error")
+        def _error(context):
+            if context.connection is not None and context.connection.info.get("query_started"):
+                context.connection.info["query_started"].pop()
+
+    def pool_status(self, pool: Pool) -> Dict:
+        """Point-in-time pool occupancy"""
+        if not isinstance(pool, QueuePool):
+            return {"class": type(pool).__name__}
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        checked_out = pool.checkedout()
+        return {
+            "class": type(pool).__name__,
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": checked_out,
+            "idle": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "saturation": round(checked_out / capacity, 3) if capacity > 0 else None,
+        }
+
+    def snapshot(self, top: Optional[int] = 50) -> Dict:
+        """JSON-ready view of all collected metrics"""
+        with self._lock:
+            statements = sorted(
+                ((shape, h.snapshot()) for shape, h in self.statements.items()),
+                key=lambda item: item[1]["sum_ms"],
+                reverse=True,
+            )
+            return {
+                "pools": {name: self.pool_status(engine.pool) for name, engine in self.engines.items()},
+                "checkout_wait": self.checkout_wait.snapshot(),
+                "checkout_timeouts": self.checkout_timeouts,
+                "statements": [
+                    {"statement": shape, **stats} for shape, stats in statements[:top]
+                ],
+            }
+
+    def reset(self):
+        with self._lock:
+            self.checkout_wait = Histogram()
+            self.checkout_timeouts = 0
+            self.statements.clear()
+
+
+db_metrics = DatabaseMetrics()
+
+
+class _TimedCheckout:
+    """Mixin timing how long callers wait for a pooled connection"""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            db_metrics.observe_checkout(time.perf_counter() - started, timed_out=True)
+            raise
+        db_metrics.observe_checkout(time.perf_counter() - started)
+        return connection
+
+
+class InstrumentedQueuePool(_TimedCheckout, QueuePool):
+    """QueuePool that records checkout wait time"""
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    """Async-adapted QueuePool that records checkout wait time"""
+
+
+def install_idle_pre_ping(engine: Engine, idle_seconds: float):
+    """
+    Ping only connections that sat idle in the pool longer than
+    ``idle_seconds``; recently used connections skip the extra round trip.
+    A failed ping makes the pool replace the connection transparently.
+    """
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except Exception as error:
+            raise exc.DisconnectionError() from error
+        finally:
+            cursor.close()
@@ -0,0 +1,152 @@
+"""Micro-batched vehicle injection"""
+import asyncio
+import logging
+import math
+from collections import deque
+from typing import Callable, Deque, Dict, List, Tuple, Union
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.lane import Lane
+from app.models.vehicle import Vehicle, VehicleType
+from app.schemas.vehicle import VehicleCreate, VehicleResponse
+
+logger = logging.getLogger(__name__)
+
+
+class InjectionRejected(Exception):
+    """The batch could not admit a request (unknown lane, lane at capacity)"""
+
+
+class InjectionQueueFull(Exception):
+    """Too many requests are waiting; ``retry_after`` is the suggested wait in seconds"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Injection queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+Pending = Tuple[VehicleCreate, asyncio.Future]
+
+
+class InjectionQueue:
+    """
+    Coalesces concurrent inject requests per intersection. A request waits
+    at most one ``window`` (a simulation tick); then every request queued
+    for the intersection, up to ``batch_max``, is admitted against lane
+    capacity in memory and inserted in a single transaction. Each caller
+    receives its own outcome through a future. Once ``max_pending``
+    requests are waiting, new ones are refused with a retry hint instead
+    of piling up behind the database. A batch runs in a worker thread on a
+    sync session: besides the insert it writes live state and fans the
+    change out over Redis, and those clients block.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        simulation,
+        window: float = 0.1,
+        max_pending: int = 1000,
+        batch_max: int = 500,
+    ):
+        self.session_factory = session_factory
+        self.simulation = simulation
+        self.window = window
+        self.max_pending = max_pending
+        self.batch_max = batch_max
+        self._pending: Dict[int, Deque[Pending]] = {}
+        self._drainers: Dict[int, asyncio.Task] = {}
+
+    def pending(self, intersection_id: int) -> int:
+        """Requests waiting for an intersection"""
+        return len(self._pending.get(intersection_id, ()))
+
+    def retry_after(self, intersection_id: int) -> int:
+        """Whole seconds until the current backlog should have drained"""
+        batches = math.ceil(self.pending(intersection_id) / self.batch_max)
+        return max(1, math.ceil(batches * self.window))
+
+    async def submit(self, request: VehicleCreate) -> VehicleResponse:
+        """Queue a request and wait for the batch that decides it"""
+        loop = asyncio.get_running_loop()
+        intersection_id = request.intersection_id
+        queue = self._pending.setdefault(intersection_id, deque())
+        if len(queue) >= self.max_pending:
+            raise InjectionQueueFull(self.retry_after(intersection_id))
+
+        future = loop.create_future()
+        queue.append((request, future))
+        drainer = self._drainers.get(intersection_id)
+        if drainer is None or drainer.done():
+            self._drainers[intersection_id] = loop.create_task(self._drain(intersection_id))
+        return await future
+
+    async def _drain(self, intersection_id: int):
+        """Commit one batch per window until the intersection's queue is empty"""
+        queue = self._pending[intersection_id]
+        while queue:
+            await asyncio.sleep(self.window)
+            batch = [queue.popleft() for _ in range(min(len(queue), self.batch_max))]
+            # Callers that gave up (client disconnected) are not inserted
+            batch = [(request, future) for request, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            requests = [request for request, _ in batch]
+            try:
+                results = await asyncio.to_thread(self._admit_batch, intersection_id, requests)
+            except Exception as exc:
+                logger.exception("Injection batch for intersection %s failed", intersection_id)
+                results = [exc] * len(batch)
+
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _admit_batch(self, intersection_id: int, requests: List[VehicleCreate]):
+        with self.session_factory() as db:
+            return self.admit(db, intersection_id, requests)
+
+    def admit(
+        self, db: Session, intersection_id: int, requests: List[VehicleCreate]
+    ) -> List[Union[VehicleResponse, InjectionRejected]]:
+        """
+        Decide a whole batch with two queries (lanes, lane occupancy), then
+        insert the admitted vehicles in one commit. Results are in request order.
+        """
+        lane_ids = {request.lane_id for request in requests}
+        lanes = {lane.id: lane for lane in db.query(Lane).filter(Lane.id.in_(lane_ids))}
+        occupancy = dict(
+            db.query(Vehicle.lane_id, func.count(Vehicle.id))
+            .join(Lane, Lane.id == Vehicle.lane_id)
+            .filter(Vehicle.lane_id.in_(lane_ids), Vehicle.position < Lane.length)
+            .group_by(Vehicle.lane_id)
+            .all()
+        )
+
+        results: List[Union[VehicleResponse, InjectionRejected, None]] = []
+        admitted: List[int] = []
+        for request in requests:
+            lane = lanes.get(request.lane_id)
+            if lane is None:
+                results.append(InjectionRejected("Lane not found"))
+            elif occupancy.get(lane.id, 0) >= lane.capacity:
+                results.append(InjectionRejected("Lane is at capacity"))
+            else:
+                occupancy[lane.id] = occupancy.get(lane.id, 0) + 1
+                admitted.append(len(results))
+                results.append(None)
+
+        vehicles = self.simulation.add_vehicles(db, intersection_id, [
+            (requests[i].lane_id, VehicleType(requests[i].vehicle_type), requests[i].is_emergency)
+            for i in admitted
+        ])
+        for index, vehicle in zip(admitted, vehicles):
+            results[index] = VehicleResponse.model_validate(vehicle)
+        return results
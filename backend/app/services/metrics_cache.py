@@ -0,0 +1,159 @@
+"""Tick-aligned cache for simulation metrics"""
+import asyncio
+import json
+import threading
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.services.cache import TaggedCache
+from app.simulation.change_feed import change_feed
+
+
+class MetricsEntry(NamedTuple):
+    """Metrics for one tick, kept both parsed and serialized"""
+    version: int
+    payload: Dict[str, Any]
+    body: str
+
+
+class MetricsCache:
+    """
+    Caches metrics per (intersection, tick). The latest entry per
+    intersection is kept parsed in-process under this worker's change feed
+    version, which advances on every step, injection and signal or
+    run-state change, so a new tick invalidates it without any explicit
+    delete. Bodies are shared through ``l2`` under the tag
+    ``intersection:{id}``: the worker that commits a change bumps that tag
+    (``retire``), so its Redis version counts ticks the same way for every
+    worker, and peers skip the computation too.
+    """
+
+    def __init__(self, l2: TaggedCache):
+        self.l2 = l2
+        self._entries: Dict[int, MetricsEntry] = {}
+        self._locks: Dict[int, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._async_locks: Dict[int, asyncio.Lock] = {}
+        # Bumped by ``retire``; a reader stores its result only if it did not move
+        self._generations: Dict[int, int] = {}
+
+    def _lock(self, intersection_id: int) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(intersection_id, threading.Lock())
+
+    @staticmethod
+    def tag(intersection_id: int) -> str:
+        return f"intersection:{intersection_id}"
+
+    def peek(self, intersection_id: int) -> Optional[MetricsEntry]:
+        """Entry for the current tick, if cached, without touching the DB"""
+        entry = self._entries.get(intersection_id)
+        if entry is not None and entry.version == change_feed.loaded_version(intersection_id):
+            return entry
+        return None
+
+    def retire(self, intersection_id: int, rows: Optional[List[Tuple]] = None):
+        """
+        Change-feed listener, called after a local change is committed: bump
+        the intersection's shared tick, then drop the in-process entry. A
+        reader that started before the bump may hold pre-tick metrics under
+        the new feed version; it sees the generation move and keeps them out.
+        """
+        self.l2.invalidate(self.tag(intersection_id))
+        with self._locks_guard:
+            self._generations[intersection_id] = self._generations.get(intersection_id, 0) + 1
+            self._entries.pop(intersection_id, None)
+
+    def _generation(self, intersection_id: int) -> int:
+        with self._locks_guard:
+            return self._generations.get(intersection_id, 0)
+
+    def _store(self, intersection_id: int, entry: MetricsEntry, generation: int):
+        with self._locks_guard:
+            if (
+                self._generations.get(intersection_id, 0) == generation
+                and change_feed.loaded_version(intersection_id) == entry.version
+            ):
+                self._entries[intersection_id] = entry
+
+    def get_or_compute(
+        self,
+        db,
+        intersection_id: int,
+        compute: Callable[[], Dict[str, Any]],
+    ) -> MetricsEntry:
+        """Entry for the current tick, computing it at most once per tick"""
+        entry = self.peek(intersection_id)
+        if entry is not None:
+            return entry
+
+        # One reader computes; concurrent readers of the same tick wait for it
+        with self._lock(intersection_id):
+            generation = self._generation(intersection_id)
+            version = change_feed.version(db, intersection_id)
+            entry = self._entries.get(intersection_id)
+            if entry is not None and entry.version == version:
+                return entry
+
+            # Read before computing, so a tick committed meanwhile retires what is stored
+            vector = self.l2.versions((self.tag(intersection_id),))
+            body = self.l2.get(str(intersection_id), vector=vector)
+            if body is not None:
+                payload = json.loads(body)
+            else:
+                payload = compute()
+                body = json.dumps(payload)
+                self.l2.set(str(intersection_id), body, vector=vector)
+
+            entry = MetricsEntry(version, payload, body)
+            self._store(intersection_id, entry, generation)
+            return entry
+
+    async def aget_or_compute(
+        self,
+        db: AsyncSession,
+        intersection_id: int,
+        compute: Callable[[Session], Dict[str, Any]],
+    ) -> MetricsEntry:
+        """
+        Async counterpart of ``get_or_compute`` for coroutine handlers.
+        ``compute`` receives a sync session and runs via ``run_sync``; the
+        single-flight lock is an asyncio lock so waiting never blocks the loop.
+        """
+        entry = self.peek(intersection_id)
+        if entry is not None:
+            return entry
+
+        lock = self._async_locks.setdefault(intersection_id, asyncio.Lock())
+        async with lock:
+            generation = self._generation(intersection_id)
+            version = await db.run_sync(lambda session: change_feed.version(session, intersection_id))
+            entry = self._entries.get(intersection_id)
+            if entry is not None and entry.version == version:
+                return entry
+
+            vector = await self.l2.aversions((self.tag(intersection_id),))
+            body = await self.l2.aget(str(intersection_id), vector=vector)
+            if body is not None:
+                payload = json.loads(body)
+            else:
+                payload = await db.run_sync(compute)
+                body = json.dumps(payload)
+                await self.l2.aset(str(intersection_id), body, vector=vector)
+
+            entry = MetricsEntry(version, payload, body)
+            self._store(intersection_id, entry, generation)
+            return entry
+
+    def invalidate(self, intersection_id: int):
+        """Drop the in-process entry for an intersection"""
+        self._entries.pop(intersection_id, None)
+
+
+# Tag versions are re-read on every miss (once per tick): a stale one would serve the previous tick
+metrics_cache = MetricsCache(TaggedCache("metrics", ttl=settings.metrics_cache_ttl, l1_entries=0, tag_refresh=0))
+# Ahead of the change bus, so peers only apply a tick once its shared version has moved
+change_feed.listeners.insert(0, metrics_cache.retire)
@@ -0,0 +1,170 @@
+"""Daily range partitions of the vehicles table (PostgreSQL)"""
+import asyncio
+import logging
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+PARENT = "vehicles"
+# Serializes maintenance across workers; any fixed key will do
+ADVISORY_LOCK = 7243112001
+_UPPER_BOUND = re.compile(r"TO \('(\d{4}-\d{2}-\d{2})")
+
+
+@dataclass
+class Partition:
+    """One child of the partitioned vehicles table"""
+    name: str
+    upper: Optional[date]  # exclusive upper bound; None for the default partition
+    rows: int  # planner estimate
+
+
+def partition_name(day: date) -> str:
+    return f"{PARENT}_p{day:%Y%m%d}"
+
+
+def days_to_create(partitions: Sequence[Partition], today: date, days_ahead: int) -> List[date]:
+    """Days from today through ``today + days_ahead`` that no range partition covers yet"""
+    covered = max((p.upper for p in partitions if p.upper is not None), default=today)
+    start = max(covered, today)
+    last = today + timedelta(days=days_ahead)
+    return [start + timedelta(days=n) for n in range((last - start).days + 1)]
+
+
+def expired(partitions: Sequence[Partition], today: date, retention_days: int) -> List[Partition]:
+    """Range partitions whose rows are all older than the retention window"""
+    cutoff = today - timedelta(days=retention_days)
+    return [p for p in partitions if p.upper is not None and p.upper <= cutoff]
+
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(conn.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:parent))"),
+        {"parent": PARENT},
+    ).scalar())
+
+
+def list_partitions(conn: Connection) -> List[Partition]:
+    rows = conn.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint "
+        "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:parent) ORDER BY c.relname"
+    ), {"parent": PARENT})
+    partitions = []
+    for name, bound, rows_estimate in rows:
+        match = _UPPER_BOUND.search(bound)
+        upper = date.fromisoformat(match.group(1)) if match else None
+        partitions.append(Partition(name, upper, max(int(rows_estimate), 0)))
+    return partitions
+
+
+def create_partition(conn: Connection, day: date, default: Optional[str] = None):
+    """
+    Create a day's partition. Rows the default partition already caught for
+    that day would make the CREATE fail, so they are moved into the new
+    partition while the default is detached.
+    """
+    name = partition_name(day)
+    bounds = f"FROM ('{day}') TO ('{day + timedelta(days=1)}')"
+    in_day = f"created_at >= '{day}' AND created_at < '{day + timedelta(days=1)}'"
+    stranded = default is not None and conn.exec_driver_sql(
+        f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_day})"
+    ).scalar()
+    if not stranded:
+        conn.exec_driver_sql(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT} FOR VALUES {bounds}")
+        return
+
+    logger.warning("Moving %s's rows out of %s", day, default)
+    conn.exec_driver_sql(f"ALTER TABLE {PARENT} DETACH PARTITION {default}")
+    conn.exec_driver_sql(f"CREATE TABLE {name} PARTITION OF {PARENT} FOR VALUES {bounds}")
+    conn.exec_driver_sql(
+        f"WITH moved AS (DELETE FROM {default} WHERE {in_day} RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    )
+    conn.exec_driver_sql(f"ALTER TABLE {PARENT} ATTACH PARTITION {default} DEFAULT")
+
+
+def drop_partition(conn: Connection, partition: Partition) -> bool:
+    """Detach and drop a partition, unless it still holds vehicles on the road"""
+    active = conn.exec_driver_sql(
+        f"SELECT EXISTS (SELECT 1 FROM {partition.name} WHERE state <> 'EXITED')"
+    ).scalar()
+    if active:
+        logger.warning("Keeping expired partition %s: it still has active vehicles", partition.name)
+        return False
+    conn.exec_driver_sql(f"ALTER TABLE {PARENT} DETACH PARTITION {partition.name}")
+    conn.exec_driver_sql(f"DROP TABLE {partition.name}")
+    return True
+
+
+def maintain(
+    engine: Engine,
+    days_ahead: Optional[int] = None,
+    retention_days: Optional[int] = None,
+) -> Dict:
+    """
+    One maintenance pass: create the coming days' partitions and, when a
+    retention is set, drop the partitions that fell out of it. Dropping a
+    day is a catalog operation, not a DELETE. A day that cannot be created
+    is logged and left for the next pass; retention still runs.
+    """
+    days_ahead = settings.vehicle_partition_days_ahead if days_ahead is None else days_ahead
+    retention_days = settings.vehicle_retention_days if retention_days is None else retention_days
+
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            return {"partitioned": False}
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK})
+        # Partition DDL locks the parent; fail the pass rather than queue behind long queries
+        conn.exec_driver_sql("SET LOCAL lock_timeout = '5s'")
+        today = conn.execute(text("SELECT CURRENT_DATE")).scalar()
+
+        partitions = list_partitions(conn)
+        default = next((p.name for p in partitions if p.upper is None), None)
+        created, failed = [], []
+        for day in days_to_create(partitions, today, days_ahead):
+            try:
+                with conn.begin_nested():
+                    create_partition(conn, day, default)
+            except Exception:
+                logger.exception("Could not create vehicle partition for %s", day)
+                # Creating later days would move the covered range past this one;
+                # stop here so the next pass retries it
+                failed.append(partition_name(day))
+                break
+            created.append(partition_name(day))
+
+        dropped, kept = [], []
+        if retention_days > 0:
+            for partition in expired(partitions, today, retention_days):
+                (dropped if drop_partition(conn, partition) else kept).append(partition.name)
+
+    return {
+        "partitioned": True,
+        "created": created,
+        "failed": failed,
+        "dropped": dropped,
+        "kept": kept,
+    }
+
+
+async def run_partition_maintenance(engine: Engine):
+    """Maintain partitions at startup and then every ``vehicle_partition_interval`` seconds"""
+    while True:
+        try:
+            report = await asyncio.to_thread(maintain, engine)
+            if report.get("created") or report.get("dropped"):
+                logger.info("Vehicle partitions: created %s, dropped %s", report["created"], report["dropped"])
+        except Exception:
+            logger.exception("Vehicle partition maintenance failed")
+        await asyncio.sleep(settings.vehicle_partition_interval)
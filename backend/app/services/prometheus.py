@@ -0,0 +1,53 @@
+"""Prometheus text exposition for in-process metrics"""
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from app.services.db_metrics import Histogram
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# (name suffix, labels, value)
+Sample = Tuple[str, Dict[str, object], float]
+
+# Each returns complete metric families; GET /metrics concatenates them
+collectors: List[Callable[[], Iterable[str]]] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def family(name: str, kind: str, help_text: str, samples: Iterable[Sample]) -> List[str]:
+    """HELP and TYPE lines followed by one line per sample"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for suffix, labels, value in samples:
+        label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+        selector = f"{{{label_text}}}" if label_text else ""
+        lines.append(f"{name}{suffix}{selector} {_format_value(value)}")
+    return lines
+
+
+def histogram_samples(labels: Dict[str, object], histogram: Histogram) -> List[Sample]:
+    """Cumulative buckets, sum and count of a millisecond histogram, in seconds"""
+    samples = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets + [float("inf")], histogram.counts):
+        cumulative += count
+        le = "+Inf" if bound == float("inf") else repr(bound / 1000)
+        samples.append(("_bucket", {**labels, "le": le}, cumulative))
+    samples.append(("_sum", labels, histogram.total / 1000))
+    samples.append(("_count", labels, histogram.count))
+    return samples
+
+
+def render() -> str:
+    """Every registered collector's families as one exposition document"""
+    lines: List[str] = []
+    for collector in collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
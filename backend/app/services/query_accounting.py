@@ -0,0 +1,132 @@
+"""Per-request SQL statement accounting with N+1 detection"""
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+from app.services.db_metrics import statement_shape
+
+logger = logging.getLogger(__name__)
+
+
+class QueryAccount:
+    """Statements, database time and rows for one request (or tracked block)"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.rows = 0
+        # Keyed by statement text: a query issued per row repeats verbatim
+        self.statements: Counter = Counter()
+
+    def repeated(self, threshold: int = settings.query_repeat_threshold) -> List[Tuple[str, int]]:
+        """Statement shapes issued at least ``threshold`` times: likely N+1 loops"""
+        return [
+            (statement_shape(statement), count)
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+    def headers(self) -> List[Tuple[bytes, bytes]]:
+        headers = [
+            (b"x-db-queries", str(self.count).encode()),
+            (b"x-db-time-ms", f"{self.seconds * 1000:.2f}".encode()),
+            (b"x-db-rows", str(self.rows).encode()),
+        ]
+        repeated = self.repeated()
+        if repeated:
+            headers.append((b"x-db-repeated", str(len(repeated)).encode()))
+        return headers
+
+
+_current: ContextVar[Optional[QueryAccount]] = ContextVar("query_account", default=None)
+
+# Called with (label, account) when a tracked request finishes
+listeners: List[Callable[[str, QueryAccount], None]] = []
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryAccount]:
+    """Charge statements issued in this context (and threads started from it) to a new account"""
+    account = QueryAccount()
+    token = _current.set(account)
+    try:
+        yield account
+    finally:
+        _current.reset(token)
+
+
+def install(engine: Engine):
+    """Charge the engine's statements to whichever account is current"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("accounting_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        account = _current.get()
+        started = conn.info.get("accounting_started")
+        if account is None or not started:
+            return
+        account.seconds += time.perf_counter() - started.pop()
+        account.count += 1
+        account.statements[statement] += 1
+        # Rows returned where the driver reports them (PostgreSQL); sqlite3 only reports rows changed
+        if cursor.rowcount > 0:
+            account.rows += cursor.rowcount
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        if context.connection is not None and context.connection.info.get("accounting_started"):
+            context.connection.info["accounting_started"].pop()
+
+
+class QueryAccountingMiddleware:
+    """
+    Counts the statements each HTTP request issues and adds ``X-DB-Queries``,
+    ``X-DB-Time-Ms`` and ``X-DB-Rows`` response headers, plus ``X-DB-Repeated``
+    when a statement repeats ``query_repeat_threshold`` times. Repeats are
+    logged as likely N+1 queries. Statements issued while a streamed body is
+    being sent land after the headers, so they only show up in the log.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        label = f"{scope['method']} {scope['path']}"
+        with track_queries() as account:
+
+            async def send_with_headers(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = [*message.get("headers", []), *account.headers()]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_headers)
+            finally:
+                report(label, account)
+
+
+def report(label: str, account: QueryAccount):
+    """Log a finished request's totals and any repeated statements"""
+    for shape, count in account.repeated():
+        logger.warning("Likely N+1 in %s: %d x %s", label, count, shape)
+    logger.debug(
+        "%s: %d queries, %.2f ms, %d rows", label, account.count, account.seconds * 1000, account.rows,
+        extra={"db_queries": account.count, "db_time_ms": round(account.seconds * 1000, 2), "db_rows": account.rows},
+    )
+    for listener in listeners:
+        listener(label, account)
@@ -0,0 +1,118 @@
+"""Read-through cache of serialized API responses with ETags"""
+import hashlib
+from typing import Callable, NamedTuple, Optional
+
+from fastapi import Request, Response
+
+from app.config import settings
+from app.services.cache import TaggedCache, TagVector
+
+
+class CachedResponse(NamedTuple):
+    """Serialized response body and its strong ETag"""
+    body: bytes
+    etag: str
+
+
+# Quoted 32-hex-digit digest
+ETAG_LENGTH = 34
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag derived from the response bytes"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches an ETag"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    return "*" in candidates or etag in (c[2:] if c.startswith("W/") else c for c in candidates)
+
+
+class ResponseCache:
+    """
+    Serialized JSON responses on the shared two-level cache, grouped into
+    namespaces that write handlers invalidate. A namespace is a cache tag,
+    so invalidation is one counter bump seen by every worker, and a
+    response computed while an invalidation happened is never served.
+    """
+
+    def __init__(self, cache: TaggedCache):
+        self.cache = cache
+
+    @staticmethod
+    def _pack(entry: CachedResponse) -> str:
+        return entry.etag + entry.body.decode()
+
+    @staticmethod
+    def _unpack(value: Optional[str]) -> Optional[CachedResponse]:
+        if value is None:
+            return None
+        return CachedResponse(value[ETAG_LENGTH:].encode(), value[:ETAG_LENGTH])
+
+    def get(self, namespace: str, key: str, generation: Optional[TagVector] = None) -> Optional[CachedResponse]:
+        """Cached response, if any"""
+        return self._unpack(self.cache.get(key, (namespace,), generation))
+
+    async def aget(self, namespace: str, key: str, generation: Optional[TagVector] = None) -> Optional[CachedResponse]:
+        """Async counterpart of ``get``"""
+        return self._unpack(await self.cache.aget(key, (namespace,), generation))
+
+    def generation(self, namespace: str) -> TagVector:
+        """Current generation of a namespace"""
+        return self.cache.versions((namespace,))
+
+    async def ageneration(self, namespace: str) -> TagVector:
+        """Async counterpart of ``generation``"""
+        return await self.cache.aversions((namespace,))
+
+    def put(self, namespace: str, key: str, body: bytes, generation: Optional[TagVector] = None) -> CachedResponse:
+        """Store a body under ``generation``; if the namespace moved on since, it is never served"""
+        entry = CachedResponse(body, make_etag(body))
+        self.cache.set(key, self._pack(entry), (namespace,), generation)
+        return entry
+
+    async def aput(
+        self, namespace: str, key: str, body: bytes, generation: Optional[TagVector] = None
+    ) -> CachedResponse:
+        """Async counterpart of ``put``"""
+        entry = CachedResponse(body, make_etag(body))
+        await self.cache.aset(key, self._pack(entry), (namespace,), generation)
+        return entry
+
+    def invalidate(self, *namespaces: str):
+        """Drop every entry in the given namespaces"""
+        self.cache.invalidate(*namespaces)
+
+    def respond(
+        self,
+        request: Request,
+        namespace: str,
+        key: str,
+        load: Callable[[], bytes],
+    ) -> Response:
+        """
+        Serve a cached body, calling ``load`` on a miss. Answers 304 when the
+        client's If-None-Match already has the current ETag.
+        """
+        generation = self.generation(namespace)
+        entry = self.get(namespace, key, generation)
+        if entry is None:
+            entry = self.put(namespace, key, load(), generation)
+
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+response_cache = ResponseCache(TaggedCache(
+    "responses",
+    ttl=settings.cache_ttl,
+    l1_entries=settings.response_cache_entries,
+    l1_ttl=settings.cache_l1_ttl,
+    tag_refresh=settings.cache_tag_refresh,
+))
@@ -0,0 +1,172 @@
+"""In-process spatial index over intersection locations"""
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from app.models.intersection import Intersection
+from app.services.response_cache import response_cache
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+# Half-size of the first box tried by a nearest search (~1 km)
+NEAREST_START_DEGREES = 0.01
+
+
+def haversine_m(lat: float, lon: float, lats, lons):
+    """Great-circle distance in metres from one point to arrays of points"""
+    import numpy as np
+
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class _Snapshot:
+    """Immutable index over one generation of intersection rows (sorted by id)"""
+
+    def __init__(self, generation, rows: Sequence):
+        import numpy as np
+        import shapely
+
+        self.generation = generation
+        self.ids = np.array([row.id for row in rows], dtype=np.int64)
+        self.city_ids = np.array([row.city_id for row in rows], dtype=np.int64)
+        self.names = [row.name for row in rows]
+        self.lats = np.array([row.latitude for row in rows], dtype=float)
+        self.lons = np.array([row.longitude for row in rows], dtype=float)
+        self.tree = shapely.STRtree(shapely.points(self.lons, self.lats))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def box_around(self, lat: float, lon: float, degrees: float):
+        """Box holding every point within ``degrees`` of latitude-arc of (lat, lon)"""
+        import shapely
+
+        # Meridians converge poleward, so widen by the box's most poleward latitude
+        cos_lat = math.cos(math.radians(min(90.0, abs(lat) + degrees)))
+        lon_degrees = 180.0 if cos_lat < 1e-6 else min(180.0, degrees / cos_lat)
+        return shapely.box(lon - lon_degrees, lat - degrees, lon + lon_degrees, lat + degrees)
+
+    def row(self, index: int) -> Dict:
+        return {
+            "id": int(self.ids[index]),
+            "name": self.names[index],
+            "city_id": int(self.city_ids[index]),
+            "latitude": float(self.lats[index]),
+            "longitude": float(self.lons[index]),
+        }
+
+
+class IntersectionIndex:
+    """
+    Intersection points in a shapely STRtree, with their columns alongside
+    as arrays. Built on first use and rebuilt on the first query after the
+    ``intersections`` response-cache namespace is invalidated, which every
+    intersection write does; other workers notice within the cache's tag
+    refresh interval. Queries never touch the database otherwise.
+    """
+
+    def __init__(self, generation: Callable[[], object] = lambda: response_cache.generation("intersections")):
+        self._generation = generation
+        self._snapshot: Optional[_Snapshot] = None
+        # Single-flights rebuilds; only taken from sync request handlers
+        self._build_lock = threading.Lock()
+        self.builds = 0
+        self.build_ms = 0.0
+
+    def _current(self, db: Session) -> _Snapshot:
+        generation = self._generation()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.generation == generation:
+            return snapshot
+        with self._build_lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.generation == generation:
+                return snapshot
+            started = time.perf_counter()
+            # Generation is read before loading: a write racing the load
+            # leaves this snapshot stale, so the next query rebuilds again
+            rows = db.query(
+                Intersection.id, Intersection.city_id, Intersection.name,
+                Intersection.latitude, Intersection.longitude,
+            ).order_by(Intersection.id).all()
+            snapshot = _Snapshot(generation, rows)
+            self._snapshot = snapshot
+            self.builds += 1
+            self.build_ms = round((time.perf_counter() - started) * 1000, 1)
+            return snapshot
+
+    def within(
+        self,
+        db: Session,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+        city_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict]:
+        """Intersections inside a bounding box, in id order"""
+        import shapely
+
+        snapshot = self._current(db)
+        found = snapshot.tree.query(shapely.box(min_lon, min_lat, max_lon, max_lat))
+        found.sort()
+        if city_id is not None:
+            found = found[snapshot.city_ids[found] == city_id]
+        return [snapshot.row(i) for i in found[:limit]]
+
+    def nearest(
+        self,
+        db: Session,
+        lat: float,
+        lon: float,
+        k: int = 5,
+        max_distance_m: Optional[float] = None,
+    ) -> List[Dict]:
+        """
+        The ``k`` intersections closest to a point by great-circle distance.
+        Searches boxes growing fourfold until one holds ``k`` candidates,
+        then once more with a box wide enough for the k-th distance, since
+        a closer point may lie just outside the first box's corners.
+        """
+        import numpy as np
+
+        snapshot = self._current(db)
+        if not len(snapshot):
+            return []
+        limit_degrees = 180.0 if max_distance_m is None else max_distance_m / METERS_PER_DEGREE
+
+        degrees = min(NEAREST_START_DEGREES, limit_degrees)
+        found = snapshot.tree.query(snapshot.box_around(lat, lon, degrees))
+        while len(found) < k and degrees < limit_degrees:
+            degrees = min(degrees * 4, limit_degrees)
+            found = snapshot.tree.query(snapshot.box_around(lat, lon, degrees))
+
+        distances = haversine_m(lat, lon, snapshot.lats[found], snapshot.lons[found])
+        if len(found) >= k:
+            kth_degrees = np.partition(distances, k - 1)[k - 1] / METERS_PER_DEGREE
+            if kth_degrees > degrees:
+                found = snapshot.tree.query(snapshot.box_around(lat, lon, min(kth_degrees, limit_degrees)))
+                distances = haversine_m(lat, lon, snapshot.lats[found], snapshot.lons[found])
+
+        order = np.lexsort((snapshot.ids[found], distances))[:k]
+        if max_distance_m is not None:
+            order = order[distances[order] <= max_distance_m]
+        return [{**snapshot.row(found[i]), "distance_m": round(float(distances[i]), 1)} for i in order]
+
+    def snapshot(self) -> Dict:
+        current = self._snapshot
+        return {
+            "intersections": len(current) if current is not None else 0,
+            "builds": self.builds,
+            "last_build_ms": self.build_ms,
+        }
+
+
+intersection_index = IntersectionIndex()
@@ -0,0 +1,125 @@
+"""Shared tick broadcasting for WebSocket subscribers"""
+import asyncio
+import json
+import logging
+from typing import Any, Callable, Dict, Optional, Set
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """A single subscriber's bounded outbox"""
+
+    def __init__(self, key: int, queue_size: int, max_lag: int):
+        self.key = key
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.max_lag = max_lag
+        self.coalesced = 0  # messages replaced before the client read them
+        self.lag = 0  # consecutive coalesced messages
+        self.closed = False
+
+    def offer(self, message: str) -> bool:
+        """
+        Queue a message, replacing the oldest pending one when the outbox is
+        full. Returns False once the subscriber has lagged too long.
+        """
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.coalesced += 1
+            self.lag += 1
+            if self.lag > self.max_lag:
+                self.close()
+                return False
+        else:
+            self.lag = 0
+        self.queue.put_nowait(message)
+        return True
+
+    def close(self):
+        """Discard pending messages and wake the reader with a sentinel"""
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def get(self) -> Optional[str]:
+        """Wait for the next message; None means the subscription was dropped"""
+        return await self.queue.get()
+
+
+class TickBroadcaster:
+    """
+    Runs one producer per key while it has subscribers. Each tick the
+    producer calls ``compute(key)`` once, serializes the result once, and
+    fans the same text frame out to every subscriber.
+    """
+
+    def __init__(
+        self,
+        compute: Callable[[int], Dict[str, Any]],
+        interval: float,
+        queue_size: int = 1,
+        max_lag: int = 50,
+    ):
+        self.compute = compute
+        self.interval = interval
+        self.queue_size = queue_size
+        self.max_lag = max_lag
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._producers: Dict[int, asyncio.Task] = {}
+        self._latest: Dict[int, str] = {}
+
+    def subscribe(self, key: int) -> Subscription:
+        """Register a subscriber, starting the producer if needed"""
+        subscription = Subscription(key, self.queue_size, self.max_lag)
+        self._subscribers.setdefault(key, set()).add(subscription)
+
+        # Late joiners get the last frame immediately instead of waiting a tick
+        if key in self._latest:
+            subscription.offer(self._latest[key])
+
+        producer = self._producers.get(key)
+        if producer is None or producer.done():
+            self._producers[key] = asyncio.create_task(self._produce(key))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a subscriber; the producer stops with the last one"""
+        subscribers = self._subscribers.get(subscription.key)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.key]
+                self._latest.pop(subscription.key, None)
+
+    def subscriber_count(self, key: Optional[int] = None) -> int:
+        """Number of subscribers for a key, or across all keys"""
+        if key is not None:
+            return len(self._subscribers.get(key, ()))
+        return sum(len(subs) for subs in self._subscribers.values())
+
+    def publish(self, key: int, payload: Dict[str, Any]):
+        """Serialize a payload once and deliver it to every subscriber"""
+        message = json.dumps(payload, default=str)
+        self._latest[key] = message
+        for subscription in list(self._subscribers.get(key, ())):
+            if not subscription.offer(message):
+                logger.info("Dropping slow stream subscriber for %s", key)
+                self.unsubscribe(subscription)
+
+    async def _produce(self, key: int):
+        """Compute and publish one frame per interval while subscribed"""
+        loop = asyncio.get_running_loop()
+        while self._subscribers.get(key):
+            started = loop.time()
+            try:
+                payload = await run_in_threadpool(self.compute, key)
+            except Exception:
+                logger.exception("Stream computation failed for %s", key)
+            else:
+                self.publish(key, payload)
+            elapsed = loop.time() - started
+            await asyncio.sleep(max(0.0, self.interval - elapsed))
+        self._producers.pop(key, None)
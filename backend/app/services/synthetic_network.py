@@ -0,0 +1,282 @@
+"""Synthetic road networks for load testing, bulk-loaded with idempotent upserts"""
+import csv
+import io
+import math
+import random
+import time
+from dataclasses import asdict, dataclass
+from enum import Enum
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import Table, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Row
+from sqlalchemy.orm import Session
+
+from app.models.city import City
+from app.models.intersection import Intersection
+from app.models.lane import Direction, Lane
+from app.models.signal import Signal, SignalState
+
+# Mainland India, where synthetic city centres are placed
+LATITUDE_RANGE = (8.0, 32.0)
+LONGITUDE_RANGE = (69.0, 89.0)
+# Degrees between neighbouring junctions of a city grid (~500 m)
+GRID_SPACING = 0.005
+DIRECTIONS = list(Direction)
+
+# Bound parameters per statement stay under SQLite's and asyncpg's 32767 limit
+MAX_BOUND_PARAMETERS = 30000
+
+
+@dataclass(frozen=True)
+class NetworkProfile:
+    """Size of a generated network"""
+    cities: int
+    intersections_per_city: int
+    min_lanes: int = 4
+    max_lanes: int = 4
+    signals_per_intersection: int = 2
+
+
+PROFILES = {
+    "tiny": NetworkProfile(cities=2, intersections_per_city=10),
+    "small": NetworkProfile(cities=5, intersections_per_city=200, max_lanes=6),
+    "medium": NetworkProfile(cities=20, intersections_per_city=1000, max_lanes=8),
+    "large": NetworkProfile(cities=50, intersections_per_city=2000, max_lanes=8),
+}
+
+
+class NetworkGenerator:
+    """
+    Deterministic rows for a synthetic network. Every city and junction
+    draws from its own seeded RNG, so the same seed always produces the
+    same rows regardless of chunking, and reloading only updates in place.
+    """
+
+    def __init__(self, profile: NetworkProfile, seed: int = 42, prefix: str = "Synthetic"):
+        self.profile = profile
+        self.seed = seed
+        self.prefix = prefix
+
+    def _rng(self, *path) -> random.Random:
+        return random.Random(":".join(str(p) for p in (self.seed, *path)))
+
+    def city_name(self, index: int) -> str:
+        return f"{self.prefix} City {index + 1:03d}"
+
+    def cities(self) -> List[Dict]:
+        rows = []
+        for index in range(self.profile.cities):
+            rng = self._rng("city", index)
+            rows.append({
+                "name": self.city_name(index),
+                "state": f"{self.prefix} State {index % 10 + 1}",
+                "latitude": round(rng.uniform(*LATITUDE_RANGE), 6),
+                "longitude": round(rng.uniform(*LONGITUDE_RANGE), 6),
+                "description": "Synthetic load-test city",
+                "population": None,
+            })
+        return rows
+
+    def intersections(self, city_index: int, city: Dict, city_id: int) -> Iterator[Dict]:
+        """Junctions on a square grid around the city centre"""
+        count = self.profile.intersections_per_city
+        side = math.ceil(math.sqrt(count))
+        for index in range(count):
+            row, column = divmod(index, side)
+            rng = self._rng("junction", city_index, index)
+            yield {
+                "name": f"Junction {index + 1:05d}",
+                "city_id": city_id,
+                "latitude": round(city["latitude"] + (row - side / 2) * GRID_SPACING, 6),
+                "longitude": round(city["longitude"] + (column - side / 2) * GRID_SPACING, 6),
+                "description": None,
+                "num_lanes": rng.randint(self.profile.min_lanes, self.profile.max_lanes),
+            }
+
+    def lanes(self, city_index: int, junction_index: int, intersection_id: int, num_lanes: int) -> Iterator[Dict]:
+        """Approach lanes, cycling through the four directions"""
+        rng = self._rng("lanes", city_index, junction_index)
+        for index in range(num_lanes):
+            direction = DIRECTIONS[index % len(DIRECTIONS)]
+            yield {
+                "name": f"Lane {direction.value} {index // len(DIRECTIONS) + 1}",
+                "intersection_id": intersection_id,
+                "direction": direction,
+                "capacity": rng.choice((20, 30, 40)),
+                "length": round(rng.uniform(60.0, 200.0), 1),
+                "width": 3.5,
+            }
+
+    def signals(self, intersection_id: int) -> Iterator[Dict]:
+        """One signal per phase; phases alternate between red and green"""
+        count = self.profile.signals_per_intersection
+        names = ["Signal NS", "Signal EW"] if count == 2 else [f"Signal {i + 1}" for i in range(count)]
+        for index, name in enumerate(names):
+            yield {
+                "name": name,
+                "intersection_id": intersection_id,
+                "state": SignalState.RED if index % 2 == 0 else SignalState.GREEN,
+                "green_duration": 20,
+                "yellow_duration": 3,
+                "red_duration": 20,
+                "remaining_time": 0.0,
+                "is_optimized": False,
+            }
+
+
+def _copy_value(value):
+    return value.value if isinstance(value, Enum) else value
+
+
+class BulkLoader:
+    """
+    Chunked upserts keyed on a table's natural key. On Postgres with
+    psycopg2 each chunk is COPYed into a staging table and merged with one
+    INSERT ... SELECT ... ON CONFLICT; elsewhere it is a multi-row
+    INSERT ... ON CONFLICT. Existing rows are updated in place, so loading
+    the same network twice leaves it unchanged.
+    """
+
+    def __init__(self, connection: Connection, method: str = "auto", chunk_size: int = 5000):
+        if method not in ("auto", "copy", "insert"):
+            raise ValueError("method must be 'auto', 'copy' or 'insert'")
+        dialect = connection.dialect
+        if dialect.name not in ("postgresql", "sqlite"):
+            raise ValueError(f"Bulk upserts are not supported on {dialect.name}")
+        self.connection = connection
+        self.chunk_size = chunk_size
+        self.use_copy = method == "copy" or (
+            method == "auto" and dialect.name == "postgresql" and dialect.driver == "psycopg2"
+        )
+        self._insert = postgresql.insert if dialect.name == "postgresql" else sqlite.insert
+
+    def upsert(self, table: Table, rows: Sequence[Dict], keys: Sequence[str], returning: Sequence[str] = ()) -> List[Row]:
+        """Insert or update ``rows``; returns the ``returning`` columns of every row"""
+        if not rows:
+            return []
+        size = self.chunk_size
+        if not self.use_copy:
+            size = max(1, min(size, MAX_BOUND_PARAMETERS // len(rows[0])))
+        results: List[Row] = []
+        for start in range(0, len(rows), size):
+            chunk = rows[start:start + size]
+            if self.use_copy:
+                results.extend(self._copy_upsert(table, chunk, keys, returning))
+            else:
+                results.extend(self._insert_upsert(table, chunk, keys, returning))
+        return results
+
+    def _insert_upsert(self, table: Table, rows: Sequence[Dict], keys: Sequence[str], returning: Sequence[str]):
+        stmt = self._insert(table).values(list(rows))
+        updates = {column: stmt.excluded[column] for column in rows[0] if column not in keys}
+        updates["updated_at"] = func.now()
+        stmt = stmt.on_conflict_do_update(index_elements=list(keys), set_=updates)
+        if returning:
+            stmt = stmt.returning(*(table.c[column] for column in returning))
+            return self.connection.execute(stmt).all()
+        self.connection.execute(stmt)
+        return []
+
+    def _copy_upsert(self, table: Table, rows: Sequence[Dict], keys: Sequence[str], returning: Sequence[str]):
+        columns = list(rows[0])
+        column_list = ", ".join(columns)
+        stage = f"stage_{table.name}"
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([_copy_value(row[column]) for column in columns])
+        buffer.seek(0)
+
+        # Same DBAPI connection, so the COPY joins the surrounding transaction
+        cursor = self.connection.connection.cursor()
+        try:
+            # Column types only: no defaults, so staging never draws ids from the sequence
+            cursor.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {stage} AS "
+                f"SELECT {column_list} FROM {table.name} WITH NO DATA"
+            )
+            cursor.execute(f"TRUNCATE {stage}")
+            cursor.copy_expert(f"COPY {stage} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+
+        updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in columns if column not in keys)
+        sql = (
+            f"INSERT INTO {table.name} ({column_list}) SELECT {column_list} FROM {stage} "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates}, updated_at = now()"
+        )
+        if returning:
+            return self.connection.exec_driver_sql(sql + f" RETURNING {', '.join(returning)}").all()
+        self.connection.exec_driver_sql(sql)
+        return []
+
+
+@dataclass
+class LoadReport:
+    """Rows written per table and how long it took"""
+    cities: int = 0
+    intersections: int = 0
+    lanes: int = 0
+    signals: int = 0
+    seconds: float = 0.0
+    method: str = ""
+
+    @property
+    def rows(self) -> int:
+        return self.cities + self.intersections + self.lanes + self.signals
+
+    def as_dict(self) -> Dict:
+        report = asdict(self)
+        report["seconds"] = round(self.seconds, 3)
+        report["rows_per_second"] = round(self.rows / self.seconds) if self.seconds else None
+        return report
+
+
+def load_network(
+    db: Session,
+    generator: NetworkGenerator,
+    method: str = "auto",
+    chunk_size: int = 5000,
+    progress: Optional[Callable[[int, int, LoadReport], None]] = None,
+) -> LoadReport:
+    """
+    Upsert a generated network, committing once per city so a large load
+    keeps transactions bounded and an interrupted run can simply be repeated.
+    """
+    started = time.perf_counter()
+    loader = BulkLoader(db.connection(), method, chunk_size)
+    report = LoadReport(method="copy" if loader.use_copy else "insert")
+
+    cities = generator.cities()
+    city_ids = {row.name: row.id for row in loader.upsert(City.__table__, cities, ["name"], ["id", "name"])}
+    report.cities = len(cities)
+    db.commit()
+
+    for city_index, city in enumerate(cities):
+        loader = BulkLoader(db.connection(), method, chunk_size)
+        junctions = list(generator.intersections(city_index, city, city_ids[city["name"]]))
+        junction_index = {row["name"]: index for index, row in enumerate(junctions)}
+        saved = loader.upsert(
+            Intersection.__table__, junctions, ["city_id", "name"], ["id", "name", "num_lanes"]
+        )
+
+        lanes: List[Dict] = []
+        signals: List[Dict] = []
+        for row in saved:
+            lanes.extend(generator.lanes(city_index, junction_index[row.name], row.id, row.num_lanes))
+            signals.extend(generator.signals(row.id))
+        loader.upsert(Lane.__table__, lanes, ["intersection_id", "name"])
+        loader.upsert(Signal.__table__, signals, ["intersection_id", "name"])
+        db.commit()
+
+        report.intersections += len(junctions)
+        report.lanes += len(lanes)
+        report.signals += len(signals)
+        if progress is not None:
+            progress(city_index + 1, len(cities), report)
+
+    report.seconds = time.perf_counter() - started
+    return report
@@ -0,0 +1,231 @@
+"""On-demand sampling profiler for an intersection's next ticks"""
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional
+
+from app.config import settings
+
+# Returned while no capture is armed for the intersection
+_OFF = nullcontext()
+
+# Deeper stacks keep their innermost frames
+MAX_DEPTH = 128
+TRUNCATED = "[truncated]"
+# Distinct stacks past max_stacks are counted here
+OTHER = "[other stacks]"
+# The tick's frames were not on its thread: an async tick awaiting the database
+SUSPENDED = "[suspended]"
+
+
+def _frame_name(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+def collapse(frame, anchor) -> str:
+    """``root;...;leaf`` from ``anchor`` (the frame that entered the tick) down to ``frame``"""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        if frame is anchor:
+            break
+        frame = frame.f_back
+    else:
+        return f"{_frame_name(anchor)};{SUSPENDED}"
+    if len(names) > MAX_DEPTH:
+        names = names[:MAX_DEPTH] + [TRUNCATED]
+    return ";".join(reversed(names))
+
+
+class Capture:
+    """Sampled stacks of one intersection's ticks, until enough ticks or seconds have passed"""
+
+    def __init__(self, intersection_id: int, ticks: Optional[int], seconds: float, max_stacks: int):
+        self.intersection_id = intersection_id
+        self.max_ticks = ticks
+        self.seconds = seconds
+        self.max_stacks = max_stacks
+        self.started = time.monotonic()
+        self.ticks = 0
+        self.tick_seconds = 0.0
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self.reason: Optional[str] = None  # why it stopped: "ticks", "seconds" or "cancelled"
+        self.finished = threading.Event()
+        # Set while a tick is running: whose stack to sample, and where it starts
+        self.thread_id: Optional[int] = None
+        self.anchor = None
+
+    def add(self, stack: str):
+        self.samples += 1
+        if stack in self.stacks or len(self.stacks) < self.max_stacks:
+            self.stacks[stack] += 1
+        else:
+            self.stacks[OTHER] += 1
+
+    def finish(self, reason: str):
+        if self.reason is None:
+            self.reason = reason
+            self.thread_id = self.anchor = None
+            self.finished.set()
+
+    def expired(self) -> bool:
+        return time.monotonic() - self.started >= self.seconds
+
+    def top(self, limit: int) -> List[Dict]:
+        """Functions by samples spent in them (self) and under them (total), with the tick time that stands for"""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for name in set(frames):
+                total[name] += count
+        samples = self.samples or 1
+        ms_per_sample = self.tick_seconds * 1000 / samples
+        return [
+            {
+                "function": name,
+                "self_samples": count,
+                "self_pct": round(100 * count / samples, 1),
+                "self_ms": round(count * ms_per_sample, 2),
+                "total_samples": total[name],
+                "total_pct": round(100 * total[name] / samples, 1),
+                "total_ms": round(total[name] * ms_per_sample, 2),
+            }
+            for name, count in own.most_common(limit)
+        ]
+
+    def collapsed(self) -> str:
+        """One ``stack count`` line per stack, as read by flamegraph.pl and speedscope"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class TickCapture:
+    """
+    Arms a wall-clock sampling profiler for an intersection's next ``ticks``
+    ticks or ``seconds`` seconds, whichever ends first. While one of its
+    ticks runs, a background thread reads the ticking thread's stack every
+    ``interval`` seconds and counts it from ``run_tick`` down. Cost is one
+    dict lookup per tick when nothing is armed. Distinct stacks are capped
+    at ``max_stacks``, so a capture's memory is bounded whatever it runs
+    into. The last capture per intersection is kept until replaced or
+    discarded.
+    """
+
+    def __init__(
+        self,
+        interval: float = settings.tick_capture_interval_ms / 1000,
+        max_seconds: float = settings.tick_capture_max_seconds,
+        max_stacks: int = settings.tick_capture_max_stacks,
+    ):
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.max_stacks = max_stacks
+        self._armed: Dict[int, Capture] = {}
+        self._captures: Dict[int, Capture] = {}
+        self._sampler: Optional[threading.Thread] = None
+        # Never held across a query
+        self._lock = threading.Lock()
+
+    def start(self, intersection_id: int, ticks: Optional[int] = None, seconds: Optional[float] = None) -> Optional[Capture]:
+        """Arm a capture; None if one is already running for the intersection"""
+        seconds = min(seconds or self.max_seconds, self.max_seconds)
+        with self._lock:
+            if intersection_id in self._armed:
+                return None
+            capture = Capture(intersection_id, ticks, seconds, self.max_stacks)
+            self._armed[intersection_id] = self._captures[intersection_id] = capture
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, name="tick-capture", daemon=True)
+                self._sampler.start()
+        return capture
+
+    def discard(self, intersection_id: int) -> bool:
+        """Stop a running capture and forget its results"""
+        with self._lock:
+            capture = self._captures.pop(intersection_id, None)
+            if capture is None:
+                return False
+            self._finish(capture, "cancelled")
+        return True
+
+    def _finish(self, capture: Capture, reason: str):
+        # Callers hold the lock
+        capture.finish(reason)
+        if self._armed.get(capture.intersection_id) is capture:
+            del self._armed[capture.intersection_id]
+
+    def tick(self, intersection_id: int):
+        """Context manager around ``run_tick``: samples it when a capture is armed"""
+        capture = self._armed.get(intersection_id)
+        if capture is None:
+            return _OFF
+        return self._tick(capture, sys._getframe(1))
+
+    @contextmanager
+    def _tick(self, capture: Capture, anchor):
+        with self._lock:
+            if capture.reason is None and capture.thread_id is None:
+                capture.thread_id, capture.anchor = threading.get_ident(), anchor
+            else:
+                capture = None
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if capture is not None:
+                with self._lock:
+                    capture.thread_id = capture.anchor = None
+                    capture.ticks += 1
+                    capture.tick_seconds += time.perf_counter() - started
+                    if capture.max_ticks is not None and capture.ticks >= capture.max_ticks:
+                        self._finish(capture, "ticks")
+
+    def _sample(self):
+        """Sampler thread: runs while any capture is armed"""
+        while True:
+            frames = sys._current_frames()
+            with self._lock:
+                for capture in list(self._armed.values()):
+                    if capture.expired():
+                        self._finish(capture, "seconds")
+                    elif capture.thread_id is not None:
+                        capture.add(collapse(frames.get(capture.thread_id), capture.anchor))
+                if not self._armed:
+                    self._sampler = None
+                    return
+            del frames
+            time.sleep(self.interval)
+
+    def report(self, intersection_id: int, top: int = 25) -> Optional[Dict]:
+        """JSON-ready summary and top-functions table of the intersection's last capture"""
+        with self._lock:
+            capture = self._captures.get(intersection_id)
+            if capture is None:
+                return None
+            return {
+                "intersection_id": intersection_id,
+                "running": capture.reason is None,
+                "stopped_by": capture.reason,
+                "max_ticks": capture.max_ticks,
+                "max_seconds": capture.seconds,
+                "elapsed_s": round(time.monotonic() - capture.started, 3),
+                "ticks": capture.ticks,
+                "tick_ms": round(capture.tick_seconds * 1000, 2),
+                "samples": capture.samples,
+                "interval_ms": self.interval * 1000,
+                "stacks": len(capture.stacks),
+                "stacks_capped": OTHER in capture.stacks,
+                "top": capture.top(top),
+            }
+
+    def collapsed(self, intersection_id: int) -> Optional[str]:
+        with self._lock:
+            capture = self._captures.get(intersection_id)
+            return None if capture is None else capture.collapsed()
+
+
+tick_capture = TickCapture()
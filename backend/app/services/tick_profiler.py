@@ -0,0 +1,144 @@
+"""Per-tick phase timing for simulation ticks"""
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterable, List
+
+from app.config import settings
+from app.services import prometheus
+from app.services.db_metrics import Histogram
+
+# Returned while profiling is off: entering it costs a method call and yields None
+_OFF = nullcontext()
+
+
+class TickTimer:
+    """Splits one tick's wall time into named phases"""
+
+    __slots__ = ("started", "phases", "_mark")
+
+    def __init__(self):
+        self.started = self._mark = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def lap(self, phase: str):
+        """Charge the time since the previous lap to ``phase``"""
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._mark
+        self._mark = now
+
+
+class _IntersectionProfile:
+    def __init__(self):
+        self.phases: Dict[str, Histogram] = {}
+        self.ticks = 0
+        self.overruns = 0
+        self.last_tick: Dict[str, float] = {}
+
+
+class TickProfiler:
+    """
+    Per-intersection histograms of where tick time goes (loading rows,
+    leader lookup, physics, signals, change feed, optimizer, commit), plus
+    a count of ticks slower than ``simulation_tick_interval``.
+
+    ``tick(intersection_id)`` is opened once per tick, by ``run_tick``;
+    code it calls receives the timer as an argument and adds laps to it.
+    Time not charged to a phase is reported as ``other``. Off by default;
+    when off, ``tick`` returns a shared no-op context and instrumented code
+    skips its laps.
+    """
+
+    def __init__(self, enabled: bool = settings.simulation_profiling, budget: float = settings.simulation_tick_interval):
+        self.enabled = enabled
+        self.budget = budget
+        self._profiles: Dict[int, _IntersectionProfile] = {}
+        # Only guards histogram updates and reads, never held across a query
+        self._lock = threading.Lock()
+
+    def tick(self, intersection_id: int):
+        """Context manager yielding a new TickTimer for the intersection, or None when off"""
+        if not self.enabled:
+            return _OFF
+        return self._tick(intersection_id)
+
+    @contextmanager
+    def _tick(self, intersection_id: int):
+        timer = TickTimer()
+        yield timer
+        # Failed ticks are left out
+        self._record(intersection_id, timer, time.perf_counter() - timer.started)
+
+    def _record(self, intersection_id: int, timer: TickTimer, total: float):
+        phases = dict(timer.phases)
+        phases["other"] = max(0.0, total - sum(phases.values()))
+        phases["tick"] = total
+        with self._lock:
+            profile = self._profiles.get(intersection_id)
+            if profile is None:
+                profile = self._profiles[intersection_id] = _IntersectionProfile()
+            for phase, seconds in phases.items():
+                histogram = profile.phases.get(phase)
+                if histogram is None:
+                    histogram = profile.phases[phase] = Histogram()
+                histogram.observe(seconds * 1000)
+            profile.ticks += 1
+            if total > self.budget:
+                profile.overruns += 1
+            profile.last_tick = {phase: round(seconds * 1000, 3) for phase, seconds in phases.items()}
+
+    def snapshot(self, intersection_id: int) -> Dict:
+        """JSON-ready phase histograms for one intersection"""
+        with self._lock:
+            profile = self._profiles.get(intersection_id) or _IntersectionProfile()
+            phases = {
+                phase: {**histogram.snapshot(), "p50_ms": histogram.quantile(0.5), "p99_ms": histogram.quantile(0.99)}
+                for phase, histogram in sorted(profile.phases.items())
+            }
+            return {
+                "intersection_id": intersection_id,
+                "enabled": self.enabled,
+                "tick_budget_ms": self.budget * 1000,
+                "ticks": profile.ticks,
+                "overruns": profile.overruns,
+                "last_tick_ms": profile.last_tick,
+                "phases": phases,
+            }
+
+    def reset(self):
+        with self._lock:
+            self._profiles.clear()
+
+    def prometheus(self) -> Iterable[str]:
+        """Metric families for GET /metrics"""
+        with self._lock:
+            profiles = sorted(self._profiles.items())
+            phase_samples: List = []
+            for intersection_id, profile in profiles:
+                for phase, histogram in sorted(profile.phases.items()):
+                    phase_samples.extend(prometheus.histogram_samples(
+                        {"intersection_id": intersection_id, "phase": phase}, histogram
+                    ))
+            ticks = [("", {"intersection_id": i}, p.ticks) for i, p in profiles]
+            overruns = [("", {"intersection_id": i}, p.overruns) for i, p in profiles]
+        return [
+            *prometheus.family(
+                "traffic_tick_profiling_enabled", "gauge", "Whether tick phase timers are on",
+                [("", {}, int(self.enabled))],
+            ),
+            *prometheus.family(
+                "traffic_tick_budget_seconds", "gauge", "Tick duration counted as an overrun above this",
+                [("", {}, self.budget)],
+            ),
+            *prometheus.family("traffic_ticks_total", "counter", "Profiled simulation ticks", ticks),
+            *prometheus.family(
+                "traffic_tick_overruns_total", "counter", "Profiled ticks slower than the tick interval", overruns
+            ),
+            *prometheus.family(
+                "traffic_tick_phase_seconds", "histogram", "Time spent per tick phase", phase_samples
+            ),
+        ]
+
+
+tick_profiler = TickProfiler()
+prometheus.collectors.append(tick_profiler.prometheus)
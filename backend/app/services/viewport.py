@@ -0,0 +1,173 @@
+"""Viewport-filtered vehicle streaming for map clients"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.services.spatial import IntersectionIndex, intersection_index
+from app.simulation.change_feed import FEED_FIELDS, SUMMARY_FIELDS, VehicleChangeFeed, change_feed
+
+VEHICLES = "vehicles"
+AGGREGATES = "aggregates"
+# Row layout of aggregate updates
+AGGREGATE_FIELDS = ["intersection_id", "version", *SUMMARY_FIELDS]
+
+
+@dataclass(frozen=True)
+class ViewportRequest:
+    """Map bounds and zoom a client wants to watch"""
+    min_lat: float
+    min_lon: float
+    max_lat: float
+    max_lon: float
+    zoom: float
+    city_id: Optional[int] = None
+
+    @classmethod
+    def parse(cls, message: Dict) -> "ViewportRequest":
+        """Validate a client message; raises ValueError with a readable reason"""
+        if not isinstance(message, dict):
+            raise ValueError("Viewport message must be a JSON object")
+        try:
+            request = cls(
+                min_lat=float(message["min_lat"]),
+                min_lon=float(message["min_lon"]),
+                max_lat=float(message["max_lat"]),
+                max_lon=float(message["max_lon"]),
+                zoom=float(message["zoom"]),
+                city_id=int(message["city_id"]) if message.get("city_id") is not None else None,
+            )
+        except KeyError as exc:
+            raise ValueError(f"Missing field {exc.args[0]}") from None
+        except (TypeError, ValueError):
+            raise ValueError("Viewport fields must be numbers") from None
+        if request.min_lat > request.max_lat or request.min_lon > request.max_lon:
+            raise ValueError("Bounding box minimum exceeds maximum")
+        return request
+
+
+class Viewport:
+    """
+    One client's visible intersections and the feed version it last saw
+    for each. Frames carry only intersections whose feed moved since then,
+    so a quiet map costs a dictionary lookup per visible intersection and
+    sends nothing. At ``detail_zoom`` and above, with at most
+    ``detail_max`` intersections in view, frames carry vehicle deltas;
+    otherwise one row of totals per intersection.
+
+    Moving the viewport keeps the cursors of intersections still in view:
+    only intersections entering it are sent in full.
+    """
+
+    def __init__(
+        self,
+        index: IntersectionIndex = intersection_index,
+        feed: VehicleChangeFeed = change_feed,
+        detail_zoom: float = settings.viewport_detail_zoom,
+        detail_max: int = settings.viewport_detail_max,
+        max_intersections: int = settings.viewport_max_intersections,
+    ):
+        self.index = index
+        self.feed = feed
+        self.detail_zoom = detail_zoom
+        self.detail_max = detail_max
+        self.max_intersections = max_intersections
+        self.mode: Optional[str] = None
+        self.ids: List[int] = []
+        self.truncated = False
+        self._cursors: Dict[int, int] = {}
+        self._totals: Dict[int, Tuple] = {}
+        self._entered: List[List] = []
+        self._left: Set[int] = set()
+        self._announce = False
+
+    def update(self, db: Session, request: ViewportRequest):
+        """Switch to a new viewport; the next frame reports what entered and left"""
+        found = self.index.within(
+            db, request.min_lat, request.min_lon, request.max_lat, request.max_lon,
+            city_id=request.city_id, limit=self.max_intersections + 1,
+        )
+        self.truncated = len(found) > self.max_intersections
+        found = found[:self.max_intersections]
+        detailed = request.zoom >= self.detail_zoom and len(found) <= self.detail_max
+        mode = VEHICLES if detailed else AGGREGATES
+        if mode != self.mode:
+            self._cursors.clear()
+            self._totals.clear()
+            self.mode = mode
+
+        ids = [row["id"] for row in found]
+        visible, previous = set(ids), set(self.ids)
+        for intersection_id in previous - visible:
+            self._cursors.pop(intersection_id, None)
+            self._totals.pop(intersection_id, None)
+            self._left.add(intersection_id)
+        self._left -= visible
+        # Accumulates until the next frame, in case the viewport moves twice in between
+        self._entered = [row for row in self._entered if row[0] in visible] + [
+            [row["id"], row["latitude"], row["longitude"]] for row in found if row["id"] not in previous
+        ]
+        self.ids = ids
+        self.feed.preload(db, ids)
+        self._announce = True
+
+    def frame(self, db: Session) -> Optional[Dict]:
+        """Changes since the last frame, or None when there is nothing to send"""
+        if self.mode is None:
+            return None
+        updates = self._vehicle_updates(db) if self.mode == VEHICLES else self._aggregate_updates(db)
+        if not updates and not self._announce:
+            return None
+
+        frame = {
+            "type": "viewport",
+            "mode": self.mode,
+            "visible": len(self.ids),
+            "truncated": self.truncated,
+            "entered": self._entered,
+            "left": sorted(self._left),
+            "fields": FEED_FIELDS if self.mode == VEHICLES else AGGREGATE_FIELDS,
+            "updates": updates,
+        }
+        self._entered = []
+        self._left = set()
+        self._announce = False
+        return frame
+
+    def _stale(self, intersection_id: int) -> bool:
+        cursor = self._cursors.get(intersection_id)
+        return cursor is None or cursor != self.feed.loaded_version(intersection_id)
+
+    def _vehicle_updates(self, db: Session) -> List[Dict]:
+        updates = []
+        for intersection_id in self.ids:
+            if not self._stale(intersection_id):
+                continue
+            # Cursors never leave this process, so they always count from its feed's origin
+            delta = self.feed.changes_since(
+                db, intersection_id, self._cursors.get(intersection_id), self.feed.origin(db, intersection_id)
+            )
+            self._cursors[intersection_id] = delta["version"]
+            # Signal and run-state bumps move the version without touching vehicles
+            if delta["full"] or delta["upserts"] or delta["removed"]:
+                updates.append({
+                    "intersection_id": intersection_id,
+                    "version": delta["version"],
+                    "full": delta["full"],
+                    "upserts": delta["upserts"],
+                    "removed": delta["removed"],
+                })
+        return updates
+
+    def _aggregate_updates(self, db: Session) -> List[List]:
+        updates = []
+        for intersection_id in self.ids:
+            if not self._stale(intersection_id):
+                continue
+            version, totals = self.feed.summary(db, intersection_id)
+            self._cursors[intersection_id] = version
+            if self._totals.get(intersection_id) != totals:
+                self._totals[intersection_id] = totals
+                updates.append([intersection_id, version, *totals])
+        return updates
@@ -0,0 +1,83 @@
+"""Post-startup warm-up and readiness reporting"""
+import asyncio
+import importlib
+import logging
+import os
+import time
+from typing import Dict, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+# Deliberately not imported at startup; loaded here once the app is serving
+# so the first request that needs them does not pay the import
+HEAVY_MODULES = ("numpy", "msgpack", "shapely")
+
+ALEMBIC_INI = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "alembic.ini"))
+
+
+def migration_head(config_path: str = ALEMBIC_INI) -> Optional[str]:
+    """Newest revision in the migrations directory"""
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(config_path)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(config_path), "alembic"))
+    return ScriptDirectory.from_config(config).get_current_head()
+
+
+def schema_status(engine: Engine, head: Optional[str]) -> Dict:
+    """Whether the database is reachable and migrated to ``head``"""
+    try:
+        with engine.connect() as connection:
+            try:
+                revision = connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+            except DBAPIError:
+                return {"status": "unmigrated", "revision": None, "head": head}
+    except DBAPIError as exc:
+        return {"status": "unreachable", "error": str(exc.orig)}
+    return {"status": "ok" if revision == head else "outdated", "revision": revision, "head": head}
+
+
+class Warmup:
+    """
+    Background steps run once after startup: import the lazily loaded
+    modules and resolve the migration head. Each step's duration is kept
+    for the readiness report.
+    """
+
+    def __init__(self, modules: Sequence[str] = HEAVY_MODULES):
+        self.modules = modules
+        self.steps: Dict[str, Dict] = {}
+        self.head: Optional[str] = None
+        self.done = False
+
+    def _timed(self, name: str, step):
+        started = time.perf_counter()
+        try:
+            result = step()
+        except Exception as exc:
+            logger.warning("Warm-up step %s failed: %s", name, exc)
+            self.steps[name] = {"status": "failed", "error": str(exc)}
+            return None
+        self.steps[name] = {"status": "done", "ms": round((time.perf_counter() - started) * 1000, 1)}
+        return result
+
+    def run_sync(self):
+        for name in self.modules:
+            self._timed(name, lambda: importlib.import_module(name))
+        self.head = self._timed("migrations", migration_head)
+        self.done = True
+
+    async def run(self):
+        """Warm up in a worker thread, leaving the event loop free to serve"""
+        await asyncio.to_thread(self.run_sync)
+
+    def snapshot(self) -> Dict:
+        return {"warmed_up": self.done, "steps": dict(self.steps)}
+
+
+warmup = Warmup()
@@ -0,0 +1,176 @@
+"""Columnar MessagePack encoding for bulk payloads"""
+import math
+from datetime import timezone
+from enum import Enum
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import Request, Response
+
+# numpy and msgpack are imported inside the functions that use them, so
+# startup and JSON-only traffic never load them (see app/services/warmup.py)
+
+from app.models.vehicle import VehicleState, VehicleType
+
+MSGPACK_MEDIA_TYPES = ("application/x-msgpack", "application/msgpack", "application/vnd.msgpack")
+MSGPACK_MEDIA_TYPE = MSGPACK_MEDIA_TYPES[0]
+COLUMNAR_FORMAT = "columnar/1"
+
+# Column encodings for vehicle fields. Numeric columns become little-endian
+# typed arrays (positions as float32); nullable ints use -1 and nullable
+# floats NaN; enums are dictionary-encoded to uint8 codes; timestamps are
+# epoch milliseconds.
+VEHICLE_COLUMN_TYPES = {
+    "id": "<u4",
+    "intersection_id": "<u4",
+    "lane_id": "<i4",
+    "position": "<f4",
+    "speed": "<f4",
+    "max_speed": "<f4",
+    "waiting_time": "<i4",
+    "entry_time": "<f8",
+    "exit_time": "<f8",
+    "is_emergency": "|u1",
+    "vehicle_type": [t.value for t in VehicleType],
+    "state": [s.value for s in VehicleState],
+    "vehicle_id": "str",
+    "created_at": "timestamp",
+    "updated_at": "timestamp",
+}
+
+
+def _media_ranges(accept: str) -> List[tuple]:
+    """``(type, subtype, q)`` for each range in an Accept header; malformed q counts as 0"""
+    ranges = []
+    for part in accept.split(","):
+        media_range, *params = [p.strip() for p in part.split(";")]
+        kind, _, subtype = media_range.lower().partition("/")
+        if not kind or not subtype:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+        ranges.append((kind, subtype, q))
+    return ranges
+
+
+def _quality(ranges: Sequence[tuple], media_type: str) -> float:
+    """q of the most specific range matching ``media_type`` (exact, then type/*, then */*)"""
+    kind, _, subtype = media_type.partition("/")
+    best, best_q = -1, 0.0
+    for range_kind, range_subtype, q in ranges:
+        if (range_kind, range_subtype) == (kind, subtype):
+            specificity = 2
+        elif range_kind == kind and range_subtype == "*":
+            specificity = 1
+        elif (range_kind, range_subtype) == ("*", "*"):
+            specificity = 0
+        else:
+            continue
+        if specificity > best:
+            best, best_q = specificity, q
+    return best_q
+
+
+def wants_msgpack(request: Request) -> bool:
+    """
+    Whether MessagePack ranks strictly above JSON in the client's Accept
+    header, by q-value; ties (``*/*``, no header) stay JSON.
+    """
+    ranges = _media_ranges(request.headers.get("accept", ""))
+    msgpack_q = max(_quality(ranges, media_type) for media_type in MSGPACK_MEDIA_TYPES)
+    return msgpack_q > 0 and msgpack_q > _quality(ranges, "application/json")
+
+
+def _encode_column(kind, values: Sequence[Any]) -> Dict[str, Any]:
+    import numpy as np
+
+    if isinstance(kind, list):
+        codes = {label: code for code, label in enumerate(kind)}
+        data = np.fromiter(
+            (codes[v.value if isinstance(v, Enum) else v] for v in values),
+            dtype="|u1",
+            count=len(values),
+        )
+        return {"type": "dict", "labels": kind, "data": data.tobytes()}
+    if kind == "str":
+        return {"type": "str", "data": list(values)}
+    if kind == "timestamp":
+        data = np.fromiter(
+            (
+                int(v.replace(tzinfo=v.tzinfo or timezone.utc).timestamp() * 1000) if v is not None else 0
+                for v in values
+            ),
+            dtype="<i8",
+            count=len(values),
+        )
+        return {"type": "timestamp_ms", "dtype": "<i8", "data": data.tobytes()}
+
+    dtype = np.dtype(kind)
+    if dtype.kind == "f":
+        data = np.array([math.nan if v is None else v for v in values], dtype=dtype)
+    elif dtype.kind == "i":
+        data = np.array([-1 if v is None else v for v in values], dtype=dtype)
+    else:
+        data = np.array(values, dtype=dtype)
+    return {"type": "array", "dtype": dtype.str, "data": data.tobytes()}
+
+
+def encode_columnar(
+    columns: List[str],
+    rows: Sequence[Sequence[Any]],
+    column_types: Dict[str, Any] = VEHICLE_COLUMN_TYPES,
+    **extra: Any,
+) -> bytes:
+    """
+    Pack positional rows into one MessagePack map of typed column buffers.
+    Rows are transposed once; no per-row dict or model is built.
+    """
+    import msgpack
+
+    transposed = list(zip(*rows)) if rows else [() for _ in columns]
+    frame = {
+        "format": COLUMNAR_FORMAT,
+        "length": len(rows),
+        "columns": {
+            name: _encode_column(column_types.get(name, "str"), values)
+            for name, values in zip(columns, transposed)
+        },
+    }
+    frame.update(extra)
+    return msgpack.packb(frame, use_bin_type=True)
+
+
+def decode_columnar(payload: bytes) -> Dict[str, Any]:
+    """Unpack a columnar frame back into numpy arrays / lists (for Python clients and tests)"""
+    import msgpack
+    import numpy as np
+
+    frame = msgpack.unpackb(payload, raw=False)
+    columns = {}
+    for name, column in frame.get("columns", {}).items():
+        if column["type"] == "dict":
+            codes = np.frombuffer(column["data"], dtype="|u1")
+            columns[name] = [column["labels"][c] for c in codes]
+        elif column["type"] == "str":
+            columns[name] = column["data"]
+        else:
+            columns[name] = np.frombuffer(column["data"], dtype=column["dtype"])
+    frame["columns"] = columns
+    return frame
+
+
+def uint32_bytes(values: Sequence[int]) -> bytes:
+    """Little-endian uint32 buffer, for id lists sent alongside a frame"""
+    import numpy as np
+
+    return np.asarray(values, dtype="<u4").tobytes()
+
+
+def msgpack_response(body: bytes, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Binary response with the negotiated media type"""
+    return Response(content=body, media_type=MSGPACK_MEDIA_TYPE, headers=headers)
@@ -1,4 +1,16 @@
 """Simulation module initialization"""
 from .vehicle_simulation import VehicleSimulation
+from .change_feed import VehicleChangeFeed, change_feed
+from .live_state import LiveSnapshot, LiveStateStore, live_state
+from .run_window import RunWindows, run_windows
 
-__all__ = ["VehicleSimulation"]
+__all__ = [
+    "VehicleSimulation",
+    "VehicleChangeFeed",
+    "change_feed",
+    "LiveSnapshot",
+    "LiveStateStore",
+    "live_state",
+    "RunWindows",
+    "run_windows",
+]
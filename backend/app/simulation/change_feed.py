@@ -0,0 +1,239 @@
+"""Versioned vehicle change feed for delta updates"""
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models.vehicle import Vehicle, VehicleState
+from app.simulation.run_window import run_windows
+
+# Compact row layout shared by every delta response
+FEED_FIELDS = ["id", "vehicle_id", "vehicle_type", "lane_id", "position", "speed", "state", "is_emergency"]
+_STATE = FEED_FIELDS.index("state")
+_SPEED = FEED_FIELDS.index("speed")
+_EMERGENCY = FEED_FIELDS.index("is_emergency")
+# Per-intersection totals for zoomed-out map views
+SUMMARY_FIELDS = ["vehicles", "waiting", "emergency", "avg_speed"]
+
+# Called with (intersection_id, rows) after every local change; rows is None for a bare bump
+ChangeListener = Callable[[int, Optional[List[Tuple]]], None]
+
+
+def feed_row(vehicle: Vehicle) -> Tuple:
+    """Project a vehicle onto the compact feed row"""
+    return (
+        vehicle.id,
+        vehicle.vehicle_id,
+        vehicle.vehicle_type.value,
+        vehicle.lane_id,
+        round(vehicle.position, 2),
+        round(vehicle.speed, 2),
+        vehicle.state.value,
+        vehicle.is_emergency,
+    )
+
+
+class _IntersectionFeed:
+    """Current rows and recent change log for one intersection"""
+
+    def __init__(self, version: int, history: int):
+        self.origin = version
+        self.version = version
+        # Oldest version a cursor may hold and still receive a delta
+        self.floor = version
+        self.rows: Dict[int, Tuple] = {}
+        self.log: Deque[Tuple[int, Set[int], Set[int]]] = deque()
+        self.history = history
+        self.summary: Optional[Tuple[int, Tuple]] = None  # (version, totals) memo
+
+    def append(self, changed: Set[int], removed: Set[int]) -> int:
+        self.version += 1
+        self.log.append((self.version, changed, removed))
+        if len(self.log) > self.history:
+            self.floor = self.log.popleft()[0]
+        return self.version
+
+
+class VehicleChangeFeed:
+    """
+    Tracks vehicle rows per intersection and assigns every tick a
+    monotonically increasing version, so clients can ask for just the
+    vehicles added, changed or removed since the version they hold.
+
+    Versions start at the wall-clock millisecond the feed is first loaded
+    (its ``origin``). Each worker loads its own feed, so a version is only
+    meaningful together with the origin it counts from: a cursor is the
+    pair, and one from another worker or an earlier process gets a full
+    resync even when its version happens to fall inside this feed's history.
+    """
+
+    def __init__(self, history: int = 600):
+        self.history = history
+        self._feeds: Dict[int, _IntersectionFeed] = {}
+        self._lock = threading.Lock()
+        self.listeners: List[ChangeListener] = []
+
+    def _load(self, db: Session, intersection_id: int) -> _IntersectionFeed:
+        """
+        Loaded feed for an intersection. The DB is read outside the lock:
+        under an async session the query yields to the event loop, and
+        another coroutine blocking on a thread lock there would deadlock.
+        """
+        feed = self._feeds.get(intersection_id)
+        if feed is not None:
+            return feed
+
+        vehicles = db.query(Vehicle).filter(*run_windows.active(db, intersection_id)).all()
+        rows = {v.id: feed_row(v) for v in vehicles}
+
+        with self._lock:
+            feed = self._feeds.get(intersection_id)
+            if feed is None:
+                feed = _IntersectionFeed(int(time.time() * 1000), self.history)
+                feed.rows = rows
+                self._feeds[intersection_id] = feed
+            return feed
+
+    def preload(self, db: Session, intersection_ids: Sequence[int]):
+        """Load every listed intersection not yet loaded with a single query"""
+        missing = [i for i in intersection_ids if i not in self._feeds]
+        if not missing:
+            return
+        vehicles = db.query(Vehicle).filter(*run_windows.active_many(db, missing)).order_by(Vehicle.id).all()
+        rows: Dict[int, Dict[int, Tuple]] = {i: {} for i in missing}
+        for v in vehicles:
+            rows[v.intersection_id][v.id] = feed_row(v)
+
+        with self._lock:
+            version = int(time.time() * 1000)
+            for intersection_id, loaded in rows.items():
+                if intersection_id not in self._feeds:
+                    feed = _IntersectionFeed(version, self.history)
+                    feed.rows = loaded
+                    self._feeds[intersection_id] = feed
+
+    def version(self, db: Session, intersection_id: int) -> int:
+        """Current version for an intersection"""
+        return self._load(db, intersection_id).version
+
+    def origin(self, db: Session, intersection_id: int) -> int:
+        """Version the intersection's feed started from in this process"""
+        return self._load(db, intersection_id).origin
+
+    def loaded_version(self, intersection_id: int) -> Optional[int]:
+        """Current version if the intersection is loaded, without touching the DB"""
+        feed = self._feeds.get(intersection_id)
+        return feed.version if feed is not None else None
+
+    def bump(self, intersection_id: int, notify: bool = True) -> Optional[int]:
+        """
+        Advance the version without vehicle changes (signals, run state).
+        Unloaded intersections need nothing: they start at a fresh version.
+        """
+        with self._lock:
+            feed = self._feeds.get(intersection_id)
+            version = feed.append(set(), set()) if feed is not None else None
+        if notify:
+            self._notify(intersection_id, None)
+        return version
+
+    def record(self, db: Session, intersection_id: int, vehicles: Iterable[Vehicle]) -> int:
+        """Diff vehicles against the last known rows and advance the version"""
+        return self.record_rows(db, intersection_id, [feed_row(v) for v in vehicles])
+
+    def record_rows(self, db: Session, intersection_id: int, rows: List[Tuple]) -> int:
+        """
+        ``record`` for rows already projected with ``feed_row``, so a tick can
+        project before its commit expires the objects and publish after it
+        """
+        feed = self._load(db, intersection_id)
+        version = self._apply(feed, rows)
+        self._notify(intersection_id, rows)
+        return version
+
+    def apply_rows(self, intersection_id: int, rows: Sequence[Sequence]) -> Optional[int]:
+        """
+        Apply rows recorded by another process. Unloaded intersections are
+        skipped: they load current rows from the database when first read.
+        """
+        feed = self._feeds.get(intersection_id)
+        if feed is None:
+            return None
+        return self._apply(feed, [tuple(row) for row in rows])
+
+    def _apply(self, feed: _IntersectionFeed, rows: List[Tuple]) -> int:
+        with self._lock:
+            changed: Set[int] = set()
+            removed: Set[int] = set()
+            for row in rows:
+                vehicle_id = row[0]
+                if row[_STATE] == VehicleState.EXITED.value:
+                    if feed.rows.pop(vehicle_id, None) is not None:
+                        removed.add(vehicle_id)
+                    continue
+                if feed.rows.get(vehicle_id) != row:
+                    feed.rows[vehicle_id] = row
+                    changed.add(vehicle_id)
+            return feed.append(changed, removed)
+
+    def _notify(self, intersection_id: int, rows: Optional[List[Tuple]]):
+        for listener in self.listeners:
+            listener(intersection_id, rows)
+
+    def summary(self, db: Session, intersection_id: int) -> Tuple[int, Tuple]:
+        """Version and totals (see SUMMARY_FIELDS), computed once per version"""
+        feed = self._load(db, intersection_id)
+        with self._lock:
+            if feed.summary is None or feed.summary[0] != feed.version:
+                rows = feed.rows.values()
+                count = len(rows)
+                totals = (
+                    count,
+                    sum(1 for row in rows if row[_STATE] == VehicleState.WAITING.value),
+                    sum(1 for row in rows if row[_EMERGENCY]),
+                    round(sum(row[_SPEED] for row in rows) / count, 2) if count else 0.0,
+                )
+                feed.summary = (feed.version, totals)
+            return feed.summary
+
+    def changes_since(
+        self, db: Session, intersection_id: int, since: Optional[int] = None, origin: Optional[int] = None
+    ) -> Dict:
+        """
+        Compact delta from the cursor (``origin``, ``since``) to the current
+        version. Falls back to a full snapshot when the cursor is missing,
+        from another feed, or too old.
+        """
+        feed = self._load(db, intersection_id)
+        with self._lock:
+            if since is None or origin != feed.origin or since < feed.floor or since > feed.version:
+                return {
+                    "origin": feed.origin,
+                    "version": feed.version,
+                    "full": True,
+                    "fields": FEED_FIELDS,
+                    "upserts": list(feed.rows.values()),
+                    "removed": [],
+                }
+
+            changed: Set[int] = set()
+            removed: Set[int] = set()
+            for version, changed_ids, removed_ids in reversed(feed.log):
+                if version <= since:
+                    break
+                changed |= changed_ids
+                removed |= removed_ids
+
+            upserts: List[Tuple] = [feed.rows[i] for i in changed if i in feed.rows]
+            return {
+                "origin": feed.origin,
+                "version": feed.version,
+                "full": False,
+                "fields": FEED_FIELDS,
+                "upserts": upserts,
+                "removed": sorted(removed),
+            }
+
+
+change_feed = VehicleChangeFeed(history=settings.vehicle_feed_history)
@@ -0,0 +1,342 @@
+"""Redis-resident live simulation state with write-behind persistence"""
+import asyncio
+import json
+import logging
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.models.lane import Lane
+from app.models.signal import Signal, SignalState
+from app.models.simulation_state import SimulationState
+from app.models.vehicle import Vehicle, VehicleState, VehicleType
+from app.redis_client import get_redis
+from app.simulation.run_window import run_windows
+
+logger = logging.getLogger(__name__)
+
+
+class _LiveRecord:
+    """JSON round trip for the live dataclasses (enums stored by value)"""
+
+    _enums: Dict[str, type] = {}
+
+    @classmethod
+    def from_model(cls, row):
+        return cls(**{f.name: getattr(row, f.name) for f in fields(cls)})
+
+    def dumps(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def loads(cls, raw: str):
+        data = json.loads(raw)
+        for name, enum in cls._enums.items():
+            data[name] = enum(data[name])
+        return cls(**data)
+
+
+@dataclass
+class LiveVehicle(_LiveRecord):
+    """Per-tick vehicle state, detached from the ORM"""
+    id: int
+    vehicle_id: str
+    vehicle_type: VehicleType
+    lane_id: Optional[int]
+    position: float
+    speed: float
+    max_speed: float
+    length: float
+    state: VehicleState
+    is_emergency: bool
+    waiting_time: int
+    entry_time: float
+    exit_time: Optional[float]
+
+    _enums = {"vehicle_type": VehicleType, "state": VehicleState}
+
+
+@dataclass
+class LiveSignal(_LiveRecord):
+    """Per-tick signal state, detached from the ORM"""
+    id: int
+    name: str
+    state: SignalState
+    remaining_time: float
+    green_duration: int
+    yellow_duration: int
+    red_duration: int
+    adaptive_green_duration: Optional[int]
+    is_optimized: bool
+
+    _enums = {"state": SignalState}
+
+
+@dataclass
+class LiveLane(_LiveRecord):
+    """Static lane attributes the simulation and metrics need"""
+    id: int
+    name: str
+    length: float
+    capacity: int
+
+
+@dataclass
+class LiveSnapshot:
+    """Everything one tick reads and writes for an intersection"""
+    intersection_id: int
+    simulation_time: float
+    exited: int  # vehicles that have left the intersection so far
+    lanes: List[LiveLane]
+    signals: List[LiveSignal]
+    vehicles: List[LiveVehicle]  # active vehicles, ordered by id
+
+
+# Columns the flusher writes back; everything else is fixed at insert time
+VEHICLE_PERSISTED = ["lane_id", "position", "speed", "state", "waiting_time", "exit_time"]
+SIGNAL_PERSISTED = ["state", "remaining_time", "adaptive_green_duration", "is_optimized"]
+
+
+def load_snapshot(db: Session, intersection_id: int, simulation_time: float = 0.0) -> LiveSnapshot:
+    """Build a snapshot from the database (four queries, no per-row lookups)"""
+    lanes = db.query(Lane).filter(Lane.intersection_id == intersection_id).order_by(Lane.id).all()
+    signals = db.query(Signal).filter(Signal.intersection_id == intersection_id).order_by(Signal.id).all()
+    vehicles = db.query(Vehicle).filter(
+        *run_windows.active(db, intersection_id)
+    ).order_by(Vehicle.id).all()
+    exited = db.query(func.count(Vehicle.id)).filter(
+        Vehicle.intersection_id == intersection_id,
+        Vehicle.state == VehicleState.EXITED,
+    ).scalar()
+    return LiveSnapshot(
+        intersection_id=intersection_id,
+        simulation_time=simulation_time,
+        exited=exited,
+        lanes=[LiveLane.from_model(lane) for lane in lanes],
+        signals=[LiveSignal.from_model(signal) for signal in signals],
+        vehicles=[LiveVehicle.from_model(vehicle) for vehicle in vehicles],
+    )
+
+
+class LiveStateStore:
+    """
+    Keeps each intersection's live vehicles and signals in Redis hashes.
+    A tick reads them in one MULTI/EXEC round trip and writes them back in
+    another, marking the written ids dirty; ``flush`` copies dirty rows to
+    the database in bulk. The database therefore trails Redis by at most
+    one flush interval, which bounds what a Redis loss can cost.
+
+    Assumes one writer per intersection at a time.
+    """
+
+    INDEX_KEY = "live:intersections"
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        flush_interval: float = 5.0,
+        client_factory: Callable = get_redis,
+    ):
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self._client_factory = client_factory
+
+    @staticmethod
+    def _key(intersection_id: int, part: str) -> str:
+        return f"live:{intersection_id}:{part}"
+
+    def current(self, db: Session, intersection_id: int, simulation_time: float = 0.0) -> LiveSnapshot:
+        """Live snapshot from Redis when enabled, otherwise straight from the database"""
+        if self.enabled:
+            return self.load(db, intersection_id)
+        return load_snapshot(db, intersection_id, simulation_time)
+
+    def load(self, db: Session, intersection_id: int) -> LiveSnapshot:
+        """Read an intersection's live state, seeding it from the database on first use"""
+        pipe = self._client_factory().pipeline(transaction=True)
+        for part in ("meta", "lanes", "signals", "vehicles"):
+            pipe.hgetall(self._key(intersection_id, part))
+        meta, lanes, signals, vehicles = pipe.execute()
+        if not meta:
+            return self.seed(db, intersection_id)
+
+        active = (LiveVehicle.loads(raw) for raw in vehicles.values())
+        return LiveSnapshot(
+            intersection_id=intersection_id,
+            simulation_time=float(meta["simulation_time"]),
+            exited=int(meta["exited"]),
+            lanes=sorted((LiveLane.loads(raw) for raw in lanes.values()), key=lambda lane: lane.id),
+            signals=sorted((LiveSignal.loads(raw) for raw in signals.values()), key=lambda signal: signal.id),
+            vehicles=sorted((v for v in active if v.state != VehicleState.EXITED), key=lambda v: v.id),
+        )
+
+    def seed(self, db: Session, intersection_id: int) -> LiveSnapshot:
+        """Replace an intersection's live state with the database's"""
+        sim_state = db.query(SimulationState).filter(SimulationState.intersection_id == intersection_id).first()
+        snapshot = load_snapshot(db, intersection_id, sim_state.simulation_time if sim_state else 0.0)
+
+        pipe = self._client_factory().pipeline(transaction=True)
+        pipe.delete(*(self._key(intersection_id, part) for part in (
+            "meta", "lanes", "signals", "vehicles", "dirty", "dirty_signals",
+        )))
+        if snapshot.lanes:
+            pipe.hset(self._key(intersection_id, "lanes"), mapping={l.id: l.dumps() for l in snapshot.lanes})
+        self._write(pipe, snapshot, mark_dirty=False)
+        pipe.sadd(self.INDEX_KEY, intersection_id)
+        pipe.execute()
+        return snapshot
+
+    def _write(self, pipe, snapshot: LiveSnapshot, mark_dirty: bool = True):
+        intersection_id = snapshot.intersection_id
+        if snapshot.vehicles:
+            pipe.hset(self._key(intersection_id, "vehicles"), mapping={v.id: v.dumps() for v in snapshot.vehicles})
+            if mark_dirty:
+                pipe.sadd(self._key(intersection_id, "dirty"), *(v.id for v in snapshot.vehicles))
+        if snapshot.signals:
+            pipe.hset(self._key(intersection_id, "signals"), mapping={s.id: s.dumps() for s in snapshot.signals})
+            if mark_dirty:
+                pipe.sadd(self._key(intersection_id, "dirty_signals"), *(s.id for s in snapshot.signals))
+        pipe.hset(self._key(intersection_id, "meta"), mapping={
+            "simulation_time": snapshot.simulation_time,
+            "exited": snapshot.exited,
+        })
+
+    def save(self, snapshot: LiveSnapshot):
+        """Write a tick's vehicles, signals and clock in one atomic batch"""
+        pipe = self._client_factory().pipeline(transaction=True)
+        self._write(pipe, snapshot)
+        pipe.execute()
+
+    def add_vehicle(self, vehicle: Vehicle):
+        """Make a freshly inserted vehicle visible to the next tick"""
+        client = self._client_factory()
+        # Unseeded intersections pick the row up from the database when first loaded
+        if client.exists(self._key(vehicle.intersection_id, "meta")):
+            client.hset(self._key(vehicle.intersection_id, "vehicles"), vehicle.id, LiveVehicle.from_model(vehicle).dumps())
+
+    def apply_signal_changes(self, intersection_id: int, changes: Dict[int, Dict[str, Any]]):
+        """
+        Merge ``changes`` ({signal id: {field: value}}) into the live signals,
+        e.g. an optimizer's new green durations. Only the named fields are
+        written; phase and remaining time stay as the ticker left them. The
+        read and write are one WATCHed transaction, so a tick saved in
+        between makes it retry on the new state rather than roll it back.
+        """
+        key = self._key(intersection_id, "signals")
+        signal_ids = list(changes)
+        if not signal_ids:
+            return
+
+        def merge(pipe):
+            merged = {}
+            for signal_id, raw in zip(signal_ids, pipe.hmget(key, signal_ids)):
+                # Not seeded yet: the first load reads the database, which has the change
+                if raw is None:
+                    continue
+                signal = LiveSignal.loads(raw)
+                for name, value in changes[signal_id].items():
+                    setattr(signal, name, value)
+                merged[signal_id] = signal.dumps()
+            pipe.multi()
+            if merged:
+                pipe.hset(key, mapping=merged)
+                pipe.sadd(self._key(intersection_id, "dirty_signals"), *merged)
+
+        self._client_factory().transaction(merge, key)
+
+    def flush(self, db: Session, intersection_id: int) -> int:
+        """Persist rows changed since the last flush; returns how many were written"""
+        client = self._client_factory()
+        pipe = client.pipeline(transaction=True)
+        pipe.hgetall(self._key(intersection_id, "vehicles"))
+        pipe.hgetall(self._key(intersection_id, "signals"))
+        pipe.hget(self._key(intersection_id, "meta"), "simulation_time")
+        pipe.smembers(self._key(intersection_id, "dirty"))
+        pipe.smembers(self._key(intersection_id, "dirty_signals"))
+        pipe.delete(self._key(intersection_id, "dirty"), self._key(intersection_id, "dirty_signals"))
+        vehicles, signals, simulation_time, dirty, dirty_signals, _ = pipe.execute()
+
+        vehicle_rows = [LiveVehicle.loads(vehicles[i]) for i in dirty if i in vehicles]
+        signal_rows = [LiveSignal.loads(signals[i]) for i in dirty_signals if i in signals]
+        try:
+            if vehicle_rows:
+                db.execute(update(Vehicle), [
+                    {"id": v.id, **{name: getattr(v, name) for name in VEHICLE_PERSISTED}} for v in vehicle_rows
+                ])
+            if signal_rows:
+                db.execute(update(Signal), [
+                    {"id": s.id, **{name: getattr(s, name) for name in SIGNAL_PERSISTED}} for s in signal_rows
+                ])
+            if simulation_time is not None:
+                db.query(SimulationState).filter(
+                    SimulationState.intersection_id == intersection_id
+                ).update({"simulation_time": float(simulation_time)})
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Re-mark the rows so the next flush retries them
+            pipe = client.pipeline(transaction=True)
+            if dirty:
+                pipe.sadd(self._key(intersection_id, "dirty"), *dirty)
+            if dirty_signals:
+                pipe.sadd(self._key(intersection_id, "dirty_signals"), *dirty_signals)
+            pipe.execute()
+            raise
+
+        # Exited vehicles are final once persisted; stop carrying them in Redis
+        exited = [v.id for v in vehicle_rows if v.state == VehicleState.EXITED]
+        if exited:
+            client.hdel(self._key(intersection_id, "vehicles"), *exited)
+        return len(vehicle_rows) + len(signal_rows)
+
+    def flush_all(self, db: Session) -> int:
+        """Flush every intersection that has live state"""
+        return sum(
+            self.flush(db, int(intersection_id))
+            for intersection_id in self._client_factory().smembers(self.INDEX_KEY)
+        )
+
+    def evict(self, db: Session, intersection_id: int):
+        """Flush an intersection and drop its live state (e.g. when its simulation stops)"""
+        if not self._client_factory().exists(self._key(intersection_id, "meta")):
+            return
+        self.flush(db, intersection_id)
+        pipe = self._client_factory().pipeline(transaction=True)
+        pipe.delete(*(self._key(intersection_id, part) for part in (
+            "meta", "lanes", "signals", "vehicles", "dirty", "dirty_signals",
+        )))
+        pipe.srem(self.INDEX_KEY, intersection_id)
+        pipe.execute()
+
+    async def run_flusher(self, session_factory: Callable[[], Session]):
+        """Write-behind loop: flush all live state every ``flush_interval`` until cancelled"""
+        def flush_once():
+            db = session_factory()
+            try:
+                return self.flush_all(db)
+            finally:
+                db.close()
+
+        try:
+            while True:
+                await asyncio.sleep(self.flush_interval)
+                try:
+                    await run_in_threadpool(flush_once)
+                except Exception:
+                    logger.exception("Live state flush failed; retrying next interval")
+        finally:
+            # Final flush on shutdown so a clean stop loses nothing
+            try:
+                await run_in_threadpool(flush_once)
+            except Exception:
+                logger.exception("Final live state flush failed")
+
+
+live_state = LiveStateStore(
+    enabled=settings.live_state_backend == "redis",
+    flush_interval=settings.live_state_flush_interval,
+)
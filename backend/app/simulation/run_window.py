@@ -0,0 +1,80 @@
+"""Creation-time bound on a run's active vehicles, for partition pruning"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.simulation_state import SimulationState
+from app.models.vehicle import Vehicle, VehicleState
+
+# Covers injections whose transaction began before the bound was taken
+# but committed after it, and clock drift between database sessions
+SLACK = timedelta(minutes=5)
+
+
+class RunWindows:
+    """
+    When a run starts, the creation time of the oldest vehicle still on the
+    road becomes the intersection's ``active_since``. Every active vehicle
+    was created at or after it, so active-vehicle queries can add
+    ``created_at >= active_since`` and PostgreSQL skips the daily partitions
+    of earlier runs. The bound only ever moves forward: a value cached here
+    while another worker restarts the run is older than necessary, never wrong.
+    """
+
+    def __init__(self):
+        self._since: Dict[int, datetime] = {}
+
+    def start(self, db: Session, intersection_id: int) -> datetime:
+        """Take a new bound for a starting run and persist it on the simulation state"""
+        # Same clock and zone as the created_at server default
+        now = func.localtimestamp() if db.get_bind().dialect.name == "postgresql" else func.now()
+        oldest = db.query(func.coalesce(func.min(Vehicle.created_at), now)).filter(
+            Vehicle.intersection_id == intersection_id,
+            Vehicle.state != VehicleState.EXITED,
+        ).scalar()
+        since = oldest - SLACK
+        db.query(SimulationState).filter(
+            SimulationState.intersection_id == intersection_id
+        ).update({SimulationState.active_since: since}, synchronize_session=False)
+        db.commit()
+        self._since[intersection_id] = since
+        return since
+
+    def since(self, db: Session, intersection_id: int) -> Optional[datetime]:
+        """The intersection's bound, or None before its first run"""
+        since = self._since.get(intersection_id)
+        if since is None:
+            since = db.query(SimulationState.active_since).filter(
+                SimulationState.intersection_id == intersection_id
+            ).scalar()
+            if since is not None:
+                self._since[intersection_id] = since
+        return since
+
+    def active(self, db: Session, intersection_id: int) -> List:
+        """Filter criteria for the intersection's active vehicles"""
+        criteria = [Vehicle.intersection_id == intersection_id, Vehicle.state != VehicleState.EXITED]
+        since = self.since(db, intersection_id)
+        if since is not None:
+            criteria.append(Vehicle.created_at >= since)
+        return criteria
+
+    def active_many(self, db: Session, intersection_ids: Sequence[int]) -> List:
+        """Filter criteria for the active vehicles of several intersections at once"""
+        criteria = [Vehicle.intersection_id.in_(intersection_ids), Vehicle.state != VehicleState.EXITED]
+        missing = [i for i in intersection_ids if i not in self._since]
+        if missing:
+            self._since.update(db.query(SimulationState.intersection_id, SimulationState.active_since).filter(
+                SimulationState.intersection_id.in_(missing),
+                SimulationState.active_since.isnot(None),
+            ).all())
+        bounds = [self._since.get(i) for i in intersection_ids]
+        # One unbounded intersection means no bound for the batch
+        if bounds and None not in bounds:
+            criteria.append(Vehicle.created_at >= min(bounds))
+        return criteria
+
+
+run_windows = RunWindows()
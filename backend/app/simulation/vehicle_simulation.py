@@ -1,7 +1,7 @@
 """Traffic simulation engine"""
 import random
 import uuid
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence, Tuple
 from datetime import datetime
 from sqlalchemy.orm import Session
 from app.models.vehicle import Vehicle, VehicleState, VehicleType
@@ -10,14 +10,19 @@ from app.models.lane import Lane
 from app.models.intersection import Intersection
 from app.models.simulation_state import SimulationState
 from app.config import settings
+from app.simulation.change_feed import change_feed, feed_row
+from app.simulation.live_state import LiveSnapshot, LiveStateStore, live_state
+from app.simulation.run_window import run_windows
+from app.services.tick_profiler import TickTimer
 
 
 class VehicleSimulation:
     """Handles vehicle movement and behavior in traffic simulation"""
     
-    def __init__(self):
+    def __init__(self, live_store: Optional[LiveStateStore] = None):
         self.simulation_time = 0.0
         self.dt = settings.simulation_tick_interval  # Time step
+        self.live_store = live_store or live_state
     
     # Vehicle properties by type
     VEHICLE_PROPERTIES = {
@@ -88,43 +93,60 @@ class VehicleSimulation:
         is_emergency: bool = False
     ) -> Vehicle:
         """Add a new vehicle to the simulation"""
-        vehicle_id = f"{vehicle_type.value}-{uuid.uuid4().hex[:8]}"
-        
-        props = self.VEHICLE_PROPERTIES.get(vehicle_type.value, {})
-        
-        vehicle = Vehicle(
-            vehicle_id=vehicle_id,
-            vehicle_type=vehicle_type,
-            intersection_id=intersection_id,
-            lane_id=lane_id,
-            position=0.0,
-            speed=0.0,
-            max_speed=props.get("max_speed", 15.0),
-            length=props.get("length", 4.5),
-            width=props.get("width", 2.0),
-            weight=props.get("weight", 1000),
-            state=VehicleState.WAITING,
-            is_emergency=is_emergency,
-            waiting_time=0,
-            entry_time=self.simulation_time,
-        )
-        
-        db.add(vehicle)
-        db.commit()
-        return vehicle
+        return self.add_vehicles(db, intersection_id, [(lane_id, vehicle_type, is_emergency)])[0]
     
-    def update_vehicle_movement(self, vehicle: Vehicle, lane: Lane, signal: Signal, db: Session):
-        """Update vehicle position and speed based on signal and traffic conditions"""
+    def add_vehicles(
+        self,
+        db: Session,
+        intersection_id: int,
+        specs: Sequence[Tuple[int, VehicleType, bool]],
+    ) -> List[Vehicle]:
+        """
+        Add several vehicles, given as (lane_id, vehicle_type, is_emergency),
+        in one transaction with one change-feed record
+        """
+        vehicles = []
+        for lane_id, vehicle_type, is_emergency in specs:
+            props = self.VEHICLE_PROPERTIES.get(vehicle_type.value, {})
+            vehicles.append(Vehicle(
+                vehicle_id=f"{vehicle_type.value}-{uuid.uuid4().hex[:8]}",
+                vehicle_type=vehicle_type,
+                intersection_id=intersection_id,
+                lane_id=lane_id,
+                position=0.0,
+                speed=0.0,
+                max_speed=props.get("max_speed", 15.0),
+                length=props.get("length", 4.5),
+                width=props.get("width", 2.0),
+                weight=props.get("weight", 1000),
+                state=VehicleState.WAITING,
+                is_emergency=is_emergency,
+                waiting_time=0,
+                entry_time=self.simulation_time,
+            ))
+        if not vehicles:
+            return vehicles
+        
+        vehicle_ids = [v.vehicle_id for v in vehicles]
+        db.add_all(vehicles)
+        db.commit()
+        # Load ids and server defaults for the whole batch in one query
+        db.query(Vehicle).filter(Vehicle.vehicle_id.in_(vehicle_ids)).populate_existing().all()
         
+        change_feed.record(db, intersection_id, vehicles)
+        if self.live_store.enabled:
+            for vehicle in vehicles:
+                self.live_store.add_vehicle(vehicle)
+        return vehicles
+    
+    def advance_vehicle(self, vehicle, lane_length: float, signal, leader=None):
+        """
+        Move one vehicle by one tick. Works on ORM rows and live-state
+        records alike; ``leader`` is the nearest vehicle ahead in the lane.
+        """
         if vehicle.state == VehicleState.EXITED:
             return
         
-        # Get vehicles ahead
-        vehicles_ahead = db.query(Vehicle).filter(
-            Vehicle.lane_id == vehicle.lane_id,
-            Vehicle.position > vehicle.position
-        ).all()
-        
         # Calculate safe following distance
         min_distance = vehicle.length + 2.0  # 2m safety margin
         
@@ -145,15 +167,14 @@ class VehicleSimulation:
             vehicle.state = VehicleState.MOVING
         
         # Reduce speed if vehicle ahead
-        if vehicles_ahead:
-            nearest_vehicle = min(vehicles_ahead, key=lambda v: v.position)
-            distance_to_ahead = nearest_vehicle.position - vehicle.position
+        if leader is not None:
+            distance_to_ahead = leader.position - vehicle.position
             
             if distance_to_ahead < min_distance:
                 target_speed = 0
                 vehicle.state = VehicleState.STOPPED
             elif distance_to_ahead < min_distance * 2:
-                target_speed = min(target_speed, nearest_vehicle.speed * 0.8)
+                target_speed = min(target_speed, leader.speed * 0.8)
         
         # Apply acceleration/deceleration
         current_speed = vehicle.speed
@@ -174,80 +195,148 @@ class VehicleSimulation:
             vehicle.waiting_time += 1
         
         # Check if vehicle exited the lane
-        if vehicle.position >= lane.length:
+        if vehicle.position >= lane_length:
             vehicle.state = VehicleState.EXITED
             vehicle.exit_time = self.simulation_time
             vehicle.lane_id = None
+    
+    def advance_signal(self, signal, dt: float):
+        """Count a signal down and move it to its next phase when it runs out"""
+        if signal.remaining_time > 0:
+            signal.remaining_time -= dt
+        else:
+            # Transition to next state
+            if signal.state == SignalState.GREEN:
+                signal.state = SignalState.YELLOW
+                signal.remaining_time = signal.yellow_duration
+            elif signal.state == SignalState.YELLOW:
+                signal.state = SignalState.RED
+                signal.remaining_time = signal.red_duration
+            else:  # RED
+                signal.state = SignalState.GREEN
+                green_time = signal.adaptive_green_duration or signal.green_duration
+                signal.remaining_time = green_time
+    
+    def step_objects(
+        self, vehicles: List, lane_lengths: Dict[int, float], signals: List, dt: float, timer: Optional[TickTimer] = None
+    ) -> int:
+        """
+        Advance vehicles and signals in memory by one tick; returns how many
+        vehicles exited. Vehicles are processed in order and each sees the
+        positions its lane neighbours already have this tick. With a
+        ``timer``, time is split into leader lookup, physics and signals.
+        """
+        # Simplified: use first signal (in reality, map lanes to signals)
+        signal = signals[0] if signals else None
         
-        db.commit()
+        by_lane: Dict[int, List] = {}
+        for vehicle in vehicles:
+            if vehicle.lane_id:
+                by_lane.setdefault(vehicle.lane_id, []).append(vehicle)
+        
+        exited = 0
+        for vehicle in vehicles:
+            lane_length = lane_lengths.get(vehicle.lane_id) if vehicle.lane_id else None
+            if lane_length is None or signal is None:
+                continue
+            ahead = [
+                other for other in by_lane[vehicle.lane_id]
+                if other.lane_id == vehicle.lane_id and other.position > vehicle.position
+            ]
+            leader = min(ahead, key=lambda v: v.position) if ahead else None
+            if timer:
+                timer.lap("leaders")
+            self.advance_vehicle(vehicle, lane_length, signal, leader)
+            if vehicle.state == VehicleState.EXITED:
+                exited += 1
+            if timer:
+                timer.lap("physics")
+        
+        # Update signal timings
+        for signal in signals:
+            self.advance_signal(signal, dt)
+        if timer:
+            timer.lap("signals")
+        
+        return exited
     
-    def simulate_step(self, db: Session, intersection_id: int, dt: float):
-        """Simulate one time step for all vehicles at intersection"""
+    def simulate_step(self, db: Session, intersection_id: int, dt: float, timer: Optional[TickTimer] = None):
+        """
+        Simulate one time step for all vehicles at intersection. With a
+        ``timer`` (opened by the caller), time is split into phases.
+        """
+        if self.live_store.enabled:
+            return self.simulate_live_step(db, intersection_id, dt, timer)
+        
         self.simulation_time += dt
         
         # Get all active vehicles
         vehicles = db.query(Vehicle).filter(
-            Vehicle.intersection_id == intersection_id,
-            Vehicle.state != VehicleState.EXITED
-        ).all()
-        
-        # Get signal states
-        signals = db.query(Signal).filter_by(intersection_id=intersection_id).all()
-        signal_map = {s.id: s for s in signals}
+            *run_windows.active(db, intersection_id)
+        ).order_by(Vehicle.id).all()
         
-        # Update each vehicle
-        for vehicle in vehicles:
-            if vehicle.lane_id:
-                lane = db.query(Lane).filter_by(id=vehicle.lane_id).first()
-                # Simplified: use first signal (in reality, map lanes to signals)
-                signal = signal_map.get(signals[0].id) if signals else None
-                
-                if lane and signal:
-                    self.update_vehicle_movement(vehicle, lane, signal, db)
+        # Get signal states and lane geometry
+        signals = db.query(Signal).filter_by(intersection_id=intersection_id).order_by(Signal.id).all()
+        lane_lengths = dict(db.query(Lane.id, Lane.length).filter(Lane.intersection_id == intersection_id).all())
+        if timer:
+            timer.lap("load")
         
-        # Update signal timings
-        for signal in signals:
-            if signal.remaining_time > 0:
-                signal.remaining_time -= dt
-            else:
-                # Transition to next state
-                if signal.state == SignalState.GREEN:
-                    signal.state = SignalState.YELLOW
-                    signal.remaining_time = signal.yellow_duration
-                elif signal.state == SignalState.YELLOW:
-                    signal.state = SignalState.RED
-                    signal.remaining_time = signal.red_duration
-                else:  # RED
-                    signal.state = SignalState.GREEN
-                    green_time = signal.adaptive_green_duration or signal.green_duration
-                    signal.remaining_time = green_time
+        self.step_objects(vehicles, lane_lengths, signals, dt, timer)
         
+        # Project before commit so rows come from the loaded objects rather
+        # than being re-fetched one by one after commit expires them, but
+        # publish the new version only once the tick is committed: a reader
+        # seeing a version must find its rows in the database
+        rows = [feed_row(v) for v in vehicles]
         db.commit()
+        if timer:
+            timer.lap("commit")
+        change_feed.record_rows(db, intersection_id, rows)
+        if timer:
+            timer.lap("change_feed")
     
-    def get_simulation_metrics(self, db: Session, intersection_id: int) -> Dict:
-        """Calculate current simulation metrics"""
-        vehicles = db.query(Vehicle).filter_by(intersection_id=intersection_id).all()
+    def simulate_live_step(
+        self, db: Session, intersection_id: int, dt: float, timer: Optional[TickTimer] = None
+    ) -> LiveSnapshot:
+        """
+        One tick against the live state store: one read, physics in memory,
+        one pipelined write. The database is updated later by the flusher.
+        """
+        snapshot = self.live_store.load(db, intersection_id)
+        snapshot.simulation_time += dt
+        self.simulation_time = snapshot.simulation_time
+        if timer:
+            timer.lap("load")
         
-        total_vehicles = len(vehicles)
-        exited_vehicles = len([v for v in vehicles if v.state == VehicleState.EXITED])
+        lane_lengths = {lane.id: lane.length for lane in snapshot.lanes}
+        snapshot.exited += self.step_objects(snapshot.vehicles, lane_lengths, snapshot.signals, dt, timer)
         
-        total_waiting_time = sum(v.waiting_time for v in vehicles if v.state != VehicleState.EXITED)
-        
-        avg_waiting_time = (
-            total_waiting_time / len([v for v in vehicles if v.state != VehicleState.EXITED])
-            if len([v for v in vehicles if v.state != VehicleState.EXITED]) > 0
-            else 0
-        )
+        self.live_store.save(snapshot)
+        if timer:
+            timer.lap("save")
+        change_feed.record(db, intersection_id, snapshot.vehicles)
+        if timer:
+            timer.lap("change_feed")
+        return snapshot
+    
+    def snapshot_metrics(self, snapshot: LiveSnapshot) -> Dict:
+        """Vehicle metrics for an intersection snapshot"""
+        active = snapshot.vehicles
+        total_waiting_time = sum(v.waiting_time for v in active)
         
         # Calculate throughput (vehicles/minute)
         throughput = 0
-        if exited_vehicles > 0:
-            throughput = (exited_vehicles / (self.simulation_time + 0.1)) * 60
+        if snapshot.exited > 0:
+            throughput = (snapshot.exited / (snapshot.simulation_time + 0.1)) * 60
         
         return {
-            "total_vehicles": total_vehicles,
-            "exited_vehicles": exited_vehicles,
+            "total_vehicles": len(active) + snapshot.exited,
+            "exited_vehicles": snapshot.exited,
             "total_waiting_time": total_waiting_time,
-            "avg_waiting_time": avg_waiting_time,
+            "avg_waiting_time": total_waiting_time / len(active) if active else 0,
             "throughput": throughput,
         }
+    
+    def get_simulation_metrics(self, db: Session, intersection_id: int) -> Dict:
+        """Calculate current simulation metrics"""
+        return self.snapshot_metrics(self.live_store.current(db, intersection_id, self.simulation_time))
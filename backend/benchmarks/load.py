@@ -0,0 +1,419 @@
+"""
+Load test: concurrent dashboards, vehicle injectors and stepping clients.
+
+An asyncio/httpx take on ``example_usage.py``'s ``TrafficAPIClient``. Every
+client runs as its own task:
+- dashboards poll an intersection's metrics, and its vehicle list every few polls;
+- injectors add vehicles at a fixed rate each;
+- steppers advance a simulation at a fixed rate each.
+
+A profile names the mix and flags override any of its fields. Reports
+throughput, latency percentiles, status codes and (from ``X-DB-Queries``)
+statements per request for every endpoint. Save the JSON per release and
+pass an earlier one as ``--baseline`` to flag regressions:
+
+    python benchmarks/load.py --serve --profile mixed --output load.json
+    python benchmarks/load.py --base-url http://localhost:8000 --profile mixed \\
+        --dashboards 200 --baseline load.json
+
+``--serve`` starts ``uvicorn main:app`` on a free local port, with autorun
+off so steppers drive the ticks, and stops it afterwards. The database
+needs cities and intersections (``generate_network.py --profile tiny``).
+"""
+import argparse
+import asyncio
+import dataclasses
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+
+from stats import latency_summary
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The demo's mix from example_usage.py, weighted toward cars
+VEHICLE_TYPES = ["CAR", "CAR", "CAR", "TWO_WHEELER", "TWO_WHEELER", "AUTO", "BUS", "AMBULANCE"]
+
+
+@dataclass(frozen=True)
+class LoadProfile:
+    """How many clients of each role, and how often each one calls"""
+    dashboards: int
+    injectors: int
+    steppers: int
+    intersections: int = 1
+    # Rates of 0 (or a poll interval of 0) send calls back to back, with no think time
+    poll_interval: float = 1.0  # seconds between metrics polls per dashboard
+    vehicles_every: int = 5  # dashboards also list vehicles every n-th poll
+    inject_rate: float = 1.0  # vehicles per second per injector
+    step_rate: float = 10.0  # steps per second per stepper
+    duration: float = 30.0
+
+
+PROFILES = {
+    "smoke": LoadProfile(dashboards=2, injectors=1, steppers=1, poll_interval=0.25, inject_rate=4.0, duration=3.0),
+    "dashboards": LoadProfile(dashboards=200, injectors=0, steppers=1, intersections=10),
+    "mixed": LoadProfile(dashboards=50, injectors=10, steppers=5, intersections=5, inject_rate=2.0),
+    "rush_hour": LoadProfile(dashboards=100, injectors=50, steppers=10, intersections=10, inject_rate=5.0),
+    # Raw throughput: 64 closed-loop clients, about 6 metrics : 3 vehicle lists : 1 inject : 1 step
+    "throughput": LoadProfile(
+        dashboards=48, injectors=8, steppers=8, poll_interval=0.0, vehicles_every=2, inject_rate=0.0, step_rate=0.0,
+        duration=20.0,
+    ),
+}
+
+
+class EndpointStats:
+    """Latencies, status codes and statement counts for one endpoint"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.errors = 0
+        self.db_queries: List[int] = []
+
+    def record(self, started: float, response: Optional[httpx.Response]):
+        self.latencies.append(time.perf_counter() - started)
+        if response is None:
+            self.statuses["error"] += 1
+            self.errors += 1
+            return
+        self.statuses[str(response.status_code)] += 1
+        if response.status_code >= 500:
+            self.errors += 1
+        if "x-db-queries" in response.headers:
+            self.db_queries.append(int(response.headers["x-db-queries"]))
+
+    def summary(self, elapsed: float) -> Dict:
+        latencies = self.latencies
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "statuses": dict(sorted(self.statuses.items())),
+            "rps": round(len(latencies) / elapsed, 1),
+            **latency_summary(latencies, (50, 90, 99), scale=1000),
+            "db_queries_per_request": round(statistics.fmean(self.db_queries), 2) if self.db_queries else None,
+        }
+
+
+class LoadClient:
+    """
+    Async counterpart of ``TrafficAPIClient`` that times every call under a
+    templated endpoint name. Calls made while ``recording`` is off (setup and
+    teardown) are not counted. ``scheduled`` is when a fixed-rate client
+    meant to send, so time spent falling behind counts as latency.
+    """
+
+    def __init__(self, http: httpx.AsyncClient):
+        self.http = http
+        self.recording = False
+        self.endpoints: Dict[str, EndpointStats] = {}
+
+    async def _request(self, name: str, method: str, url: str, data: Dict = None, scheduled: float = None):
+        started = time.perf_counter() if scheduled is None else scheduled
+        try:
+            response = await self.http.request(method, url, json=data)
+        except httpx.HTTPError:
+            response = None
+        if self.recording:
+            self.endpoints.setdefault(name, EndpointStats()).record(started, response)
+        return response
+
+    async def _json(self, name: str, method: str, url: str, data: Dict = None):
+        """Setup calls: raise on failure, return the decoded body"""
+        response = await self._request(name, method, url, data)
+        if response is None:
+            raise httpx.ConnectError(f"{method} {url} failed")
+        response.raise_for_status()
+        return response.json() if response.content else {}
+
+    # Cities and intersections
+    async def get_cities(self) -> list:
+        return await self._json("GET /cities", "GET", "/api/cities")
+
+    async def get_intersections(self, city_id: int = None) -> list:
+        url = "/api/intersections" + (f"?city_id={city_id}" if city_id else "")
+        return await self._json("GET /intersections", "GET", url)
+
+    # Vehicles
+    async def inject_vehicle(self, intersection_id: int, lane_id: int, vehicle_type: str, scheduled: float = None):
+        data = {
+            "vehicle_type": vehicle_type,
+            "intersection_id": intersection_id,
+            "lane_id": lane_id,
+            "is_emergency": vehicle_type == "AMBULANCE",
+        }
+        return await self._request("POST /vehicles/inject", "POST", "/api/vehicles/inject", data, scheduled)
+
+    async def get_vehicles(self, intersection_id: int, scheduled: float = None):
+        return await self._request(
+            "GET /vehicles", "GET", f"/api/vehicles?intersection_id={intersection_id}", scheduled=scheduled
+        )
+
+    # Simulation
+    async def start_simulation(self, intersection_id: int, duration: int = 300) -> Dict:
+        data = {"intersection_id": intersection_id, "duration": duration, "speed_factor": 1.0}
+        return await self._json("POST /simulation/start", "POST", "/api/simulation/start", data)
+
+    async def stop_simulation(self, intersection_id: int) -> Dict:
+        return await self._json("POST /simulation/stop/{id}", "POST", f"/api/simulation/stop/{intersection_id}")
+
+    async def step_simulation(self, intersection_id: int, scheduled: float = None):
+        return await self._request(
+            "POST /simulation/step/{id}", "POST", f"/api/simulation/step/{intersection_id}", scheduled=scheduled
+        )
+
+    async def get_metrics(self, intersection_id: int, scheduled: float = None):
+        return await self._request(
+            "GET /simulation/metrics/{id}", "GET", f"/api/simulation/metrics/{intersection_id}", scheduled=scheduled
+        )
+
+
+async def at_rate(rate: float, deadline: float, rng: random.Random, call):
+    """
+    Call ``call(scheduled)`` ``rate`` times a second until the deadline, on a
+    fixed schedule: a slow response delays the next call instead of
+    lowering the offered load. Starts at a random offset so clients spread out.
+    A rate of 0 is a closed loop: each call goes out as the previous one returns.
+    """
+    if rate <= 0:
+        while time.perf_counter() < deadline:
+            await call(time.perf_counter())
+        return
+    interval = 1.0 / rate
+    scheduled = time.perf_counter() + rng.uniform(0, interval)
+    while scheduled < deadline:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await call(scheduled)
+        scheduled += interval
+
+
+async def dashboard(client: LoadClient, profile: LoadProfile, intersection_id: int, deadline: float, rng: random.Random):
+    polls = 0
+
+    async def poll(scheduled):
+        nonlocal polls
+        await client.get_metrics(intersection_id, scheduled)
+        polls += 1
+        if polls % profile.vehicles_every == 0:
+            await client.get_vehicles(intersection_id)
+
+    await at_rate(1.0 / profile.poll_interval if profile.poll_interval > 0 else 0.0, deadline, rng, poll)
+
+
+async def injector(
+    client: LoadClient, profile: LoadProfile, intersection_id: int, lane_ids: List[int], deadline: float, rng: random.Random
+):
+    async def inject(scheduled):
+        await client.inject_vehicle(intersection_id, rng.choice(lane_ids), rng.choice(VEHICLE_TYPES), scheduled)
+
+    await at_rate(profile.inject_rate, deadline, rng, inject)
+
+
+async def stepper(client: LoadClient, profile: LoadProfile, intersection_id: int, deadline: float, rng: random.Random):
+    async def step(scheduled):
+        await client.step_simulation(intersection_id, scheduled)
+
+    await at_rate(profile.step_rate, deadline, rng, step)
+
+
+async def discover(client: LoadClient, count: int, intersection_ids: Optional[List[int]]) -> Dict[int, List[int]]:
+    """Lane ids of the intersections under test: the given ones, or the first ``count`` found"""
+    if not intersection_ids:
+        intersection_ids = []
+        for city in await client.get_cities():
+            intersection_ids.extend(i["id"] for i in await client.get_intersections(city["id"]))
+            if len(intersection_ids) >= count:
+                break
+        intersection_ids = intersection_ids[:count]
+    if not intersection_ids:
+        raise SystemExit("No intersections to load: seed the database first (generate_network.py)")
+
+    lanes = {}
+    for intersection_id in intersection_ids:
+        response = await client.get_metrics(intersection_id)
+        if response is None or response.status_code != 200:
+            raise SystemExit(f"Intersection {intersection_id} not found")
+        lanes[intersection_id] = [lane["lane_id"] for lane in response.json()["lanes"]]
+    return lanes
+
+
+async def run(base_url: str, profile: LoadProfile, intersection_ids: List[int] = None, seed: int = 42) -> Dict:
+    """Drive one profile against a server and summarize every endpoint"""
+    rng = random.Random(seed)
+    clients = profile.dashboards + profile.injectors + profile.steppers
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as http:
+        client = LoadClient(http)
+        lanes = await discover(client, profile.intersections, intersection_ids)
+        targets = list(lanes)
+        for intersection_id in targets:
+            await client.start_simulation(intersection_id, duration=int(profile.duration) + 60)
+
+        client.recording = True
+        started = time.perf_counter()
+        deadline = started + profile.duration
+        tasks = []
+        for i in range(profile.dashboards):
+            iid = targets[i % len(targets)]
+            tasks.append(dashboard(client, profile, iid, deadline, random.Random(rng.random())))
+        for i in range(profile.injectors):
+            iid = targets[i % len(targets)]
+            if lanes[iid]:
+                tasks.append(injector(client, profile, iid, lanes[iid], deadline, random.Random(rng.random())))
+        for i in range(profile.steppers):
+            iid = targets[i % len(targets)]
+            tasks.append(stepper(client, profile, iid, deadline, random.Random(rng.random())))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        client.recording = False
+
+        for intersection_id in targets:
+            await client.stop_simulation(intersection_id)
+
+    endpoints = {name: stats.summary(elapsed) for name, stats in sorted(client.endpoints.items())}
+    return {
+        "intersection_ids": targets,
+        "duration_s": round(elapsed, 3),
+        "total_rps": round(sum(e["requests"] for e in endpoints.values()) / elapsed, 1),
+        "endpoints": endpoints,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def local_server(database_url: Optional[str] = None, startup_timeout: float = 60.0) -> Iterator[str]:
+    """A ``uvicorn main:app`` subprocess on a free port; yields its base URL"""
+    port = free_port()
+    env = {**os.environ, "SIMULATION_AUTORUN": "false"}
+    if database_url:
+        env["DATABASE_URL"] = database_url
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + startup_timeout
+        while True:
+            if process.poll() is not None:
+                raise SystemExit(f"Server exited during startup with code {process.returncode}")
+            try:
+                if httpx.get(f"{base_url}/health", timeout=1.0).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise SystemExit(f"Server did not answer /health within {startup_timeout:.0f}s")
+            time.sleep(0.2)
+        yield base_url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def compare(endpoints: Dict, baseline: Dict, tolerance: float) -> List[Dict]:
+    """Endpoints whose latency grew, or throughput fell, by more than ``tolerance``"""
+    regressions = []
+    for name, result in endpoints.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        regressed = [
+            metric for metric in ("p50_ms", "p99_ms")
+            if before[metric] and result[metric] > before[metric] * (1 + tolerance)
+        ]
+        if before["rps"] and result["rps"] < before["rps"] * (1 - tolerance):
+            regressed.append("rps")
+        if result["errors"] and not before["errors"]:
+            regressed.append("errors")
+        for metric in regressed:
+            regressions.append({"endpoint": name, "metric": metric, "baseline": before[metric], "current": result[metric]})
+    return regressions
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="mixed")
+    for field in dataclasses.fields(LoadProfile):
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=field.type, help="override the profile")
+    parser.add_argument("--intersection-id", type=int, action="append", help="load these intersections; repeatable")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--serve", action="store_true", help="start a local server instead of using --base-url")
+    parser.add_argument("--database-url", help="DATABASE_URL for the --serve server")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="earlier JSON report of the same profile to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed change from the baseline")
+    args = parser.parse_args()
+
+    overrides = {
+        field.name: getattr(args, field.name)
+        for field in dataclasses.fields(LoadProfile)
+        if getattr(args, field.name) is not None
+    }
+    profile = dataclasses.replace(PROFILES[args.profile], **overrides)
+
+    if args.serve:
+        with local_server(args.database_url) as base_url:
+            results = asyncio.run(run(base_url, profile, args.intersection_id, args.seed))
+    else:
+        base_url = args.base_url
+        results = asyncio.run(run(base_url, profile, args.intersection_id, args.seed))
+
+    report = {
+        "label": args.label,
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "base_url": base_url,
+        "profile": {"name": args.profile, **dataclasses.asdict(profile)},
+        **results,
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["profile"] != report["profile"]:
+            print("Baseline ran a different profile; comparing anyway", file=sys.stderr)
+        report["regressions"] = compare(report["endpoints"], baseline["endpoints"], args.tolerance)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(1 if report.get("regressions") else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Cold-start benchmark: how long `import main` takes, and where the time goes.
+
+Imports the app in fresh interpreters with `python -X importtime` and
+reports the median total plus per-module import time. Fails (exit 1) when
+the median exceeds the budget or when a module that must stay lazy was
+imported at startup:
+
+    python benchmarks/startup.py --runs 5 --budget-ms 1500 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use or during warm-up, never while a worker boots
+LAZY_MODULES = ["numpy", "scipy", "pandas", "shapely", "geoalchemy2", "msgpack"]
+
+
+def import_profile(target: str) -> Dict[str, Dict[str, float]]:
+    """Per-module self and cumulative import time (ms) for one fresh interpreter"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = {
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        }
+    return modules
+
+
+def summarize(profiles: List[Dict[str, Dict[str, float]]], target: str, top: int) -> Dict:
+    """Median timings across runs; top-level packages and first-party modules by cumulative time"""
+    names = set().union(*profiles)
+    medians = {}
+    for name in names:
+        runs = [p[name] for p in profiles if name in p]
+        medians[name] = {
+            "self_ms": round(statistics.median(r["self_ms"] for r in runs), 2),
+            "cumulative_ms": round(statistics.median(r["cumulative_ms"] for r in runs), 2),
+        }
+    by_cumulative = sorted(medians.items(), key=lambda item: item[1]["cumulative_ms"], reverse=True)
+    return {
+        "total_ms": medians[target]["cumulative_ms"],
+        "packages": [
+            {"module": name, **timing} for name, timing in by_cumulative
+            if "." not in name and name != target
+        ][:top],
+        "first_party": [
+            {"module": name, **timing} for name, timing in by_cumulative if name.startswith("app")
+        ][:top],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="main", help="module to import")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, help="fail when the median import exceeds this")
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    profiles = [import_profile(args.target) for _ in range(args.runs)]
+    report = {"label": args.label, "target": args.target, "runs": args.runs, **summarize(profiles, args.target, args.top)}
+    report["eagerly_imported"] = sorted(m for m in LAZY_MODULES if any(m in p for p in profiles))
+    report["budget_ms"] = args.budget_ms
+    report["within_budget"] = not report["eagerly_imported"] and (
+        args.budget_ms is None or report["total_ms"] <= args.budget_ms
+    )
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(0 if report["within_budget"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""Latency statistics shared by the benchmark scripts"""
+import statistics
+from typing import Dict, List, Sequence
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def latency_summary(
+    samples: List[float], percentiles: Sequence[float] = (50, 99), scale: float = 1.0, digits: int = 2
+) -> Dict[str, float]:
+    """``p<n>_ms``, ``max_ms`` and ``mean_ms`` of ``samples`` (multiplied by ``scale`` to get milliseconds)"""
+    summary = {f"p{pct:g}_ms": round(percentile(samples, pct) * scale, digits) for pct in percentiles}
+    summary["max_ms"] = round(max(samples, default=0.0) * scale, digits)
+    summary["mean_ms"] = round(statistics.fmean(samples) * scale, digits) if samples else 0.0
+    return summary
@@ -0,0 +1,59 @@
+"""
+Generate a synthetic road network and bulk-load it for load testing.
+
+Rows are upserted on their natural keys, so re-running with the same
+profile and seed is a no-op and an interrupted load can simply be repeated:
+
+    python generate_network.py --profile large --seed 7
+    python generate_network.py --profile small --lanes 4 8 --method insert
+"""
+import argparse
+import dataclasses
+import json
+import sys
+
+from app.database import SessionLocal
+from app.services.response_cache import response_cache
+from app.services.synthetic_network import PROFILES, NetworkGenerator, load_network
+
+# Tables must exist already: run `alembic upgrade head` first
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="small")
+    parser.add_argument("--cities", type=int, help="override the profile's city count")
+    parser.add_argument("--intersections", type=int, help="override intersections per city")
+    parser.add_argument("--lanes", type=int, nargs=2, metavar=("MIN", "MAX"), help="override lanes per intersection")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--prefix", default="Synthetic", help="name prefix, keeps generated cities apart from real ones")
+    parser.add_argument("--method", choices=("auto", "copy", "insert"), default="auto",
+                        help="COPY needs PostgreSQL with psycopg2; auto picks it when available")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    profile = PROFILES[args.profile]
+    overrides = {}
+    if args.cities is not None:
+        overrides["cities"] = args.cities
+    if args.intersections is not None:
+        overrides["intersections_per_city"] = args.intersections
+    if args.lanes is not None:
+        overrides["min_lanes"], overrides["max_lanes"] = args.lanes
+    profile = dataclasses.replace(profile, **overrides)
+
+    def progress(done, total, report):
+        print(f"{done}/{total} cities, {report.rows} rows", file=sys.stderr)
+
+    db = SessionLocal()
+    try:
+        report = load_network(db, NetworkGenerator(profile, args.seed, args.prefix), args.method, args.chunk_size, progress)
+    finally:
+        db.close()
+    # Running workers drop cached lists and rebuild their spatial index
+    response_cache.invalidate("cities", "intersections")
+    print(json.dumps({"profile": args.profile, "seed": args.seed, **report.as_dict()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
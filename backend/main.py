@@ -1,21 +1,65 @@
 """Main FastAPI application"""
-from fastapi import FastAPI
+import time
+
+# Import cost of the app itself, reported by /ready
+_import_started = time.perf_counter()
+
+import asyncio
+from contextlib import asynccontextmanager
+import redis
+from fastapi import FastAPI, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from starlette.middleware.gzip import GZipMiddleware
 from app.config import settings
-from app.database import init_db
-from app.api import cities, intersections, vehicles, simulation
+from app.database import engine, SessionLocal
+from app.simulation import live_state
+from app.services import prometheus
+from app.services.coordination import apply_remote_change, change_bus
+from app.services.partitions import run_partition_maintenance
+from app.services.query_accounting import QueryAccountingMiddleware
+from app.services.warmup import schema_status, warmup
+from app.api import cities, intersections, vehicles, simulation, diagnostics
+
+# The schema is created by migrations (`alembic upgrade head`), not on import
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Background work: warm-up, autorun ticker, change listener, live state flusher, partition upkeep"""
+    tasks = [asyncio.create_task(warmup.run())]
+    if settings.simulation_autorun:
+        tasks.append(asyncio.create_task(simulation.run_simulation_ticker()))
+    if change_bus.enabled:
+        tasks.append(asyncio.create_task(change_bus.listen(apply_remote_change)))
+    if live_state.enabled:
+        tasks.append(asyncio.create_task(live_state.run_flusher(SessionLocal)))
+    if engine.dialect.name == "postgresql":
+        tasks.append(asyncio.create_task(run_partition_maintenance(engine)))
+    yield
+    # Stop ticking before the flusher's final flush
+    for task in tasks:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
 
-# Initialize database
-init_db()
 
 # Create FastAPI app
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
     description="Nationwide AI-Powered Traffic Management and Simulation Platform for India",
+    lifespan=lifespan,
 )
 
+
+@app.exception_handler(redis.RedisError)
+async def redis_unavailable(request: Request, exc: redis.RedisError):
+    """Live state is unreadable without Redis; report it as a temporary outage"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Live state store unavailable"},
+    )
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -28,11 +72,16 @@ app.add_middleware(
 # Add GZIP middleware
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
+# Statement counts per request, as X-DB-* headers
+if settings.query_accounting:
+    app.add_middleware(QueryAccountingMiddleware)
+
 # Include routers
 app.include_router(cities.router)
 app.include_router(intersections.router)
 app.include_router(vehicles.router)
 app.include_router(simulation.router)
+app.include_router(diagnostics.router)
 
 
 @app.get("/")
@@ -51,6 +100,29 @@ def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+def readiness_check(response: Response):
+    """Ready once warm-up has finished and the database schema is at the migration head"""
+    report = {
+        "import_ms": _import_ms,
+        **warmup.snapshot(),
+        "database": schema_status(engine, warmup.head) if warmup.done else None,
+    }
+    report["ready"] = warmup.done and report["database"]["status"] == "ok"
+    if not report["ready"]:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return report
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus text exposition of in-process metrics"""
+    return Response(content=prometheus.render(), media_type=prometheus.CONTENT_TYPE)
+
+
+_import_ms = round((time.perf_counter() - _import_started) * 1000, 1)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,13 +1,12 @@
 """Seed database with sample Indian cities and intersections"""
-from app.database import SessionLocal, init_db
+from app.database import SessionLocal
 from app.models.city import City
 from app.models.intersection import Intersection
 from app.models.lane import Lane, Direction
 from app.models.signal import Signal
 from sqlalchemy.exc import IntegrityError
 
-# Initialize database tables first
-init_db()
+# Tables must exist already: run `alembic upgrade head` first
 
 db = SessionLocal()
 
@@ -0,0 +1,45 @@
+"""Shared test fixtures"""
+from contextlib import contextmanager
+
+# TestClient otherwise imports this in its portal thread, where garbage
+# collecting another thread's sqlite3 connections mid-import trips a
+# CPython 3.11.7 bug ("AST constructor recursion depth mismatch")
+import anyio._backends._asyncio  # noqa: F401
+import pytest
+
+from app.services import query_accounting
+from app.services.query_accounting import track_queries
+
+
+@pytest.fixture
+def query_budget():
+    """
+    ``with query_budget(limit):`` fails the test when the block issues more
+    than ``limit`` statements, or one statement ``repeats`` times (a query
+    per row). Counts direct calls and TestClient requests alike, on engines
+    passed to ``query_accounting.install``.
+    """
+
+    @contextmanager
+    def budget(limit: int, repeats: int = 10):
+        requests = []
+
+        def collect(label, account):
+            requests.append((label, account))
+
+        query_accounting.listeners.append(collect)
+        try:
+            with track_queries() as direct:
+                yield direct
+        finally:
+            query_accounting.listeners.remove(collect)
+
+        accounts = [("direct calls", direct), *requests]
+        total = sum(account.count for _, account in accounts)
+        assert total <= limit, f"{total} statements over a budget of {limit}: " + ", ".join(
+            f"{label} {account.count}" for label, account in accounts if account.count
+        )
+        repeated = [(label, shape, count) for label, account in accounts for shape, count in account.repeated(repeats)]
+        assert not repeated, f"statements issued per row: {repeated}"
+
+    return budget
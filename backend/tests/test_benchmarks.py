@@ -0,0 +1,89 @@
+"""Smoke tests for the benchmark scripts"""
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(BACKEND_DIR, "benchmarks", "simulation.py")
+
+
+def run_benchmark(*args):
+    return subprocess.run(
+        [sys.executable, SCRIPT, "--sizes", "10", "--ticks", "3", "--warmup", "0", *args],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+
+
+def test_simulation_benchmark_reports_and_flags_regressions(tmp_path):
+    """Test the JSON report covers every benchmark and a slower run is flagged"""
+    output = tmp_path / "sim.json"
+    completed = run_benchmark("--output", str(output))
+    assert completed.returncode == 0, completed.stderr
+    report = json.loads(output.read_text())
+    assert [r["benchmark"] for r in report["results"]] == ["simulate_step", "optimize_signal_timing", "metrics"]
+    for result in report["results"]:
+        assert result["database"] == "sqlite" and result["vehicles"] == 10
+        assert result["calls"] == 3 and result["queries_per_call"] > 0
+        assert 0 < result["p50_ms"] <= result["p99_ms"]
+    step = report["results"][0]
+    assert step["active_vehicles_after"] == 10
+
+    # A baseline no real run can match
+    for result in report["results"]:
+        result["p50_ms"] = 1e-6
+    output.write_text(json.dumps(report))
+    completed = run_benchmark("--benchmarks", "metrics", "--baseline", str(output))
+    assert completed.returncode == 1
+    regressions = json.loads(completed.stdout)["regressions"]
+    assert [(r["benchmark"], r["metric"]) for r in regressions] == [("metrics", "p50_ms")]
+
+
+def test_load_harness_serves_and_compares(tmp_path):
+    """Test a short load run against a local server reports every role and flags a regression"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from app.models.base import Base
+    from app.models.city import City
+    from app.models.intersection import Intersection
+    from app.models.lane import Lane, Direction
+    from app.models.signal import Signal, SignalState
+
+    database_url = f"sqlite:///{tmp_path / 'load.db'}"
+    engine = create_engine(database_url)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        intersection = Intersection(
+            name="Test Intersection", city=City(name="Test City", state="Test State", latitude=0.0, longitude=0.0),
+            latitude=0.0, longitude=0.0,
+        )
+        intersection.lanes.append(Lane(name="Lane NORTH", direction=Direction.NORTH))
+        intersection.signals.append(Signal(name="Signal NS", state=SignalState.GREEN, remaining_time=30.0))
+        db.add(intersection)
+        db.commit()
+    engine.dispose()
+
+    # A baseline no real run can match
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"profile": {}, "endpoints": {
+        "GET /simulation/metrics/{id}": {"p50_ms": 1e-6, "p99_ms": 1e-6, "rps": 0, "errors": 0},
+    }}))
+    output = tmp_path / "load.json"
+    completed = subprocess.run(
+        [
+            sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "load.py"), "--serve", "--database-url", database_url,
+            "--profile", "smoke", "--duration", "1", "--vehicles-every", "2", "--output", str(output), "--baseline", str(baseline),
+        ],
+        cwd=BACKEND_DIR, capture_output=True, text=True, timeout=120,
+    )
+    assert completed.returncode == 1, completed.stderr
+    report = json.loads(output.read_text())
+    assert set(report["endpoints"]) == {
+        "GET /simulation/metrics/{id}", "GET /vehicles", "POST /simulation/step/{id}", "POST /vehicles/inject",
+    }
+    for endpoint in report["endpoints"].values():
+        assert endpoint["requests"] > 0 and endpoint["errors"] == 0
+        assert endpoint["db_queries_per_request"] > 0
+    assert {(r["endpoint"], r["metric"]) for r in report["regressions"]} == {
+        ("GET /simulation/metrics/{id}", "p50_ms"), ("GET /simulation/metrics/{id}", "p99_ms"),
+    }
@@ -0,0 +1,171 @@
+"""Tests for the tagged two-level cache"""
+import fnmatch
+import redis
+from app.redis_client import scan_delete
+from app.services.cache import LocalLRU, TaggedCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """String commands used by the cache; deliberately has no KEYS command"""
+
+    def __init__(self):
+        self.data = {}
+        self.calls = []
+
+    def mget(self, keys):
+        self.calls.append("mget")
+        return [self.data.get(k) for k in keys]
+
+    def setex(self, key, ttl, value):
+        self.data[key] = str(value)
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    def scan_iter(self, match=None, count=None):
+        self.calls.append("scan")
+        return iter([k for k in list(self.data) if fnmatch.fnmatchcase(k, match)])
+
+    def unlink(self, *keys):
+        return sum(self.data.pop(k, None) is not None for k in keys)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args):
+            self.commands.append((name, args))
+            return self
+        return queue
+
+    def execute(self):
+        self.client.calls.append("pipeline")
+        return [getattr(self.client, name)(*args) for name, args in self.commands]
+
+
+class DownRedis:
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise redis.ConnectionError("down")
+        return fail
+
+
+def make_cache(client, clock, **kwargs):
+    return TaggedCache("test", client_factory=lambda: client, clock=clock, **kwargs)
+
+
+def test_lru_evicts_oldest_and_expires():
+    """Test the L1 is bounded and entries expire after their TTL"""
+    clock = FakeClock()
+    lru = LocalLRU(max_entries=2, ttl=10.0, clock=clock)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    assert lru.get("a") == 1
+    lru.put("c", 3)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1 and lru.get("c") == 3
+
+    clock.now = 10.0
+    assert lru.get("a") is None
+    assert len(lru) == 1
+
+
+def test_multi_get_is_one_round_trip():
+    """Test a multi-key read costs one MGET and repeat reads stay in L1"""
+    client = FakeRedis()
+    clock = FakeClock()
+    writer = make_cache(client, clock)
+    writer.set_many({"a": "1", "b": "2", "c": "3"}, tags=("cities",))
+
+    reader = make_cache(client, clock)
+    client.calls.clear()
+    assert reader.get_many(["a", "b", "c", "d"], tags=("cities",)) == {"a": "1", "b": "2", "c": "3"}
+    # One MGET for the tag version, one for the four keys
+    assert client.calls == ["mget", "mget"]
+
+    client.calls.clear()
+    assert reader.get_many(["a", "b", "c"], tags=("cities",)) == {"a": "1", "b": "2", "c": "3"}
+    assert client.calls == []
+    stats = reader.snapshot()
+    assert (stats["l1_hits"], stats["l2_hits"], stats["misses"]) == (3, 3, 1)
+
+
+def test_tag_invalidation_reaches_other_workers():
+    """Test a tag bump retires entries locally at once and elsewhere after the refresh"""
+    client = FakeRedis()
+    clock = FakeClock()
+    first = make_cache(client, clock, tag_refresh=1.0)
+    second = make_cache(client, clock, tag_refresh=1.0)
+    first.set("all", "old", tags=("cities",))
+    assert second.get("all", tags=("cities",)) == "old"
+
+    first.invalidate("cities")
+    assert first.get("all", tags=("cities",)) is None
+    assert second.get("all", tags=("cities",)) == "old"
+    clock.now = 1.0
+    assert second.get("all", tags=("cities",)) is None
+
+    # Untagged keys and other tags are untouched
+    first.set("plain", "kept")
+    first.set("one", "kept", tags=("intersections",))
+    first.invalidate("cities")
+    assert first.get("plain") == "kept"
+    assert first.get("one", tags=("intersections",)) == "kept"
+
+
+def test_value_computed_across_invalidation_is_not_served():
+    """Test storing under the versions read before loading drops racing writes"""
+    client = FakeRedis()
+    cache = make_cache(client, FakeClock())
+    before = cache.versions(("cities",))
+    cache.invalidate("cities")
+    cache.set("all", "stale", vector=before)
+    assert cache.get("all", tags=("cities",)) is None
+    assert cache.get_or_set("all", lambda: "fresh", tags=("cities",)) == "fresh"
+
+
+def test_redis_outage_falls_back_and_replays_invalidation():
+    """Test an outage serves L1 only and the missed INCR is applied once Redis returns"""
+    client = FakeRedis()
+    clock = FakeClock()
+    cache = make_cache(client, clock)
+    cache.set("all", "old", tags=("cities",))
+
+    down = DownRedis()
+    cache._client_factory = lambda: down
+    cache.invalidate("cities")
+    assert cache.get("all", tags=("cities",)) is None
+    assert cache.snapshot()["errors"] == 1
+
+    cache._client_factory = lambda: client
+    clock.now = TaggedCache.REDIS_RETRY_SECONDS
+    assert cache.get("all", tags=("cities",)) is None
+    assert client.data["test:tag:cities"] == "1"
+
+
+def test_clear_uses_scan_not_keys():
+    """Test namespace cleanup walks keys with SCAN and deletes in batches"""
+    client = FakeRedis()
+    cache = make_cache(client, FakeClock())
+    cache.set_many({f"k{i}": str(i) for i in range(7)})
+    client.data["other:key"] = "x"
+
+    assert cache.clear() == 7
+    assert client.data == {"other:key": "x"}
+    assert cache.get("k1") is None
+    assert scan_delete(client, "other:*", batch=1) == 1
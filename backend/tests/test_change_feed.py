@@ -0,0 +1,128 @@
+"""Unit tests for the versioned vehicle change feed"""
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, Session
+from app.models.base import Base
+from app.models.city import City
+from app.models.intersection import Intersection
+from app.models.lane import Lane, Direction
+from app.models.vehicle import Vehicle, VehicleType, VehicleState
+from app.simulation import LiveStateStore, VehicleChangeFeed, VehicleSimulation, change_feed, run_windows
+
+
+@pytest.fixture
+def db_session():
+    """Create test database session"""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def intersection(db_session: Session):
+    """Create an intersection with one lane"""
+    city = City(name="Test City", state="Test State", latitude=0.0, longitude=0.0)
+    db_session.add(city)
+    db_session.commit()
+    
+    intersection = Intersection(name="Test Intersection", city_id=city.id, latitude=0.0, longitude=0.0)
+    db_session.add(intersection)
+    db_session.commit()
+    
+    lane = Lane(name="Lane NORTH", intersection_id=intersection.id, direction=Direction.NORTH)
+    db_session.add(lane)
+    db_session.commit()
+    return intersection
+
+
+def _vehicle(db_session: Session, intersection, name: str) -> Vehicle:
+    vehicle = Vehicle(
+        vehicle_id=name,
+        vehicle_type=VehicleType.CAR,
+        intersection_id=intersection.id,
+        lane_id=intersection.lanes[0].id,
+        state=VehicleState.WAITING,
+        entry_time=0.0,
+    )
+    db_session.add(vehicle)
+    db_session.commit()
+    return vehicle
+
+
+def test_delta_contains_only_changes(db_session: Session, intersection):
+    """Test deltas carry added, moved and removed vehicles only"""
+    feed = VehicleChangeFeed(history=10)
+    a = _vehicle(db_session, intersection, "car-a")
+    b = _vehicle(db_session, intersection, "car-b")
+    
+    full = feed.changes_since(db_session, intersection.id)
+    assert full["full"] is True
+    assert {row[0] for row in full["upserts"]} == {a.id, b.id}
+    cursor, origin = full["version"], full["origin"]
+    
+    # Nothing changed: the tick still advances the version
+    feed.record(db_session, intersection.id, [a, b])
+    delta = feed.changes_since(db_session, intersection.id, cursor, origin)
+    assert delta["full"] is False
+    assert delta["version"] == cursor + 1
+    assert delta["upserts"] == [] and delta["removed"] == []
+    
+    a.position = 12.5
+    b.state = VehicleState.EXITED
+    c = _vehicle(db_session, intersection, "car-c")
+    feed.record(db_session, intersection.id, [a, b, c])
+    
+    delta = feed.changes_since(db_session, intersection.id, cursor, origin)
+    position = delta["fields"].index("position")
+    assert {row[0]: row[position] for row in delta["upserts"]} == {a.id: 12.5, c.id: 0.0}
+    assert delta["removed"] == [b.id]
+
+
+def test_stale_cursor_gets_full_snapshot(db_session: Session, intersection):
+    """Test cursors outside the retained history fall back to a full resync"""
+    feed = VehicleChangeFeed(history=3)
+    a = _vehicle(db_session, intersection, "car-a")
+    cursor, origin = feed.version(db_session, intersection.id), feed.origin(db_session, intersection.id)
+    
+    for step in range(5):
+        a.position = float(step + 1)
+        feed.record(db_session, intersection.id, [a])
+    
+    assert feed.changes_since(db_session, intersection.id, cursor, origin)["full"] is True
+    assert feed.changes_since(db_session, intersection.id, cursor + 10**6, origin)["full"] is True
+    assert feed.changes_since(db_session, intersection.id, cursor + 3, origin)["full"] is False
+
+
+def test_preload_matches_individual_loads(db_session: Session, intersection, monkeypatch):
+    """Test a batch load yields the same rows and totals as loading one by one"""
+    monkeypatch.setattr(run_windows, "_since", {})
+    a = _vehicle(db_session, intersection, "car-a")
+    _vehicle(db_session, intersection, "car-b")
+    a.state = VehicleState.EXITED
+    db_session.commit()
+
+    batched, single = VehicleChangeFeed(), VehicleChangeFeed()
+    batched.preload(db_session, [intersection.id, intersection.id + 1])
+    assert batched.loaded_version(intersection.id + 1) is not None
+    assert (
+        batched.changes_since(db_session, intersection.id)["upserts"]
+        == single.changes_since(db_session, intersection.id)["upserts"]
+    )
+    assert batched.summary(db_session, intersection.id)[1] == (1, 1, 0, 0.0)
+
+
+def test_tick_publishes_version_after_commit(db_session: Session, intersection, monkeypatch):
+    """Test a tick's version only appears once its rows are committed"""
+    monkeypatch.setattr(change_feed, "_feeds", {})
+    monkeypatch.setattr(run_windows, "_since", {})
+    _vehicle(db_session, intersection, "car-a")
+    before = change_feed.version(db_session, intersection.id)
+    at_commit = []
+    event.listen(db_session, "after_commit", lambda session: at_commit.append(change_feed.loaded_version(intersection.id)))
+
+    VehicleSimulation(live_store=LiveStateStore()).simulate_step(db_session, intersection.id, 0.1)
+    assert at_commit == [before]
+    assert change_feed.loaded_version(intersection.id) == before + 1
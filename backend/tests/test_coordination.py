@@ -0,0 +1,223 @@
+"""Tests for cross-worker simulation ownership and change fan-out"""
+import asyncio
+import json
+import pytest
+from app.api import simulation
+from app.services.coordination import ChangeBus, LocalLeases, LocalSimulationRegistry
+from app.simulation.change_feed import VehicleChangeFeed, _IntersectionFeed
+from app.models.vehicle import VehicleState
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakePublisher:
+    """Records what a ChangeBus publishes, standing in for the Redis client"""
+
+    def __init__(self):
+        self.messages = []
+
+    def publish(self, channel, message):
+        self.messages.append((channel, message))
+
+
+class FakePubSub:
+    """Delivers the given payloads once, then waits like an idle subscription"""
+
+    def __init__(self, payloads):
+        self.payloads = payloads
+
+    async def psubscribe(self, pattern):
+        pass
+
+    async def listen(self):
+        for data in self.payloads:
+            yield {"type": "pmessage", "data": data}
+        await asyncio.Event().wait()
+
+    async def close(self):
+        pass
+
+
+class FakeSession:
+    def close(self):
+        pass
+
+
+def loaded_feed(rows, origin=1000):
+    """Feed with one intersection already loaded, so no database is needed"""
+    feed = VehicleChangeFeed(history=10)
+    loaded = _IntersectionFeed(origin, feed.history)
+    loaded.rows = {row[0]: row for row in rows}
+    feed._feeds[1] = loaded
+    return feed
+
+
+def vehicle_row(vehicle_id, position, state=VehicleState.MOVING):
+    return (vehicle_id, f"veh-{vehicle_id}", "car", 1, position, 10.0, state.value, False)
+
+
+def test_lease_is_exclusive_until_it_expires():
+    """Test a second worker is refused while the lease is live, then takes over"""
+    clock = FakeClock()
+    table = {}
+    first = LocalLeases("worker-a", ttl=5.0, table=table, clock=clock)
+    second = LocalLeases("worker-b", ttl=5.0, table=table, clock=clock)
+
+    assert first.acquire(1)
+    assert not second.acquire(1)
+    assert second.acquire(2)
+
+    # Renewal keeps the lease alive past the original expiry
+    clock.now = 4.0
+    assert first.acquire(1)
+    clock.now = 8.0
+    assert not second.acquire(1)
+    assert first.owner(1) == "worker-a"
+
+    # The owner stops renewing (crash): the lease lapses and moves on
+    clock.now = 9.5
+    assert first.owner(1) is None
+    assert second.acquire(1)
+    assert not first.acquire(1)
+
+    # Only the holder can release
+    first.release(1)
+    assert second.owner(1) == "worker-b"
+    second.release(1)
+    assert first.acquire(1)
+
+
+def test_registry_tracks_run_state():
+    """Test start, advance and stop on the run registry"""
+    registry = LocalSimulationRegistry()
+    registry.start(1, duration=10, speed_factor=2.0)
+    registry.start(2, duration=10, speed_factor=1.0)
+
+    registry.advance(1, 0.5)
+    assert registry.advance(1, 0.5) == pytest.approx(1.0)
+    assert registry.get(1)["elapsed"] == pytest.approx(1.0)
+
+    registry.stop(2)
+    assert registry.is_running(1)
+    assert not registry.is_running(2)
+    assert not registry.is_running(3)
+    assert list(registry.running()) == [1]
+
+
+def test_published_rows_replay_on_peer_feed():
+    """Test a tick on one worker reaches another worker's feed as the same delta"""
+    initial = [vehicle_row(1, 0.0), vehicle_row(2, 50.0)]
+    local = loaded_feed(initial)
+    peer = loaded_feed(initial)
+    publisher = FakePublisher()
+    bus = ChangeBus(enabled=True, worker_id="worker-a", client_factory=lambda: publisher)
+    local.listeners.append(bus.publish)
+
+    rows = [vehicle_row(1, 1.0), vehicle_row(2, 50.0, VehicleState.EXITED)]
+    version = local._apply(local._feeds[1], rows)
+    local._notify(1, rows)
+
+    channel, data = publisher.messages[-1]
+    assert channel == "sim:changes:1"
+    # A worker ignores its own messages
+    assert bus.decode(data) is None
+    message = ChangeBus(worker_id="worker-b").decode(data)
+    peer.apply_rows(message["intersection_id"], message["rows"])
+
+    assert peer._feeds[1].rows == local._feeds[1].rows == {1: vehicle_row(1, 1.0)}
+    delta = peer.changes_since(None, 1, since=1000, origin=1000)
+    assert [row[0] for row in delta["upserts"]] == [1]
+    assert delta["removed"] == [2]
+    assert version == delta["version"]
+
+    # Intersections a peer has not loaded are left to load from the database
+    assert peer.apply_rows(7, json.loads(data)["rows"]) is None
+
+
+def test_bad_messages_do_not_stop_the_listener(caplog):
+    """Test a malformed or failing message is skipped and later ones still apply"""
+    good = json.dumps({"worker": "worker-b", "intersection_id": 1, "rows": None})
+    subscriptions = []
+
+    class FakeAsyncRedis:
+        def pubsub(self, ignore_subscribe_messages=False):
+            subscriptions.append(1)
+            return FakePubSub(["not json", json.dumps({"rows": []}), good.replace('"rows"', '"rows_"'), good])
+
+    bus = ChangeBus(enabled=True, worker_id="worker-a", async_client_factory=FakeAsyncRedis)
+    handled = []
+
+    def handle(message):
+        handled.append(message)
+        if "rows" not in message:
+            raise KeyError("rows")
+
+    async def scenario():
+        task = asyncio.create_task(bus.listen(handle))
+        for _ in range(50):
+            await asyncio.sleep(0)
+        assert not task.done()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert handled[-1] == json.loads(good)
+    assert subscriptions == [1]
+    assert len([r for r in caplog.records if r.message.startswith("Skipping change message")]) == 3
+
+
+def test_cursor_from_another_worker_gets_full_snapshot():
+    """Test a version issued by one worker's feed is never patched from another worker's log"""
+    initial = [vehicle_row(1, 0.0), vehicle_row(2, 50.0)]
+    worker_a = loaded_feed(initial, origin=1001)
+    # Loaded a millisecond earlier: A's cursors fall inside B's history
+    worker_b = loaded_feed(initial, origin=1000)
+    worker_a._apply(worker_a._feeds[1], [vehicle_row(1, 1.0)])
+    for position in (1.0, 2.0, 3.0):
+        worker_b._apply(worker_b._feeds[1], [vehicle_row(2, 50.0 + position)])
+
+    cursor = worker_a.changes_since(None, 1)
+    assert cursor["version"] == 1002
+    delta = worker_b.changes_since(None, 1, since=cursor["version"], origin=cursor["origin"])
+    assert delta["full"] is True and delta["origin"] == 1000
+    assert sorted(row[0] for row in delta["upserts"]) == [1, 2]
+
+    # Without an origin there is nothing to check the version against
+    assert worker_b.changes_since(None, 1, since=1002)["full"] is True
+    assert worker_b.changes_since(None, 1, since=1002, origin=1000)["full"] is False
+
+
+def test_only_lease_holder_ticks(monkeypatch):
+    """Test two workers sharing run state tick each simulation exactly once per pass"""
+    registry = LocalSimulationRegistry()
+    registry.start(1, duration=60, speed_factor=1.0)
+    clock = FakeClock()
+    table = {}
+    ticks = []
+
+    monkeypatch.setattr(simulation, "simulation_registry", registry)
+    monkeypatch.setattr(simulation, "SessionLocal", FakeSession)
+
+    owned = {"worker-a": set(), "worker-b": set()}
+
+    def tick_pass(worker):
+        monkeypatch.setattr(simulation, "simulation_leases", LocalLeases(worker, ttl=5.0, table=table, clock=clock))
+        monkeypatch.setattr(simulation, "run_tick", lambda db, iid, dt: ticks.append((worker, iid)))
+        simulation.tick_owned_simulations(owned[worker])
+
+    for worker in ["worker-a", "worker-b", "worker-a", "worker-b"]:
+        tick_pass(worker)
+    assert ticks == [("worker-a", 1), ("worker-a", 1)]
+
+    # worker-a dies without releasing; after the TTL worker-b takes over
+    clock.now = 6.0
+    tick_pass("worker-b")
+    assert ticks[-1] == ("worker-b", 1)
+    assert registry.get(1)["elapsed"] == pytest.approx(3 * simulation.settings.simulation_tick_interval)
@@ -0,0 +1,52 @@
+"""Unit tests for pool and statement instrumentation"""
+import pytest
+from sqlalchemy import create_engine, exc, text
+from app.services.db_metrics import DatabaseMetrics, InstrumentedQueuePool, db_metrics, statement_shape
+
+
+def test_statement_shapes_group_in_lists():
+    """Test IN lists with different bind counts share one shape"""
+    assert statement_shape("SELECT *\n  FROM t WHERE id IN (?, ?, ?)") == statement_shape(
+        "SELECT * FROM t WHERE id IN (?)"
+    )
+
+
+def test_statement_latency_histograms(tmp_path):
+    """Test each executed statement lands in its shape's histogram"""
+    metrics = DatabaseMetrics()
+    engine = create_engine(f"sqlite:///{tmp_path / 'metrics.db'}")
+    metrics.instrument(engine, "test")
+    
+    with engine.connect() as conn:
+        for i in range(3):
+            conn.execute(text("SELECT :value"), {"value": i})
+    
+    snapshot = metrics.snapshot()
+    select = next(s for s in snapshot["statements"] if s["statement"] == "SELECT ?")
+    assert select["count"] == 3
+    assert select["buckets"]["+Inf"] == 3
+    assert "test" in snapshot["pools"]
+
+
+def test_checkout_wait_and_saturation(tmp_path):
+    """Test checkout waits, timeouts and saturation are reported"""
+    db_metrics.reset()
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    
+    held = engine.connect()
+    status = db_metrics.pool_status(engine.pool)
+    assert status["checked_out"] == 1
+    assert status["saturation"] == 1.0
+    
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    held.close()
+    
+    assert db_metrics.checkout_timeouts == 1
+    assert db_metrics.checkout_wait.count == 2
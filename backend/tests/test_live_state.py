@@ -0,0 +1,262 @@
+"""Tests for Redis-resident live state and write-behind persistence"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, Session
+from app.models.base import Base
+from app.models.city import City
+from app.models.intersection import Intersection
+from app.models.lane import Lane, Direction
+from app.models.signal import Signal, SignalState
+from app.models.simulation_state import SimulationState
+from app.models.vehicle import Vehicle, VehicleType, VehicleState
+from app.simulation import LiveStateStore, VehicleSimulation, change_feed
+
+DT = 0.1
+
+
+class FakeRedis:
+    """In-memory stand-in for the Redis commands the store uses (string replies)"""
+
+    def __init__(self):
+        self.data = {}
+
+    def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    def hget(self, key, field):
+        return self.data.get(key, {}).get(str(field))
+
+    def hmget(self, key, fields):
+        return [self.hget(key, field) for field in fields]
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        values = self.data.setdefault(key, {})
+        if field is not None:
+            values[str(field)] = str(value)
+        for k, v in (mapping or {}).items():
+            values[str(k)] = str(v)
+
+    def hdel(self, key, *fields):
+        values = self.data.get(key, {})
+        for field in fields:
+            values.pop(str(field), None)
+        if not values:
+            self.data.pop(key, None)
+
+    def sadd(self, key, *members):
+        self.data.setdefault(key, set()).update(str(m) for m in members)
+
+    def srem(self, key, *members):
+        self.data.get(key, set()).difference_update(str(m) for m in members)
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def transaction(self, func, *watches):
+        pipe = WatchedPipeline(self)
+        func(pipe)
+        return pipe.execute()
+
+
+class FakePipeline:
+    """Queues commands and replays them on execute, like a MULTI/EXEC block"""
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class WatchedPipeline(FakePipeline):
+    """Runs commands immediately until multi(), like a pipeline under WATCH"""
+
+    def __init__(self, client):
+        super().__init__(client)
+        self.queued = False
+
+    def multi(self):
+        self.queued = True
+
+    def __getattr__(self, name):
+        if not self.queued:
+            return getattr(self.client, name)
+        return super().__getattr__(name)
+
+
+def make_session() -> Session:
+    """Intersection with one green signal, one lane and four vehicles (one about to exit)"""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+
+    city = City(name="Test City", state="Test State", latitude=0.0, longitude=0.0)
+    db.add(city)
+    db.commit()
+    intersection = Intersection(name="Test Intersection", city_id=city.id, latitude=0.0, longitude=0.0)
+    db.add(intersection)
+    db.commit()
+    db.add(Lane(name="Lane NORTH", intersection_id=intersection.id, direction=Direction.NORTH))
+    db.add(Signal(name="Main", intersection_id=intersection.id, state=SignalState.GREEN, remaining_time=30))
+    db.add(SimulationState(city_id=city.id, intersection_id=intersection.id, is_running=1))
+    for i, position in enumerate([0.0, 10.0, 20.0, 99.9]):
+        db.add(Vehicle(
+            vehicle_id=f"veh-{i}",
+            vehicle_type=VehicleType.CAR,
+            intersection_id=intersection.id,
+            lane_id=1,
+            position=position,
+            speed=10.0 if position > 99 else 0.0,
+            state=VehicleState.MOVING,
+            entry_time=0.0,
+        ))
+    db.commit()
+    return db
+
+
+def positions(db: Session):
+    db.expire_all()
+    return {v.id: (round(v.position, 6), v.state) for v in db.query(Vehicle).all()}
+
+
+@pytest.fixture(autouse=True)
+def fresh_change_feed(monkeypatch):
+    """Other tests load the same intersection ids into the shared feed"""
+    monkeypatch.setattr(change_feed, "_feeds", {})
+
+
+def test_ticks_stay_in_redis_until_flushed():
+    """Test ticks write Redis only, and a flush brings the database level with it"""
+    db = make_session()
+    redis = FakeRedis()
+    store = LiveStateStore(enabled=True, client_factory=lambda: redis)
+    sim = VehicleSimulation(live_store=store)
+    before = positions(db)
+
+    for _ in range(5):
+        snapshot = sim.simulate_step(db, 1, DT)
+
+    assert positions(db) == before
+    assert snapshot.exited == 1
+    assert len(snapshot.vehicles) == len(store.load(db, 1).vehicles) == 3
+
+    assert store.flush(db, 1) == 5  # three active vehicles, the exited one, one signal
+    persisted = positions(db)
+    assert persisted[4][1] == VehicleState.EXITED
+    assert {v.id: (round(v.position, 6), v.state) for v in store.load(db, 1).vehicles} == {
+        i: persisted[i] for i in (1, 2, 3)
+    }
+    assert db.query(SimulationState).first().simulation_time == pytest.approx(5 * DT)
+    # Persisted exits no longer ride along in Redis, and nothing is left to flush
+    assert "4" not in redis.hgetall("live:1:vehicles")
+    assert store.flush(db, 1) == 0
+
+
+def test_live_and_database_steps_agree():
+    """Test the in-memory tick produces the same state as the database tick"""
+    database_db = make_session()
+    database_sim = VehicleSimulation(live_store=LiveStateStore(enabled=False))
+    live_db = make_session()
+    redis = FakeRedis()
+    store = LiveStateStore(enabled=True, client_factory=lambda: redis)
+    live_sim = VehicleSimulation(live_store=store)
+
+    for _ in range(20):
+        database_sim.simulate_step(database_db, 1, DT)
+        live_sim.simulate_step(live_db, 1, DT)
+    store.flush(live_db, 1)
+
+    assert positions(live_db) == positions(database_db)
+
+
+def test_redis_loss_costs_at_most_one_flush_interval():
+    """Test a crash rolls state back to the last flush and no further"""
+    db = make_session()
+    redis = FakeRedis()
+    store = LiveStateStore(enabled=True, client_factory=lambda: redis)
+    sim = VehicleSimulation(live_store=store)
+    flush_every = 4
+
+    flushed = None
+    for tick in range(1, 11):
+        snapshot = sim.simulate_step(db, 1, DT)
+        if tick % flush_every == 0:
+            store.flush(db, 1)
+            flushed = (tick, {v.id: round(v.position, 6) for v in snapshot.vehicles})
+
+    # Crash: Redis and the process lose everything not yet flushed
+    restarted = LiveStateStore(enabled=True, client_factory=lambda: FakeRedis())
+    recovered = restarted.load(db, 1)
+
+    last_flush_tick, flushed_positions = flushed
+    lost_ticks = 10 - round(recovered.simulation_time / DT)
+    assert round(recovered.simulation_time / DT) == last_flush_tick
+    assert 0 <= lost_ticks < flush_every
+    assert {v.id: round(v.position, 6) for v in recovered.vehicles} == {
+        i: p for i, p in flushed_positions.items() if i != 4
+    }
+
+
+def test_signal_changes_keep_the_ticked_phase():
+    """Test optimizer timings reach the live signals without rolling back their phase"""
+    db = make_session()
+    redis = FakeRedis()
+    store = LiveStateStore(enabled=True, client_factory=lambda: redis)
+    sim = VehicleSimulation(live_store=store)
+    for _ in range(3):
+        sim.simulate_step(db, 1, DT)
+    store.flush(db, 1)
+    ticked = store.load(db, 1).signals[0]
+    assert ticked.remaining_time < 30
+
+    # Signal 99 is not in live state and is skipped
+    store.apply_signal_changes(1, {
+        ticked.id: {"adaptive_green_duration": 42, "is_optimized": True},
+        99: {"is_optimized": True},
+    })
+
+    signal = store.load(db, 1).signals[0]
+    assert (signal.state, signal.remaining_time) == (ticked.state, ticked.remaining_time)
+    assert (signal.adaptive_green_duration, signal.is_optimized) == (42, True)
+    assert set(redis.hgetall("live:1:signals")) == {str(ticked.id)}
+    assert store.flush(db, 1) == 1
+
+
+def test_failed_flush_keeps_rows_dirty(monkeypatch):
+    """Test a database error during flush loses nothing; the next flush writes it"""
+    db = make_session()
+    redis = FakeRedis()
+    store = LiveStateStore(enabled=True, client_factory=lambda: redis)
+    sim = VehicleSimulation(live_store=store)
+    for _ in range(3):
+        sim.simulate_step(db, 1, DT)
+    before = positions(db)
+
+    def broken_commit():
+        raise RuntimeError("database unavailable")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(db, "commit", broken_commit)
+        with pytest.raises(RuntimeError):
+            store.flush(db, 1)
+    assert positions(db) == before
+
+    assert store.flush(db, 1) == 5
+    assert positions(db) != before
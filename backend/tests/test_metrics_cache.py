@@ -0,0 +1,218 @@
+"""Unit tests for the tick-aligned metrics cache"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker, Session
+from app.api import diagnostics, simulation
+from app.database import get_async_db
+from app.models.base import Base
+from app.models.city import City
+from app.models.intersection import Intersection
+from app.services import metrics_cache as metrics_cache_module
+from app.services.cache import TaggedCache, caches
+from app.services.metrics_cache import MetricsCache
+from app.simulation import change_feed
+
+
+class FakeRedis:
+    """String commands TaggedCache uses; one instance stands in for the Redis workers share"""
+
+    def __init__(self):
+        self.data = {}
+
+    def mget(self, keys):
+        return [self.data.get(k) for k in keys]
+
+    def setex(self, key, ttl, value):
+        self.data[key] = str(value)
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args):
+            self.commands.append((name, args))
+            return self
+        return queue
+
+    def execute(self):
+        return [getattr(self.client, name)(*args) for name, args in self.commands]
+
+
+class AsyncFakeRedis:
+    """Awaitable view of a FakeRedis, for the async request path"""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def mget(self, keys):
+        return self.client.mget(keys)
+
+    def pipeline(self, transaction=True):
+        return AsyncFakePipeline(self.client)
+
+
+class AsyncFakePipeline(FakePipeline):
+    async def execute(self):
+        return super().execute()
+
+
+def make_cache(redis):
+    return MetricsCache(TaggedCache("test-metrics", l1_entries=0, tag_refresh=0, client_factory=lambda: redis))
+
+
+@pytest.fixture
+def db_session():
+    """Create test database session"""
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    monkeypatch.setattr(change_feed, "_feeds", {})
+    monkeypatch.setattr(change_feed, "listeners", [])
+    return FakeRedis()
+
+
+@pytest.fixture
+def intersection(db_session: Session):
+    """Create an intersection"""
+    city = City(name="Test City", state="Test State", latitude=0.0, longitude=0.0)
+    db_session.add(city)
+    db_session.commit()
+    
+    intersection = Intersection(name="Test Intersection", city_id=city.id, latitude=0.0, longitude=0.0)
+    db_session.add(intersection)
+    db_session.commit()
+    return intersection
+
+
+def test_metrics_computed_once_per_tick(db_session: Session, intersection, redis):
+    """Test readers share one computation until the tick version advances"""
+    cache = make_cache(redis)
+    change_feed.listeners.append(cache.retire)
+    calls = []
+    
+    def compute():
+        calls.append(1)
+        return {"tick": len(calls)}
+    
+    first = cache.get_or_compute(db_session, intersection.id, compute)
+    for _ in range(10):
+        assert cache.get_or_compute(db_session, intersection.id, compute) is first
+        assert cache.peek(intersection.id) is first
+    assert len(calls) == 1
+    
+    change_feed.bump(intersection.id)
+    assert cache.peek(intersection.id) is None
+    
+    second = cache.get_or_compute(db_session, intersection.id, compute)
+    assert second.payload == {"tick": 2}
+    assert second.version > first.version
+
+
+def test_workers_share_metrics_per_tick(db_session: Session, intersection, redis):
+    """Test a peer reads the ticking worker's metrics from Redis until the next committed tick"""
+    ticking, peer = make_cache(redis), make_cache(redis)
+    change_feed.listeners.append(ticking.retire)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"tick": len(calls)}
+
+    ticking.get_or_compute(db_session, intersection.id, compute)
+    assert peer.get_or_compute(db_session, intersection.id, compute).payload == {"tick": 1}
+    assert len(calls) == 1
+
+    # Only the committing worker bumps the shared tick; the peer follows it
+    change_feed.bump(intersection.id)
+    assert peer.get_or_compute(db_session, intersection.id, compute).payload == {"tick": 2}
+    assert ticking.get_or_compute(db_session, intersection.id, compute).payload == {"tick": 2}
+    assert len(calls) == 2
+
+
+def test_metrics_overlapping_a_tick_are_not_kept(db_session: Session, intersection, redis):
+    """Test a result computed while a tick was published is returned but never served again"""
+    cache = make_cache(redis)
+    change_feed.listeners.append(cache.retire)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        if len(calls) == 1:
+            # The tick commits while these (pre-tick) metrics are being read
+            change_feed.bump(intersection.id)
+        return {"tick": len(calls)}
+
+    assert cache.get_or_compute(db_session, intersection.id, compute).payload == {"tick": 1}
+    assert cache.peek(intersection.id) is None
+    assert cache.get_or_compute(db_session, intersection.id, compute).payload == {"tick": 2}
+    assert make_cache(redis).get_or_compute(db_session, intersection.id, compute).payload == {"tick": 2}
+    assert len(calls) == 2
+
+
+def test_metrics_endpoint_uses_shared_tier(monkeypatch, tmp_path, redis):
+    """Test the metrics endpoint reads through the "metrics" tagged cache, per intersection"""
+    url = tmp_path / "metrics.db"
+    engine = create_engine(f"sqlite:///{url}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Intersection(
+            name="Test Intersection", city=City(name="Test City", state="Test State", latitude=0.0, longitude=0.0),
+            latitude=0.0, longitude=0.0,
+        ))
+        db.commit()
+    AsyncSessionLocal = async_sessionmaker(create_async_engine(f"sqlite+aiosqlite:///{url}"))
+
+    async def override_get_async_db():
+        async with AsyncSessionLocal() as session:
+            yield session
+
+    # The constructor registers the namespace; restore the real one afterwards
+    monkeypatch.setitem(caches, "metrics", caches["metrics"])
+    cache = MetricsCache(TaggedCache(
+        "metrics", l1_entries=0, tag_refresh=0,
+        client_factory=lambda: redis, async_client_factory=lambda: AsyncFakeRedis(redis),
+    ))
+    monkeypatch.setattr(metrics_cache_module, "metrics_cache", cache)
+    monkeypatch.setattr(simulation, "metrics_cache", cache)
+    change_feed.listeners.append(cache.retire)
+
+    app = FastAPI()
+    app.include_router(simulation.router)
+    app.include_router(diagnostics.router)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    client = TestClient(app)
+
+    first = client.get("/api/simulation/metrics/1")
+    assert first.status_code == 200
+    assert [key for key in redis.data if key.startswith("metrics:1@")]
+
+    # Another worker: nothing in process, the body comes from Redis
+    cache._entries.clear()
+    assert client.get("/api/simulation/metrics/1").content == first.content
+    stats = {s["namespace"]: s for s in client.get("/api/diagnostics/cache").json()}["metrics"]
+    assert (stats["misses"], stats["l2_hits"], stats["sets"]) == (1, 1, 1)
+
+    change_feed.bump(1)
+    client.get("/api/simulation/metrics/1")
+    stats = {s["namespace"]: s for s in client.get("/api/diagnostics/cache").json()}["metrics"]
+    assert (stats["misses"], stats["sets"], stats["invalidations"]) == (2, 2, 1)
@@ -6,6 +6,7 @@ from app.models.base import Base
 from app.models.city import City
 from app.models.intersection import Intersection
 from app.models.lane import Lane, Direction
+from app.models.signal import Signal
 from app.models.vehicle import Vehicle, VehicleType, VehicleState
 from app.optimization import SignalOptimizer
 
@@ -118,5 +119,38 @@ def test_emergency_detection(db_session: Session, sample_data):
     assert has_emergency is True
 
 
+def test_city_optimization_matches_per_intersection(db_session: Session, sample_data):
+    """Test city-wide batch optimization agrees with the per-intersection path"""
+    optimizer = SignalOptimizer()
+    intersection = sample_data["intersection"]
+    
+    for name in ["Signal NS", "Signal EW"]:
+        db_session.add(Signal(name=name, intersection_id=intersection.id))
+    
+    vehicle_types = [VehicleType.CAR, VehicleType.BUS, VehicleType.TRUCK]
+    for i, lane in enumerate(sample_data["lanes"][:2]):
+        for j in range(3 * (i + 1)):
+            db_session.add(Vehicle(
+                vehicle_id=f"veh-{i}-{j}",
+                vehicle_type=vehicle_types[j % len(vehicle_types)],
+                intersection_id=intersection.id,
+                lane_id=lane.id,
+                state=VehicleState.WAITING,
+                entry_time=0.0,
+            ))
+    db_session.commit()
+    
+    expected = optimizer.optimize_signal_timing(db_session, intersection.id)
+    result = optimizer.optimize_city(db_session, sample_data["city"].id)
+    
+    assert result["optimized_timings"] == {intersection.id: expected}
+    assert result["signals_updated"] == 2
+    assert set(result["timings_ms"]) == {"load", "solve", "write", "total"}
+    
+    signals = db_session.query(Signal).filter_by(intersection_id=intersection.id).all()
+    assert all(s.is_optimized for s in signals)
+    assert {s.id: s.adaptive_green_duration for s in signals} == expected
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,203 @@
+"""Tests for vehicle partition maintenance and the run window used for pruning"""
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.models.base import Base
+from app.models.city import City
+from app.models.intersection import Intersection
+from app.models.simulation_state import SimulationState
+from app.models.vehicle import Vehicle, VehicleType, VehicleState
+from app.services.partitions import Partition, days_to_create, expired, maintain, partition_name
+from app.simulation import RunWindows, VehicleSimulation, change_feed, run_windows
+from app.simulation.live_state import LiveStateStore, load_snapshot
+
+TODAY = date(2026, 10, 19)
+
+
+def test_days_to_create_starts_after_covered_range():
+    """Test only days not yet covered, through the look-ahead, are created"""
+    legacy = Partition("vehicles_legacy", TODAY + timedelta(days=1), 1000)
+    default = Partition("vehicles_default", None, 0)
+    assert days_to_create([legacy, default], TODAY, 3) == [TODAY + timedelta(days=n) for n in (1, 2, 3)]
+
+    covered = [legacy, Partition(partition_name(TODAY + timedelta(days=1)), TODAY + timedelta(days=2), 0)]
+    assert days_to_create(covered, TODAY, 1) == []
+    # Maintenance that lapsed resumes from today, not from the last partition
+    stale = [Partition("vehicles_p20261001", date(2026, 10, 2), 0)]
+    assert days_to_create(stale, TODAY, 0) == [TODAY]
+    assert partition_name(TODAY) == "vehicles_p20261019"
+
+
+def test_expired_keeps_retention_window_and_default():
+    """Test only partitions entirely older than the retention window are dropped"""
+    partitions = [
+        Partition("vehicles_legacy", date(2026, 10, 10), 0),
+        Partition("vehicles_p20261015", date(2026, 10, 16), 0),
+        Partition("vehicles_p20261016", date(2026, 10, 17), 0),
+        Partition("vehicles_default", None, 0),
+    ]
+    assert [p.name for p in expired(partitions, TODAY, 3)] == ["vehicles_legacy", "vehicles_p20261015"]
+
+
+class Result:
+    def __init__(self, value=None, rows=()):
+        self.value, self.rows = value, rows
+
+    def scalar(self):
+        return self.value
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class ScriptedConnection:
+    """Stands in for a PostgreSQL connection: records DDL and answers the catalog queries"""
+
+    dialect = SimpleNamespace(name="postgresql")
+
+    def __init__(self, partitions, stranded=(), fail=()):
+        self.partitions = partitions
+        self.stranded = stranded  # days with rows in vehicles_default
+        self.fail = fail  # partition names whose CREATE errors
+        self.statements = []
+        self.rolled_back = 0
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        if "pg_partitioned_table" in sql:
+            return Result(True)
+        if "CURRENT_DATE" in sql:
+            return Result(TODAY)
+        if "pg_inherits" in sql:
+            return Result(rows=self.partitions)
+        return Result()
+
+    def exec_driver_sql(self, sql):
+        self.statements.append(sql)
+        if sql.startswith("SELECT EXISTS (SELECT 1 FROM vehicles_default"):
+            return Result(any(f"'{day}'" in sql for day in self.stranded))
+        if sql.startswith("SELECT EXISTS"):
+            return Result(False)
+        if sql.startswith("CREATE TABLE") and any(name in sql for name in self.fail):
+            raise RuntimeError("lock timeout")
+        return Result()
+
+    @contextmanager
+    def begin_nested(self):
+        try:
+            yield
+        except Exception:
+            self.rolled_back += 1
+            raise
+
+
+def scripted_engine(conn):
+    return SimpleNamespace(begin=contextmanager(lambda: (yield conn)))
+
+
+PARTITIONS = [
+    ("vehicles_legacy", "FOR VALUES FROM (MINVALUE) TO ('2026-10-10 00:00:00')", 100),
+    ("vehicles_p20261019", "FOR VALUES FROM ('2026-10-19') TO ('2026-10-20 00:00:00')", 10),
+    ("vehicles_default", "DEFAULT", 5),
+]
+
+
+def test_maintenance_moves_rows_out_of_default_partition():
+    """Test a day the default partition already holds rows for is created by moving them"""
+    conn = ScriptedConnection(PARTITIONS, stranded=[TODAY + timedelta(days=1)])
+    report = maintain(scripted_engine(conn), days_ahead=2, retention_days=0)
+    assert report["created"] == ["vehicles_p20261020", "vehicles_p20261021"]
+    assert report["failed"] == []
+
+    ddl = [sql for sql in conn.statements if not sql.startswith(("SELECT", "SET"))]
+    assert ddl == [
+        "ALTER TABLE vehicles DETACH PARTITION vehicles_default",
+        "CREATE TABLE vehicles_p20261020 PARTITION OF vehicles FOR VALUES FROM ('2026-10-20') TO ('2026-10-21')",
+        "WITH moved AS (DELETE FROM vehicles_default WHERE created_at >= '2026-10-20' "
+        "AND created_at < '2026-10-21' RETURNING *) INSERT INTO vehicles_p20261020 SELECT * FROM moved",
+        "ALTER TABLE vehicles ATTACH PARTITION vehicles_default DEFAULT",
+        "CREATE TABLE IF NOT EXISTS vehicles_p20261021 PARTITION OF vehicles "
+        "FOR VALUES FROM ('2026-10-21') TO ('2026-10-22')",
+    ]
+
+
+def test_failed_partition_does_not_stop_retention():
+    """Test a day that cannot be created is reported and retention still drops old partitions"""
+    conn = ScriptedConnection(PARTITIONS, stranded=[TODAY + timedelta(days=1)], fail=["vehicles_p20261020"])
+    report = maintain(scripted_engine(conn), days_ahead=2, retention_days=3)
+    assert report["created"] == []
+    assert report["failed"] == ["vehicles_p20261020"]
+    assert report["dropped"] == ["vehicles_legacy"]
+    assert conn.rolled_back == 1
+    # The gap is not skipped: later days wait for the next pass
+    assert not any("vehicles_p20261021" in sql for sql in conn.statements)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(run_windows, "_since", {})
+    monkeypatch.setattr(change_feed, "_feeds", {})
+    session = sessionmaker(bind=engine)()
+    city = City(name="Test City", state="Test State", latitude=0.0, longitude=0.0)
+    session.add(city)
+    session.commit()
+    intersection = Intersection(name="Test Intersection", city_id=city.id, latitude=0.0, longitude=0.0)
+    session.add(intersection)
+    session.commit()
+    session.add(SimulationState(city_id=city.id, intersection_id=intersection.id))
+    session.commit()
+    yield session
+    session.close()
+
+
+def add_vehicle(db, name, state, created_at=None):
+    vehicle = Vehicle(vehicle_id=name, vehicle_type=VehicleType.CAR, intersection_id=1, state=state, entry_time=0.0)
+    if created_at is not None:
+        vehicle.created_at = created_at
+    db.add(vehicle)
+
+
+def test_maintenance_skips_unpartitioned_databases(db):
+    """Test SQLite (and unmigrated PostgreSQL) report no partitioning"""
+    assert maintain(db.get_bind()) == {"partitioned": False}
+
+
+def test_run_window_bounds_active_vehicles(db):
+    """Test the bound keeps every active vehicle, including ones carried over from earlier runs"""
+    now = datetime.utcnow()
+    add_vehicle(db, "old-exited", VehicleState.EXITED, now - timedelta(days=3))
+    add_vehicle(db, "carried-over", VehicleState.WAITING, now - timedelta(days=1))
+    add_vehicle(db, "exited", VehicleState.EXITED, now - timedelta(hours=1))
+    db.commit()
+
+    assert run_windows.since(db, 1) is None
+    since = run_windows.start(db, 1)
+    assert since == db.query(Vehicle.created_at).filter_by(vehicle_id="carried-over").scalar() - timedelta(minutes=5)
+    assert db.query(SimulationState.active_since).scalar() == since
+
+    add_vehicle(db, "new", VehicleState.MOVING, now)
+    db.commit()
+    snapshot = load_snapshot(db, 1)
+    assert sorted(v.vehicle_id for v in snapshot.vehicles) == ["carried-over", "new"]
+    assert snapshot.exited == 2
+
+    # Another worker reads the persisted bound
+    assert RunWindows().since(db, 1) == since
+    simulation = VehicleSimulation(live_store=LiveStateStore())
+    simulation.simulate_step(db, 1, 0.1)
+    assert change_feed.loaded_version(1) is not None
+
+
+def test_run_window_without_active_vehicles_uses_database_clock(db):
+    """Test an empty intersection's bound is the database's now, minus the slack"""
+    since = run_windows.start(db, 1)
+    add_vehicle(db, "first", VehicleState.WAITING)
+    db.commit()
+    created = db.query(Vehicle.created_at).scalar()
+    assert since <= created
+    assert created - since < timedelta(minutes=6)
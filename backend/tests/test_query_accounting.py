@@ -0,0 +1,145 @@
+"""Tests for per-request statement accounting and endpoint query budgets"""
+import logging
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker, Session
+from app.api import simulation, vehicles
+from app.database import get_async_db, get_db
+from app.models.base import Base
+from app.models.city import City
+from app.models.intersection import Intersection
+from app.models.lane import Lane, Direction
+from app.models.signal import Signal, SignalState
+from app.models.vehicle import Vehicle, VehicleType, VehicleState
+from app.services import query_accounting
+from app.services.metrics_cache import metrics_cache
+from app.services.query_accounting import QueryAccountingMiddleware
+from app.simulation import VehicleSimulation, change_feed, run_windows
+
+# More lanes and vehicles than the repeat threshold, so a query per lane or per row is caught
+LANES = 12
+VEHICLES = 36
+
+
+@pytest.fixture
+def sessions(monkeypatch, tmp_path):
+    """Sync and async session factories on one seeded SQLite file, both accounted"""
+    monkeypatch.setattr(change_feed, "_feeds", {})
+    monkeypatch.setattr(run_windows, "_since", {})
+    monkeypatch.setattr(metrics_cache, "_entries", {})
+    url = f"sqlite:///{tmp_path / 'accounting.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    db = Session(engine)
+    intersection = Intersection(
+        name="Test Intersection", city=City(name="Test City", state="Test State", latitude=0.0, longitude=0.0),
+        latitude=0.0, longitude=0.0,
+    )
+    directions = list(Direction)
+    for i in range(LANES):
+        intersection.lanes.append(Lane(name=f"Lane {i}", direction=directions[i % len(directions)]))
+    intersection.signals.append(Signal(name="Signal NS", state=SignalState.GREEN, remaining_time=30.0))
+    intersection.signals.append(Signal(name="Signal EW", state=SignalState.RED, remaining_time=30.0))
+    db.add(intersection)
+    db.commit()
+    for i in range(VEHICLES):
+        db.add(Vehicle(
+            vehicle_id=f"veh-{i}", vehicle_type=VehicleType.BUS if i % 4 == 0 else VehicleType.CAR,
+            intersection_id=intersection.id, lane_id=intersection.lanes[i % LANES].id,
+            position=float(i), state=VehicleState.WAITING, is_emergency=i == 5, entry_time=0.0,
+        ))
+    db.commit()
+    db.close()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'accounting.db'}")
+    query_accounting.install(engine)
+    query_accounting.install(async_engine.sync_engine)
+    return sessionmaker(bind=engine), async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+@pytest.fixture
+def client(sessions):
+    SessionLocal, AsyncSessionLocal = sessions
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with AsyncSessionLocal() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(simulation.router)
+    app.include_router(vehicles.router)
+    app.add_middleware(QueryAccountingMiddleware)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
+    @app.get("/per-row")
+    def per_row(db: Session = Depends(get_db)):
+        """A deliberately N+1 handler"""
+        ids = [v.id for v in db.query(Vehicle.id).all()]
+        return [db.get(Vehicle, vehicle_id).vehicle_id for vehicle_id in ids]
+
+    return TestClient(app)
+
+
+def test_response_headers_report_statements(client):
+    """Test every response carries statement count and database time"""
+    response = client.get("/api/vehicles", params={"intersection_id": 1})
+    assert response.status_code == 200
+    assert response.headers["x-db-queries"] == "1"
+    assert float(response.headers["x-db-time-ms"]) > 0
+    assert "x-db-repeated" not in response.headers
+
+    response = client.post("/api/simulation/optimize/1")
+    assert int(response.headers["x-db-rows"]) > 0  # signal updates
+
+
+def test_repeated_statements_are_flagged(client, caplog):
+    """Test a query per row is marked in the headers and logged as a likely N+1"""
+    with caplog.at_level(logging.WARNING, logger="app.services.query_accounting"):
+        response = client.get("/per-row")
+    assert int(response.headers["x-db-queries"]) == VEHICLES + 1
+    assert response.headers["x-db-repeated"] == "1"
+    assert "Likely N+1 in GET /per-row: 36 x SELECT vehicles" in caplog.text
+
+
+def test_query_budget_catches_per_row_queries(client, query_budget):
+    """Test the budget helper fails on a per-row loop even within the total limit"""
+    with pytest.raises(AssertionError, match="statements issued per row"):
+        with query_budget(100):
+            client.get("/per-row")
+
+
+@pytest.mark.parametrize("method, path, limit", [
+    ("GET", "/api/simulation/metrics/1", 8),
+    ("GET", "/api/simulation/scene/1", 10),  # cold: includes the geometry
+    ("POST", "/api/simulation/optimize/1", 9),
+    ("POST", "/api/simulation/optimize/city/1", 5),
+    ("GET", "/api/vehicles?intersection_id=1", 1),
+    ("GET", "/api/vehicles/changes?intersection_id=1", 2),
+])
+def test_endpoint_query_budgets(client, query_budget, method, path, limit):
+    """Test hot endpoints stay within a fixed number of statements, whatever the row count (cold caches)"""
+    with query_budget(limit):
+        assert client.request(method, path).status_code == 200
+
+
+def test_simulation_tick_query_budget(sessions, query_budget):
+    """Test a tick costs the same few statements however many vehicles move"""
+    SessionLocal, _ = sessions
+    db = SessionLocal()
+    try:
+        # Seven, plus two for the first tick building the change feed
+        with query_budget(9):
+            VehicleSimulation().simulate_step(db, 1, 0.1)
+    finally:
+        db.close()
@@ -0,0 +1,183 @@
+"""Plan regression tests: the hot simulation queries must stay on indexes"""
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session
+from app.models.base import Base
+from app.models.city import City
+from app.models.intersection import Intersection
+from app.models.lane import Lane, Direction
+from app.models.signal import Signal
+from app.models.simulation_state import SimulationState
+from app.models.vehicle import Vehicle, VehicleType, VehicleState
+from app.optimization import SignalOptimizer
+from app.schemas.vehicle import VehicleCreate
+from app.services.injection import InjectionQueue
+from app.simulation import LiveStateStore, VehicleChangeFeed, VehicleSimulation, change_feed, run_windows
+from app.simulation.live_state import load_snapshot
+
+INTERSECTIONS = 20
+VEHICLES = 40000
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    """SQLite database with a city of 20 intersections and 40,000 vehicles, mostly exited"""
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    # Let SQLAlchemy issue BEGIN itself so SAVEPOINTs work under pysqlite
+    event.listen(engine, "connect", lambda dbapi_connection, record: setattr(dbapi_connection, "isolation_level", None))
+    event.listen(engine, "begin", lambda conn: conn.exec_driver_sql("BEGIN"))
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        city_id = conn.execute(insert(City).values(name="Plan City", state="S", latitude=0.0, longitude=0.0)).inserted_primary_key[0]
+        conn.execute(insert(Intersection), [
+            {"name": f"Junction {i}", "city_id": city_id, "latitude": 0.0, "longitude": 0.0}
+            for i in range(INTERSECTIONS)
+        ])
+        conn.execute(insert(Lane), [
+            {"name": f"Lane {d.value}", "intersection_id": i + 1, "direction": d}
+            for i in range(INTERSECTIONS) for d in Direction
+        ])
+        conn.execute(insert(Signal), [
+            {"name": name, "intersection_id": i + 1}
+            for i in range(INTERSECTIONS) for name in ("Signal NS", "Signal EW")
+        ])
+        conn.execute(insert(Vehicle), [
+            {
+                "vehicle_id": f"veh-{n}",
+                "vehicle_type": VehicleType.CAR,
+                "intersection_id": n % INTERSECTIONS + 1,
+                "lane_id": n % (INTERSECTIONS * 4) + 1,
+                "position": float(n % 150),
+                "state": VehicleState.MOVING if n % 10 == 0 else VehicleState.EXITED,
+                "is_emergency": n % 997 == 0,
+                "entry_time": 0.0,
+            }
+            for n in range(VEHICLES)
+        ])
+        conn.exec_driver_sql("ANALYZE")
+    yield engine
+    engine.dispose()
+
+
+@contextmanager
+def rolled_back_session(engine):
+    """Session whose commits only release savepoints; everything is rolled back on exit"""
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
+
+
+@pytest.fixture
+def db(engine, monkeypatch):
+    """Every test starts from the same data"""
+    monkeypatch.setattr(change_feed, "_feeds", {})
+    monkeypatch.setattr(run_windows, "_since", {})
+    with rolled_back_session(engine) as session:
+        yield session
+
+
+@contextmanager
+def plans(db):
+    """Collect EXPLAIN QUERY PLAN details for every SELECT run inside the block"""
+    # EXPLAIN on the test's own connection: its uncommitted writes would lock out another
+    connection = db.connection()
+    engine = connection.engine
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    collected = []
+    try:
+        yield collected
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    for statement, parameters in statements:
+        steps = [row[3] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+        collected.append((statement, steps))
+
+
+def assert_no_scans(collected):
+    """No SELECT may walk a whole table or index"""
+    assert collected
+    for statement, steps in collected:
+        scans = [step for step in steps if step.startswith("SCAN")]
+        assert not scans, f"{statement}\n{steps}"
+
+
+def uses(collected, index):
+    return any(index in step for _, steps in collected for step in steps)
+
+
+def test_active_vehicle_loads_use_partial_index(db):
+    """Test the tick, snapshot and change-feed loads search only active vehicles"""
+    simulation = VehicleSimulation(live_store=LiveStateStore())
+    # A running intersection also bounds created_at, for partition pruning
+    run_windows.start(db, 1)
+    with plans(db) as collected:
+        simulation.simulate_step(db, 1, 0.1)
+        load_snapshot(db, 2)
+        VehicleChangeFeed()._load(db, 3)
+    assert_no_scans(collected)
+    assert any("vehicles.created_at >=" in statement for statement, _ in collected)
+    assert uses(collected, "ix_vehicles_active_intersection_id (intersection_id=?)")
+    # Exited count is answered from the (intersection_id, state) index alone
+    assert uses(collected, "COVERING INDEX ix_vehicles_intersection_id_state")
+
+
+def test_lane_queries_use_lane_position_index(db):
+    """Test injection's lane occupancy and the city optimizer's lane counts seek by lane"""
+    simulation = VehicleSimulation(live_store=LiveStateStore())
+    lane = db.get(Lane, 1)
+    queue = InjectionQueue(session_factory=None, simulation=simulation)
+    request = VehicleCreate(vehicle_type="CAR", intersection_id=lane.intersection_id, lane_id=lane.id)
+
+    with plans(db) as collected:
+        queue.admit(db, lane.intersection_id, [request])
+        SignalOptimizer().optimize_city(db, 1)
+    assert_no_scans(collected)
+    assert uses(collected, "COVERING INDEX ix_vehicles_lane_id_position (lane_id=? AND position<?)")
+    assert uses(collected, "ix_vehicles_lane_id_position (lane_id=?)")
+
+
+def test_emergency_detection_uses_partial_index(db):
+    """Test emergency detection only touches the emergency-vehicle index"""
+    with plans(db) as collected:
+        assert SignalOptimizer().detect_emergency_corridor(db, 1) is True
+    assert_no_scans(collected)
+    assert uses(collected, "ix_vehicles_emergency_intersection_id (intersection_id=?)")
+
+
+def test_commits_are_rolled_back(engine, monkeypatch):
+    """Test commits made inside a test's session are undone when it ends"""
+    monkeypatch.setattr(change_feed, "_feeds", {})
+    monkeypatch.setattr(run_windows, "_since", {})
+
+    def snapshot():
+        with engine.connect() as conn:
+            return [
+                conn.exec_driver_sql(sql).all() for sql in (
+                    "SELECT count(*), sum(position), max(updated_at) FROM vehicles",
+                    "SELECT count(*) FROM simulation_states",
+                )
+            ]
+
+    before = snapshot()
+    with rolled_back_session(engine) as session:
+        session.add(SimulationState(city_id=1, intersection_id=1, is_running=1))
+        session.commit()
+        run_windows.start(session, 1)
+        VehicleSimulation(live_store=LiveStateStore()).simulate_step(session, 1, 0.1)
+        session.query(Vehicle).filter(Vehicle.intersection_id == 2).delete()
+        session.commit()
+        assert session.query(Vehicle).filter(Vehicle.intersection_id == 2).count() == 0
+    assert snapshot() == before
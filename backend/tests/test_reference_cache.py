@@ -0,0 +1,97 @@
+"""API tests for cached city and intersection reads"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.database import get_db
+from app.models.base import Base
+from app.api import cities, intersections
+from app.services.response_cache import response_cache
+
+
+@pytest.fixture
+def client():
+    """Test client over an in-memory database, counting executed statements"""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    TestingSession = sessionmaker(bind=engine)
+    
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    
+    def override_get_db():
+        session = TestingSession()
+        try:
+            yield session
+        finally:
+            session.close()
+    
+    app = FastAPI()
+    app.include_router(cities.router)
+    app.include_router(intersections.router)
+    app.dependency_overrides[get_db] = override_get_db
+    response_cache.invalidate("cities", "intersections")
+    
+    client = TestClient(app)
+    client.statements = statements
+    return client
+
+
+CITY = {"name": "Pune", "state": "Maharashtra", "latitude": 18.52, "longitude": 73.85}
+
+
+def test_etag_and_not_modified(client):
+    """Test repeated reads are served from cache and honour If-None-Match"""
+    client.post("/api/cities", json=CITY)
+    
+    first = client.get("/api/cities")
+    etag = first.headers["ETag"]
+    assert first.json()[0]["name"] == "Pune"
+    
+    executed = len(client.statements)
+    second = client.get("/api/cities")
+    assert second.content == first.content
+    assert second.headers["ETag"] == etag
+    assert len(client.statements) == executed
+    
+    not_modified = client.get("/api/cities", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+
+def test_writes_invalidate(client):
+    """Test create/update/delete handlers invalidate cached reads"""
+    city_id = client.post("/api/cities", json=CITY).json()["id"]
+    client.post("/api/intersections", json={
+        "name": "Camp", "city_id": city_id, "latitude": 18.53, "longitude": 73.86,
+    })
+    etag = client.get(f"/api/cities/{city_id}").headers["ETag"]
+    assert len(client.get("/api/intersections", params={"city_id": city_id}).json()) == 1
+    
+    client.put(f"/api/cities/{city_id}", json={"description": "Oxford of the East"})
+    updated = client.get(f"/api/cities/{city_id}", headers={"If-None-Match": etag})
+    assert updated.status_code == 200
+    assert updated.json()["description"] == "Oxford of the East"
+    
+    client.delete(f"/api/cities/{city_id}")
+    assert client.get(f"/api/cities/{city_id}").status_code == 404
+    assert client.get("/api/intersections", params={"city_id": city_id}).json() == []
+
+
+def test_intersection_names_unique_per_city(client):
+    """Test creating or renaming to a name already used in the city is rejected"""
+    city_id = client.post("/api/cities", json=CITY).json()["id"]
+    camp = {"name": "Camp", "city_id": city_id, "latitude": 18.53, "longitude": 73.86}
+    client.post("/api/intersections", json=camp)
+    other_id = client.post("/api/intersections", json={**camp, "name": "Deccan"}).json()["id"]
+    
+    assert client.post("/api/intersections", json=camp).status_code == 400
+    renamed = client.put(f"/api/intersections/{other_id}", json={"name": "Camp"})
+    assert renamed.status_code == 400
+    assert renamed.json()["detail"] == "Intersection with this name already exists in this city"
+    # Keeping its own name is not a clash
+    assert client.put(f"/api/intersections/{other_id}", json={"name": "Deccan", "num_lanes": 6}).status_code == 200
@@ -0,0 +1,116 @@
+"""API tests for the scene snapshot endpoint"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import get_async_db
+from app.models.base import Base
+from app.models.city import City
+from app.models.intersection import Intersection
+from app.models.lane import Lane, Direction
+from app.models.signal import Signal
+from app.models.vehicle import Vehicle, VehicleType, VehicleState
+from app.api import simulation
+from app.services.response_cache import response_cache
+from app.simulation import change_feed, live_state
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    """Test client with one intersection, four lanes, two signals and six vehicles"""
+    database = tmp_path / "scene.db"
+    engine = create_engine(f"sqlite:///{database}")
+    Base.metadata.create_all(engine)
+
+    db = sessionmaker(bind=engine)()
+    city = City(name="Test City", state="Test State", latitude=0.0, longitude=0.0)
+    db.add(city)
+    db.commit()
+    intersection = Intersection(name="Test Intersection", city_id=city.id, latitude=0.0, longitude=0.0)
+    db.add(intersection)
+    db.commit()
+    for direction in Direction:
+        db.add(Lane(name=f"Lane {direction.value}", intersection_id=intersection.id, direction=direction))
+    db.add(Signal(name="North-South", intersection_id=intersection.id))
+    db.add(Signal(name="East-West", intersection_id=intersection.id))
+    db.commit()
+    for i in range(6):
+        db.add(Vehicle(
+            vehicle_id=f"veh-{i}",
+            vehicle_type=VehicleType.CAR,
+            intersection_id=intersection.id,
+            lane_id=1,
+            state=VehicleState.EXITED if i == 5 else VehicleState.MOVING,
+            entry_time=0.0,
+        ))
+    db.commit()
+    db.close()
+
+    # Start from clean process-wide caches; other tests reuse intersection ids
+    monkeypatch.setattr(change_feed, "_feeds", {})
+    response_cache.invalidate("intersections")
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{database}")
+    TestingAsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with TestingAsyncSession() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(simulation.router)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    return TestClient(app)
+
+
+def test_scene_has_geometry_and_one_tick(client):
+    """Test one request returns layout, vehicles and metrics for the same version"""
+    scene = client.get("/api/simulation/scene/1").json()
+
+    assert [lane["direction"] for lane in scene["geometry"]["lanes"]] == ["NORTH", "SOUTH", "EAST", "WEST"]
+    assert [signal["name"] for signal in scene["geometry"]["signals"]] == ["North-South", "East-West"]
+    assert len(scene["vehicles"]["rows"]) == 5
+    assert scene["vehicles"]["fields"][0] == "id"
+    assert scene["metrics"]["total_vehicles"] == 6
+    assert len(scene["metrics"]["signals"]) == 2
+    assert scene["version"] == change_feed.loaded_version(1)
+
+
+def test_geometry_key_skips_unchanged_layout(client):
+    """Test passing the geometry key back omits geometry until the intersection changes"""
+    first = client.get("/api/simulation/scene/1").json()
+    key = first["geometry_key"]
+
+    repeat = client.get("/api/simulation/scene/1", params={"geometry_key": key}).json()
+    assert repeat["geometry"] is None
+    assert repeat["geometry_key"] == key
+
+    change_feed.bump(1)
+    next_tick = client.get("/api/simulation/scene/1", params={"geometry_key": key}).json()
+    assert next_tick["geometry"] is None
+    assert next_tick["version"] > first["version"]
+
+    response_cache.invalidate("intersections")
+    refreshed = client.get("/api/simulation/scene/1", params={"geometry_key": "stale"}).json()
+    assert refreshed["geometry"] == first["geometry"]
+
+
+def test_scene_never_mixes_ticks(client, monkeypatch):
+    """Test a scene whose reads never land on the same tick is refused, not assembled"""
+    current = live_state.current
+
+    def tick_during_read(db, intersection_id, *args):
+        change_feed.bump(intersection_id)
+        return current(db, intersection_id, *args)
+
+    monkeypatch.setattr(live_state, "current", tick_during_read)
+    response = client.get("/api/simulation/scene/1")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(simulation.SCENE_RETRY_AFTER)
+
+
+def test_scene_unknown_intersection(client):
+    """Test an unknown intersection is rejected"""
+    assert client.get("/api/simulation/scene/99").status_code == 400
@@ -0,0 +1,132 @@
+"""Tests for the intersection spatial index and its endpoints"""
+import random
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.api import intersections
+from app.database import get_db
+from app.models.base import Base
+from app.models.city import City
+from app.models.intersection import Intersection
+from app.services.spatial import IntersectionIndex, haversine_m
+
+COUNT = 3000
+
+
+@pytest.fixture
+def db():
+    """3,000 intersections scattered over two cities' worth of India"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    rng = random.Random(5)
+    with engine.begin() as conn:
+        conn.execute(insert(City), [
+            {"name": f"City {i}", "state": "S", "latitude": 0.0, "longitude": 0.0} for i in (1, 2)
+        ])
+        conn.execute(insert(Intersection), [
+            {
+                "name": f"Junction {n}", "city_id": n % 2 + 1,
+                "latitude": rng.uniform(8.0, 32.0), "longitude": rng.uniform(69.0, 89.0),
+            }
+            for n in range(COUNT)
+        ])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+class Generation:
+    """Stands in for the response-cache tag version that writes bump"""
+
+    def __init__(self):
+        self.value = 0
+
+    def __call__(self):
+        return self.value
+
+
+def all_points(db):
+    rows = db.query(Intersection.id, Intersection.city_id, Intersection.latitude, Intersection.longitude).all()
+    return {row.id: row for row in rows}
+
+
+def test_within_matches_brute_force(db):
+    """Test a viewport returns exactly the points inside it, in id order"""
+    index = IntersectionIndex(Generation())
+    points = all_points(db)
+    box = (18.0, 72.0, 22.5, 77.0)
+
+    found = index.within(db, *box)
+    expected = sorted(
+        pid for pid, p in points.items()
+        if box[0] <= p.latitude <= box[2] and box[1] <= p.longitude <= box[3]
+    )
+    assert [row["id"] for row in found] == expected
+    assert expected
+
+    in_city = index.within(db, *box, city_id=2, limit=10)
+    assert [row["id"] for row in in_city] == [pid for pid in expected if points[pid].city_id == 2][:10]
+
+
+def test_nearest_matches_brute_force(db):
+    """Test the k nearest agree with sorting every great-circle distance"""
+    index = IntersectionIndex(Generation())
+    points = all_points(db)
+    ids = np.array(list(points))
+    lats = np.array([points[i].latitude for i in ids])
+    lons = np.array([points[i].longitude for i in ids])
+
+    for lat, lon, k in [(19.07, 72.87, 5), (8.5, 69.1, 12), (31.9, 88.9, 1), (25.0, 60.0, 3)]:
+        distances = haversine_m(lat, lon, lats, lons)
+        expected = [int(i) for i in ids[np.lexsort((ids, distances))[:k]]]
+        found = index.nearest(db, lat, lon, k)
+        assert [row["id"] for row in found] == expected
+        assert found == sorted(found, key=lambda row: row["distance_m"])
+
+    distances = haversine_m(19.07, 72.87, lats, lons)
+    within_radius = sorted(int(i) for i in ids[distances <= 150000])
+    near = index.nearest(db, 19.07, 72.87, k=100, max_distance_m=150000)
+    assert within_radius and sorted(row["id"] for row in near) == within_radius
+
+
+def test_index_rebuilds_only_after_invalidation(db):
+    """Test writes are picked up once the generation moves, and not before"""
+    generation = Generation()
+    index = IntersectionIndex(generation)
+    index.within(db, -90, -180, 90, 180)
+    index.nearest(db, 20.0, 78.0)
+    assert index.builds == 1
+
+    db.add(Intersection(name="New", city_id=1, latitude=0.5, longitude=0.5))
+    db.commit()
+    assert index.within(db, 0, 0, 1, 1) == []
+    generation.value += 1
+    assert [row["name"] for row in index.within(db, 0, 0, 1, 1)] == ["New"]
+    assert index.builds == 2
+
+
+def test_spatial_routes_are_not_shadowed_by_id_route(db, monkeypatch):
+    """Test /within and /nearest resolve and validate their parameters"""
+    monkeypatch.setattr(intersections, "intersection_index", IntersectionIndex(Generation()))
+    app = FastAPI()
+    app.include_router(intersections.router)
+    app.dependency_overrides[get_db] = lambda: db
+    client = TestClient(app)
+
+    response = client.get("/api/intersections/within", params={
+        "min_lat": 18, "min_lon": 72, "max_lat": 19, "max_lon": 73, "limit": 3,
+    })
+    assert response.status_code == 200
+    assert len(response.json()) <= 3
+    assert set(response.json()[0]) == {"id", "name", "city_id", "latitude", "longitude"}
+
+    response = client.get("/api/intersections/nearest", params={"lat": 19.07, "lon": 72.87, "k": 2})
+    assert response.status_code == 200
+    assert [row["distance_m"] for row in response.json()] == sorted(row["distance_m"] for row in response.json())
+
+    bad = client.get("/api/intersections/within", params={"min_lat": 20, "min_lon": 72, "max_lat": 19, "max_lon": 73})
+    assert bad.status_code == 400
@@ -0,0 +1,51 @@
+"""Tests for cold start: lazy imports, migrations and readiness"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine
+from app.services.warmup import ALEMBIC_INI, Warmup, migration_head, schema_status
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ["numpy", "scipy", "pandas", "shapely", "geoalchemy2", "msgpack"]
+
+
+def test_app_import_skips_heavy_modules():
+    """Test importing the app neither loads heavy modules nor touches the database"""
+    script = (
+        "import json, sys, main; "
+        f"print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+    )
+    env = dict(os.environ, DATABASE_URL="postgresql://nobody@127.0.0.1:1/none")
+    completed = subprocess.run(
+        [sys.executable, "-c", script], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    assert json.loads(completed.stdout.strip().splitlines()[-1]) == []
+
+
+def test_readiness_follows_migrations(tmp_path):
+    """Test the schema reports unmigrated until `alembic upgrade head` has run"""
+    url = f"sqlite:///{tmp_path / 'ready.db'}"
+    engine = create_engine(url)
+    head = migration_head()
+    assert schema_status(engine, head) == {"status": "unmigrated", "revision": None, "head": head}
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    config.cmd_opts = argparse.Namespace(x=[f"url={url}"])
+    command.upgrade(config, "head")
+    assert schema_status(engine, head) == {"status": "ok", "revision": head, "head": head}
+
+
+def test_warmup_records_each_step():
+    """Test warm-up times every module import and resolves the migration head"""
+    warmup = Warmup(modules=["json", "no_such_module_anywhere"])
+    warmup.run_sync()
+    snapshot = warmup.snapshot()
+    assert snapshot["warmed_up"] and warmup.head == migration_head()
+    assert snapshot["steps"]["json"]["status"] == "done"
+    assert snapshot["steps"]["no_such_module_anywhere"]["status"] == "failed"
+    assert snapshot["steps"]["migrations"]["status"] == "done"
@@ -0,0 +1,90 @@
+"""Unit tests for shared tick broadcasting"""
+import asyncio
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from app.api import simulation
+from app.services.streaming import TickBroadcaster, Subscription
+
+
+def test_slow_subscriber_is_coalesced_then_dropped():
+    """Test a subscriber that never reads keeps only the newest frame until dropped"""
+    async def scenario():
+        subscription = Subscription(key=1, queue_size=1, max_lag=2)
+        assert subscription.offer("a")
+        assert subscription.offer("b")
+        assert subscription.offer("c")
+        assert await subscription.get() == "c"
+        assert subscription.coalesced == 2
+        
+        subscription.offer("d")
+        subscription.offer("e")
+        subscription.offer("f")
+        assert subscription.offer("g") is False
+        assert subscription.closed
+        assert await subscription.get() is None
+    
+    asyncio.run(scenario())
+
+
+def test_one_computation_per_tick_for_all_subscribers():
+    """Test many subscribers share a single computation per tick"""
+    calls = []
+    
+    def compute(key):
+        calls.append(key)
+        return {"tick": len(calls)}
+    
+    async def scenario():
+        broadcaster = TickBroadcaster(compute, interval=0.01)
+        subscriptions = [broadcaster.subscribe(7) for _ in range(50)]
+        assert broadcaster.subscriber_count(7) == 50
+        
+        frames = [json.loads(await s.get()) for s in subscriptions]
+        assert all(frame == frames[0] for frame in frames)
+        
+        ticks = len(calls)
+        assert ticks <= 2
+        
+        for s in subscriptions:
+            broadcaster.unsubscribe(s)
+        assert broadcaster.subscriber_count() == 0
+        await asyncio.sleep(0.05)
+        assert not broadcaster._producers
+    
+    asyncio.run(scenario())
+
+
+class DroppingBroadcaster:
+    """Drops every subscriber after one frame, as if it had lagged"""
+
+    def subscribe(self, key):
+        subscription = Subscription(key=key, queue_size=2, max_lag=0)
+        subscription.offer(json.dumps({"type": "tick"}))
+        subscription.queue.put_nowait(None)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        pass
+
+
+def test_stream_close_codes_tell_client_whether_to_reconnect(monkeypatch):
+    """Test unknown intersections close with 1008 (stop) and lagging clients with 1013 (back off, retry)"""
+    monkeypatch.setattr(simulation, "_intersection_exists", lambda intersection_id: intersection_id == 1)
+    monkeypatch.setattr(simulation, "stream_broadcaster", DroppingBroadcaster())
+    app = FastAPI()
+    app.include_router(simulation.router)
+    client = TestClient(app)
+
+    with client.websocket_connect("/api/simulation/ws/99") as websocket:
+        with pytest.raises(WebSocketDisconnect) as refused:
+            websocket.receive_text()
+    assert refused.value.code == 1008
+
+    with client.websocket_connect("/api/simulation/ws/1") as websocket:
+        assert websocket.receive_json() == {"type": "tick"}
+        with pytest.raises(WebSocketDisconnect) as dropped:
+            websocket.receive_text()
+    assert dropped.value.code == 1013
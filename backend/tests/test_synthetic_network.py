@@ -0,0 +1,74 @@
+"""Tests for the synthetic network generator and bulk loader"""
+import dataclasses
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from app.models.base import Base
+from app.models.city import City
+from app.models.intersection import Intersection
+from app.models.lane import Lane
+from app.models.signal import Signal
+from app.services.synthetic_network import PROFILES, BulkLoader, NetworkGenerator, load_network
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Session on a SQLite file database with the schema created"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'network.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def counts(db):
+    return tuple(db.query(func.count(model.id)).scalar() for model in (City, Intersection, Lane, Signal))
+
+
+def test_generator_is_deterministic_by_seed():
+    """Test the same seed yields the same rows and another seed does not"""
+    profile = PROFILES["tiny"]
+    first, again, other = (NetworkGenerator(profile, seed) for seed in (1, 1, 2))
+    assert first.cities() == again.cities()
+    assert first.cities() != other.cities()
+    city = first.cities()[0]
+    assert list(first.intersections(0, city, 1)) == list(again.intersections(0, city, 1))
+
+
+def test_load_is_idempotent(db):
+    """Test loading the same network twice keeps one copy of every row"""
+    profile = dataclasses.replace(PROFILES["tiny"], min_lanes=4, max_lanes=8)
+    generator = NetworkGenerator(profile, seed=3)
+
+    report = load_network(db, generator, method="insert", chunk_size=7)
+    assert report.method == "insert"
+    assert counts(db) == (2, 20, report.lanes, 40)
+    assert 20 * 4 <= report.lanes <= 20 * 8
+
+    load_network(db, generator, method="insert", chunk_size=7)
+    assert counts(db) == (2, 20, report.lanes, 40)
+
+    for intersection in db.query(Intersection):
+        assert 4 <= intersection.num_lanes <= 8
+        assert len(intersection.lanes) == intersection.num_lanes
+        assert {signal.name for signal in intersection.signals} == {"Signal NS", "Signal EW"}
+
+
+def test_upsert_updates_existing_rows(db):
+    """Test a conflicting natural key updates the row in place and returns its id"""
+    loader = BulkLoader(db.connection(), method="insert")
+    row = {"name": "Upsert City", "state": "A", "latitude": 1.0, "longitude": 2.0}
+    [first] = loader.upsert(City.__table__, [row], ["name"], ["id"])
+    [second] = loader.upsert(City.__table__, [{**row, "state": "B"}], ["name"], ["id"])
+    db.commit()
+
+    assert first.id == second.id
+    assert db.query(City).one().state == "B"
+
+
+def test_copy_requires_postgres(db):
+    """Test unsupported methods are rejected and auto falls back to INSERT on SQLite"""
+    with pytest.raises(ValueError):
+        BulkLoader(db.connection(), method="bulk")
+    assert not BulkLoader(db.connection()).use_copy
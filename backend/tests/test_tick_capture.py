@@ -0,0 +1,146 @@
+"""Tests for on-demand stack sampling of simulation ticks"""
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, Session
+from app.api import simulation
+from app.models.base import Base
+from app.models.city import City
+from app.models.intersection import Intersection
+from app.models.lane import Lane, Direction
+from app.models.signal import Signal, SignalState
+from app.models.vehicle import Vehicle, VehicleType, VehicleState
+from app.services.tick_capture import OTHER, SUSPENDED, TRUNCATED, TickCapture, tick_capture
+from app.simulation import change_feed, run_windows
+
+
+def burn(seconds: float):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def busy_tick(capture: TickCapture, intersection_id: int, seconds: float = 0.05):
+    with capture.tick(intersection_id):
+        burn(seconds)
+
+
+def deep(capture: TickCapture, depth: int):
+    if depth:
+        return deep(capture, depth - 1)
+    burn(0.05)
+
+
+@pytest.fixture
+def db_session(monkeypatch):
+    """Intersection with one lane, one green signal and ten cars"""
+    monkeypatch.setattr(change_feed, "_feeds", {})
+    monkeypatch.setattr(run_windows, "_since", {})
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    city = City(name="Test City", state="Test State", latitude=0.0, longitude=0.0)
+    intersection = Intersection(name="Test Intersection", city=city, latitude=0.0, longitude=0.0)
+    lane = Lane(name="Lane NORTH", direction=Direction.NORTH)
+    intersection.lanes.append(lane)
+    intersection.signals.append(Signal(name="Signal NS", state=SignalState.GREEN, remaining_time=30.0))
+    session.add(intersection)
+    session.commit()
+    for i in range(10):
+        session.add(Vehicle(
+            vehicle_id=f"car-{i}", vehicle_type=VehicleType.CAR, intersection_id=intersection.id,
+            lane_id=lane.id, position=i * 8.0, state=VehicleState.WAITING, entry_time=0.0,
+        ))
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_capture_samples_only_its_ticks():
+    """Test stacks are rooted at the frame that entered the tick and the capture stops after N ticks"""
+    capture = TickCapture(interval=0.001)
+    busy_tick(capture, 1)  # nothing armed yet
+    assert capture.report(1) is None
+
+    started = capture.start(1, ticks=2)
+    assert capture.start(1, ticks=2) is None  # one capture per intersection
+    busy_tick(capture, 2)  # another intersection
+    busy_tick(capture, 1)
+    busy_tick(capture, 1)
+    busy_tick(capture, 1)  # past the limit
+    assert started.finished.is_set()
+
+    report = capture.report(1)
+    assert not report["running"] and report["stopped_by"] == "ticks"
+    assert report["ticks"] == 2 and report["samples"] > 5
+    assert report["tick_ms"] >= 100
+    assert report["top"][0]["function"] == f"{__name__}:burn" and report["top"][0]["self_pct"] > 80
+    for line in capture.collapsed(1).splitlines():
+        assert line.startswith(f"{__name__}:busy_tick;")
+
+
+def test_capture_memory_is_bounded():
+    """Test deep stacks keep their innermost frames and distinct stacks past the cap are pooled"""
+    capture = TickCapture(interval=0.001)
+    capture.start(1, ticks=1)
+    with capture.tick(1):
+        deep(capture, 200)
+    stack = capture.collapsed(1).splitlines()[0].rsplit(" ", 1)[0]
+    assert stack.startswith(f"{TRUNCATED};{__name__}:deep;") and stack.endswith(f"{__name__}:burn")
+
+    capture = TickCapture(interval=0.001, max_stacks=1)
+    capture.start(1, ticks=2)
+    busy_tick(capture, 1)
+    with capture.tick(1):
+        burn(0.05)
+    stacks = dict(line.rsplit(" ", 1) for line in capture.collapsed(1).splitlines())
+    assert len(stacks) == 2 and OTHER in stacks
+    assert sum(int(count) for count in stacks.values()) == capture.report(1)["samples"]
+
+
+def test_capture_stops_after_seconds():
+    """Test a capture armed for seconds ends on time even if the intersection never ticks"""
+    capture = TickCapture(interval=0.001, max_seconds=10)
+    started = capture.start(1, seconds=0.05)
+    assert started.finished.wait(2)
+    assert capture.report(1)["stopped_by"] == "seconds"
+    assert capture.report(1)["samples"] == 0
+
+    capture.start(1, seconds=60)
+    assert capture.discard(1)
+    assert capture.report(1) is None
+
+
+def test_capture_endpoints(db_session: Session, monkeypatch):
+    """Test arming over HTTP, ticking the intersection and reading both output formats"""
+    monkeypatch.setattr(tick_capture, "_armed", {})
+    monkeypatch.setattr(tick_capture, "_captures", {})
+    intersection_id = db_session.query(Intersection.id).scalar()
+    app = FastAPI()
+    app.include_router(simulation.router)
+    client = TestClient(app)
+    url = f"/api/simulation/profile/{intersection_id}/capture"
+
+    assert client.get(url).status_code == 404
+    assert client.post(url, json={}).status_code == 400
+    response = client.post(url, json={"ticks": 3})
+    assert response.status_code == 202 and response.json()["running"]
+    assert client.post(url, json={"ticks": 3}).status_code == 409
+
+    for _ in range(3):
+        simulation.run_tick(db_session, intersection_id, 0.1)
+    report = client.get(url, params={"top": 5}).json()
+    assert report["ticks"] == 3 and report["stopped_by"] == "ticks"
+    assert len(report["top"]) <= 5
+
+    collapsed = client.get(f"{url}/collapsed")
+    assert collapsed.headers["content-type"].startswith("text/plain")
+    for line in collapsed.text.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert stack.startswith("app.api.simulation:run_tick") and int(count) > 0
+        assert SUSPENDED not in stack  # a synchronous tick never leaves its thread
+
+    assert client.delete(url).status_code == 204
+    assert client.get(url).status_code == 404
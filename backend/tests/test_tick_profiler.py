@@ -0,0 +1,123 @@
+"""Tests for per-tick phase profiling and the Prometheus exposition"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, Session
+from app.api import simulation
+from app.models.base import Base
+from app.models.city import City
+from app.models.intersection import Intersection
+from app.models.lane import Lane, Direction
+from app.models.signal import Signal, SignalState
+from app.models.vehicle import Vehicle, VehicleType, VehicleState
+from app.services import prometheus
+from app.services.tick_profiler import TickProfiler, tick_profiler
+from app.simulation import change_feed, run_windows
+
+TICK_PHASES = {"load", "leaders", "physics", "signals", "change_feed", "commit", "other", "tick"}
+
+
+@pytest.fixture
+def db_session(monkeypatch):
+    """Intersection with one lane, one green signal and ten cars"""
+    monkeypatch.setattr(change_feed, "_feeds", {})
+    monkeypatch.setattr(run_windows, "_since", {})
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    city = City(name="Test City", state="Test State", latitude=0.0, longitude=0.0)
+    intersection = Intersection(name="Test Intersection", city=city, latitude=0.0, longitude=0.0)
+    lane = Lane(name="Lane NORTH", direction=Direction.NORTH)
+    intersection.lanes.append(lane)
+    intersection.signals.append(Signal(name="Signal NS", state=SignalState.GREEN, remaining_time=30.0))
+    session.add(intersection)
+    session.commit()
+    for i in range(10):
+        session.add(Vehicle(
+            vehicle_id=f"car-{i}", vehicle_type=VehicleType.CAR, intersection_id=intersection.id,
+            lane_id=lane.id, position=i * 8.0, state=VehicleState.WAITING, entry_time=0.0,
+        ))
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def profiler(monkeypatch):
+    """The shared profiler, switched on with no history"""
+    monkeypatch.setattr(tick_profiler, "enabled", True)
+    monkeypatch.setattr(tick_profiler, "_profiles", {})
+    return tick_profiler
+
+
+def test_disabled_profiler_records_nothing():
+    """Test ticks are free and invisible while profiling is off"""
+    profiler = TickProfiler(enabled=False)
+    with profiler.tick(1) as timer:
+        assert timer is None
+    assert profiler.snapshot(1)["ticks"] == 0
+
+
+def test_tick_records_its_laps():
+    """Test one opened timer is one tick, with its laps and the remainder"""
+    profiler = TickProfiler(enabled=True, budget=10.0)
+    with profiler.tick(1) as timer:
+        timer.lap("load")
+    snapshot = profiler.snapshot(1)
+    assert snapshot["ticks"] == 1 and snapshot["overruns"] == 0
+    assert set(snapshot["phases"]) == {"load", "other", "tick"}
+
+
+def test_only_run_tick_opens_a_timer(db_session: Session, profiler):
+    """Test simulate_step charges laps to its caller's timer instead of opening its own"""
+    intersection_id = db_session.query(Intersection.id).scalar()
+    simulation.vehicle_sim.simulate_step(db_session, intersection_id, 0.1)
+    assert profiler.snapshot(intersection_id)["ticks"] == 0
+
+    simulation.run_tick(db_session, intersection_id, 0.1)
+    snapshot = profiler.snapshot(intersection_id)
+    assert snapshot["ticks"] == 1
+    assert snapshot["phases"]["physics"]["count"] == 1
+
+
+def test_tick_is_split_into_phases(db_session: Session, profiler, monkeypatch):
+    """Test a database tick reports every phase and they add up to the tick"""
+    intersection_id = db_session.query(Intersection.id).scalar()
+    monkeypatch.setattr(profiler, "budget", 0.0)
+    for _ in range(3):
+        simulation.run_tick(db_session, intersection_id, 0.1)
+
+    snapshot = profiler.snapshot(intersection_id)
+    assert snapshot["ticks"] == 3 and snapshot["overruns"] == 3
+    assert TICK_PHASES <= set(snapshot["phases"])
+    last = snapshot["last_tick_ms"]
+    assert sum(ms for phase, ms in last.items() if phase != "tick") == pytest.approx(last["tick"], abs=0.01)
+    assert snapshot["phases"]["physics"]["count"] == 3
+
+
+def test_prometheus_exposition(db_session: Session, profiler):
+    """Test /metrics renders counters and cumulative phase histograms"""
+    intersection_id = db_session.query(Intersection.id).scalar()
+    simulation.run_tick(db_session, intersection_id, 0.1)
+
+    text = prometheus.render()
+    assert "# TYPE traffic_tick_phase_seconds histogram" in text
+    assert f'traffic_ticks_total{{intersection_id="{intersection_id}"}} 1' in text
+    assert f'traffic_tick_phase_seconds_bucket{{intersection_id="{intersection_id}",phase="tick",le="+Inf"}} 1' in text
+    assert f'traffic_tick_phase_seconds_count{{intersection_id="{intersection_id}",phase="commit"}} 1' in text
+    assert "traffic_tick_profiling_enabled 1" in text
+
+
+def test_profiling_switch_endpoint(monkeypatch):
+    """Test profiling can be switched at runtime and read back per intersection"""
+    monkeypatch.setattr(tick_profiler, "enabled", False)
+    app = FastAPI()
+    app.include_router(simulation.router)
+    client = TestClient(app)
+
+    assert client.put("/api/simulation/profile", json={"enabled": True}).json() == {"enabled": True}
+    assert tick_profiler.enabled
+    profile = client.get("/api/simulation/profile/42").json()
+    assert profile["enabled"] and profile["ticks"] == 0
+    assert client.post("/api/simulation/profile/reset").status_code == 204
@@ -0,0 +1,209 @@
+"""API tests for vehicle listing"""
+import asyncio
+import json
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import get_async_db
+from app.models.base import Base
+from app.models.city import City
+from app.models.intersection import Intersection
+from app.models.lane import Lane, Direction
+from app.models.vehicle import Vehicle, VehicleType, VehicleState
+from app.api import vehicles
+from app.schemas.vehicle import VehicleCreate, VehicleResponse
+from app.services.injection import InjectionQueue, InjectionRejected
+from app.services.wire_format import decode_columnar
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    """Test client backed by a SQLite file database with 25 vehicles"""
+    database = tmp_path / "vehicles.db"
+    engine = create_engine(f"sqlite:///{database}")
+    Base.metadata.create_all(engine)
+    
+    db = sessionmaker(bind=engine)()
+    city = City(name="Test City", state="Test State", latitude=0.0, longitude=0.0)
+    db.add(city)
+    db.commit()
+    intersection = Intersection(name="Test Intersection", city_id=city.id, latitude=0.0, longitude=0.0)
+    db.add(intersection)
+    db.commit()
+    lane = Lane(name="Lane NORTH", intersection_id=intersection.id, direction=Direction.NORTH)
+    db.add(lane)
+    db.commit()
+    for i in range(25):
+        db.add(Vehicle(
+            vehicle_id=f"veh-{i}",
+            vehicle_type=VehicleType.BUS if i % 5 == 0 else VehicleType.CAR,
+            intersection_id=intersection.id,
+            lane_id=lane.id,
+            state=VehicleState.EXITED if i % 2 else VehicleState.MOVING,
+            is_emergency=i == 3,
+            entry_time=float(i),
+        ))
+    db.commit()
+    db.close()
+    
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{database}")
+    TestingAsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+    monkeypatch.setattr(vehicles, "AsyncSessionLocal", TestingAsyncSession)
+    # A fresh queue per test: nothing pending or draining from another test's event loop
+    monkeypatch.setattr(vehicles, "injection_queue", InjectionQueue(
+        session_factory=sessionmaker(bind=engine), simulation=vehicles.vehicle_sim,
+    ))
+    
+    async def override_get_async_db():
+        async with TestingAsyncSession() as session:
+            yield session
+    
+    app = FastAPI()
+    app.include_router(vehicles.router)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    return TestClient(app)
+
+
+def test_keyset_pagination_walks_all_rows(client):
+    """Test following X-Next-Cursor visits every vehicle exactly once"""
+    seen = []
+    params = {"limit": 10}
+    while True:
+        response = client.get("/api/vehicles", params=params)
+        assert response.status_code == 200
+        seen.extend(v["id"] for v in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params["after_id"] = cursor
+    
+    assert seen == sorted(seen)
+    assert len(seen) == len(set(seen)) == 25
+
+
+def test_filters_and_projection(client):
+    """Test filters combine and fields limit the returned columns"""
+    response = client.get(
+        "/api/vehicles",
+        params={"state": "MOVING", "vehicle_type": "BUS", "fields": "vehicle_id,state"},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert [v["vehicle_id"] for v in body] == ["veh-0", "veh-10", "veh-20"]
+    assert all(set(v) == {"id", "vehicle_id", "state"} for v in body)
+    
+    emergency = client.get("/api/vehicles", params={"is_emergency": True}).json()
+    assert [v["vehicle_id"] for v in emergency] == ["veh-3"]
+    
+    assert client.get("/api/vehicles", params={"fields": "nope"}).status_code == 400
+
+
+def test_ndjson_stream(client):
+    """Test the NDJSON variant yields one object per line"""
+    response = client.get("/api/vehicles/stream", params={"state": "EXITED", "fields": "position"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 12
+    assert all(set(row) == {"id", "position"} for row in rows)
+
+
+def test_inject_respects_capacity(client):
+    """Test injection through the async path creates vehicles until the lane is full"""
+    payload = {"vehicle_type": "CAR", "intersection_id": 1, "lane_id": 1}
+    
+    created = client.post("/api/vehicles/inject", json=payload)
+    assert created.status_code == 201
+    assert created.json()["vehicle_id"].startswith("CAR-")
+    assert created.json()["created_at"]
+    
+    # 25 seeded vehicles sit at position 0 on a lane with capacity 30
+    statuses = [client.post("/api/vehicles/inject", json=payload).status_code for _ in range(5)]
+    assert statuses == [201, 201, 201, 201, 400]
+
+
+def test_concurrent_injections_share_one_batch(client, monkeypatch):
+    """Test concurrent requests commit as one batch, with capacity decided in memory"""
+    batches = []
+    add_vehicles = vehicles.vehicle_sim.add_vehicles
+    
+    def recording_add_vehicles(db, intersection_id, specs):
+        # Off the event loop: the insert, live-state write and fan-out all block
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+        batches.append(len(specs))
+        return add_vehicles(db, intersection_id, specs)
+    
+    monkeypatch.setattr(vehicles.vehicle_sim, "add_vehicles", recording_add_vehicles)
+    
+    async def inject_many():
+        requests = [VehicleCreate(vehicle_type="CAR", intersection_id=1, lane_id=1) for _ in range(8)]
+        requests.append(VehicleCreate(vehicle_type="BUS", intersection_id=1, lane_id=99))
+        return await asyncio.gather(
+            *(vehicles.injection_queue.submit(r) for r in requests), return_exceptions=True
+        )
+    
+    results = asyncio.run(inject_many())
+    
+    # 25 seeded vehicles on a lane with capacity 30: the first five fit
+    assert batches == [5]
+    assert all(isinstance(r, VehicleResponse) for r in results[:5])
+    assert len({r.id for r in results[:5]}) == 5
+    assert [str(r) for r in results[5:]] == ["Lane is at capacity"] * 3 + ["Lane not found"]
+    assert all(isinstance(r, InjectionRejected) for r in results[5:])
+
+
+def test_full_injection_queue_asks_to_retry(client, monkeypatch):
+    """Test backpressure: a full queue answers 429 with Retry-After"""
+    monkeypatch.setattr(vehicles.injection_queue, "max_pending", 0)
+    response = client.post("/api/vehicles/inject", json={"vehicle_type": "CAR", "intersection_id": 1, "lane_id": 1})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_msgpack_listing_matches_json(client):
+    """Test Accept: application/x-msgpack returns the same page as typed columns"""
+    params = {"limit": 10, "fields": "vehicle_type,position,state,is_emergency,created_at"}
+    expected = client.get("/api/vehicles", params=params).json()
+    
+    response = client.get("/api/vehicles", params=params, headers={"Accept": "application/x-msgpack"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-msgpack"
+    assert response.headers["X-Next-Cursor"] == str(expected[-1]["id"])
+    
+    frame = decode_columnar(response.content)
+    columns = frame["columns"]
+    assert frame["length"] == 10
+    assert columns["id"].dtype == np.dtype("<u4")
+    assert columns["position"].dtype == np.dtype("<f4")
+    assert list(columns["id"]) == [v["id"] for v in expected]
+    assert columns["vehicle_type"] == [v["vehicle_type"] for v in expected]
+    assert columns["state"] == [v["state"] for v in expected]
+    assert list(columns["is_emergency"].astype(bool)) == [v["is_emergency"] for v in expected]
+    assert len(response.content) < len(json.dumps(expected))
+    
+    # JSON stays the default for browsers and other generic clients
+    assert client.get("/api/vehicles", params=params, headers={"Accept": "*/*"}).json() == expected
+
+
+@pytest.mark.parametrize("accept, msgpack", [
+    ("application/x-msgpack", True),
+    ("application/json;q=0.5, application/msgpack", True),
+    ("application/json, application/x-msgpack;q=0.9", False),
+    ("application/x-msgpack;q=0", False),
+    ("application/x-msgpack;q=0, */*", False),
+    ("application/x-msgpack-extra", False),
+    ("application/json;q=0, */*", True),
+    ("*/*", False),
+    ("", False),
+])
+def test_accept_negotiation(client, accept, msgpack):
+    """Test the encoding follows the highest-ranked media range, q=0 meaning not acceptable"""
+    response = client.get("/api/vehicles", params={"limit": 1}, headers={"Accept": accept})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-msgpack" if msgpack else "application/json")
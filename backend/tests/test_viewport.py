@@ -0,0 +1,154 @@
+"""Tests for viewport-filtered vehicle streaming"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import StaticPool
+from app.api import simulation
+from app.models.base import Base
+from app.models.city import City
+from app.models.intersection import Intersection
+from app.models.lane import Lane, Direction
+from app.models.vehicle import Vehicle, VehicleType, VehicleState
+from app.services.spatial import IntersectionIndex
+from app.services.viewport import Viewport, ViewportRequest
+from app.simulation import VehicleChangeFeed, run_windows
+
+NEAR = dict(min_lat=9.9, min_lon=9.9, max_lat=10.1, max_lon=10.1)
+EVERYWHERE = dict(min_lat=9.9, min_lon=9.9, max_lat=20.1, max_lon=20.1)
+FAR = dict(min_lat=19.9, min_lon=19.9, max_lat=20.1, max_lon=20.1)
+
+
+@pytest.fixture
+def factory(monkeypatch):
+    """Sessions on one shared in-memory database"""
+    monkeypatch.setattr(run_windows, "_since", {})
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def db(factory):
+    session = factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def junctions(db: Session):
+    """Two neighbouring junctions and one far away; the first has traffic"""
+    city = City(name="Test City", state="Test State", latitude=10.0, longitude=10.0)
+    db.add(city)
+    db.commit()
+    found = []
+    for name, lat, lon in [("A", 10.0, 10.0), ("B", 10.001, 10.001), ("C", 20.0, 20.0)]:
+        intersection = Intersection(name=name, city_id=city.id, latitude=lat, longitude=lon)
+        intersection.lanes.append(Lane(name="Lane NORTH", direction=Direction.NORTH))
+        db.add(intersection)
+        found.append(intersection)
+    db.commit()
+    a = found[0]
+    for name, state, emergency in [("car-1", VehicleState.WAITING, False), ("car-2", VehicleState.WAITING, False),
+                                   ("amb-1", VehicleState.MOVING, True)]:
+        db.add(Vehicle(
+            vehicle_id=name, vehicle_type=VehicleType.AMBULANCE if emergency else VehicleType.CAR,
+            intersection_id=a.id, lane_id=a.lanes[0].id, state=state, is_emergency=emergency,
+            speed=3.0 if state == VehicleState.MOVING else 0.0, entry_time=0.0,
+        ))
+    db.commit()
+    return found
+
+
+def make_viewport(**kwargs):
+    feed = VehicleChangeFeed(history=10)
+    return Viewport(IntersectionIndex(lambda: 0), feed, **{"detail_zoom": 16, "detail_max": 50, **kwargs}), feed
+
+
+def test_zoomed_out_sends_totals_only_when_they_change(db, junctions):
+    """Test low zoom streams one row per visible intersection, and only on change"""
+    a, b, c = junctions
+    viewport, feed = make_viewport()
+    viewport.update(db, ViewportRequest(**NEAR, zoom=12))
+
+    frame = viewport.frame(db)
+    assert frame["mode"] == "aggregates" and frame["visible"] == 2
+    assert [row[0] for row in frame["entered"]] == [a.id, b.id]
+    totals = {row[0]: row[2:] for row in frame["updates"]}
+    assert totals == {a.id: [3, 2, 1, 1.0], b.id: [0, 0, 0, 0.0]}
+    assert viewport.frame(db) is None
+
+    # A bare version bump (signal change) leaves the totals alone
+    feed.bump(b.id)
+    assert viewport.frame(db) is None
+
+    waiting = db.query(Vehicle).filter(Vehicle.vehicle_id == "car-1").one()
+    waiting.state, waiting.speed = VehicleState.MOVING, 6.0
+    feed.record(db, a.id, [waiting])
+    frame = viewport.frame(db)
+    assert frame["updates"] == [[a.id, feed.loaded_version(a.id), 3, 1, 1, 3.0]]
+    assert frame["entered"] == [] and frame["left"] == []
+
+
+def test_zoomed_in_streams_vehicle_deltas_and_resubscribes_cheaply(db, junctions):
+    """Test high zoom streams vehicles, and moving the view resends only what entered"""
+    a, b, c = junctions
+    viewport, feed = make_viewport()
+    viewport.update(db, ViewportRequest(**NEAR, zoom=17))
+    frame = viewport.frame(db)
+    assert frame["mode"] == "vehicles"
+    by_id = {update["intersection_id"]: update for update in frame["updates"]}
+    assert by_id[a.id]["full"] and len(by_id[a.id]["upserts"]) == 3
+
+    exited = db.query(Vehicle).filter(Vehicle.vehicle_id == "car-2").one()
+    exited.state = VehicleState.EXITED
+    feed.record(db, a.id, [exited])
+    viewport.update(db, ViewportRequest(**EVERYWHERE, zoom=17))
+    frame = viewport.frame(db)
+    assert [row[0] for row in frame["entered"]] == [c.id]
+    updates = {update["intersection_id"]: update for update in frame["updates"]}
+    assert set(updates) == {a.id, c.id}
+    assert not updates[a.id]["full"] and updates[a.id]["removed"] == [exited.id]
+
+    viewport.update(db, ViewportRequest(**FAR, zoom=17))
+    frame = viewport.frame(db)
+    assert frame["left"] == [a.id, b.id] and frame["entered"] == [] and frame["updates"] == []
+    assert viewport.frame(db) is None
+
+
+def test_crowded_or_huge_views_fall_back(db, junctions):
+    """Test too many intersections for detail gives totals, and the cap truncates"""
+    viewport, _ = make_viewport(detail_max=1)
+    viewport.update(db, ViewportRequest(**NEAR, zoom=18))
+    assert viewport.frame(db)["mode"] == "aggregates"
+
+    viewport, _ = make_viewport(max_intersections=2)
+    viewport.update(db, ViewportRequest(**EVERYWHERE, zoom=5))
+    frame = viewport.frame(db)
+    assert frame["truncated"] and frame["visible"] == 2
+
+
+def test_viewport_websocket(factory, junctions, monkeypatch):
+    """Test the socket rejects bad viewports without closing and follows new ones"""
+    feed = VehicleChangeFeed(history=10)
+    index = IntersectionIndex(lambda: 0)
+    monkeypatch.setattr(simulation, "SessionLocal", factory)
+    monkeypatch.setattr(simulation, "Viewport", lambda: Viewport(index, feed, detail_zoom=16))
+    app = FastAPI()
+    app.include_router(simulation.router)
+    a, b, c = junctions
+
+    with TestClient(app).websocket_connect("/api/simulation/ws/viewport") as websocket:
+        websocket.send_text("not json")
+        assert websocket.receive_json()["type"] == "error"
+        websocket.send_json({**NEAR, "max_lat": 0, "zoom": 12})
+        assert websocket.receive_json()["detail"] == "Bounding box minimum exceeds maximum"
+
+        websocket.send_json({**NEAR, "zoom": 12})
+        frame = websocket.receive_json()
+        assert frame["type"] == "viewport" and frame["visible"] == 2
+
+        websocket.send_json({**FAR, "zoom": 12})
+        frame = websocket.receive_json()
+        assert frame["left"] == [a.id, b.id] and [row[0] for row in frame["entered"]] == [c.id]
@@ -1,5 +1,5 @@
-import React, { useState, useEffect } from 'react'
-import { intersectionsAPI, vehiclesAPI, simulationAPI } from '../utils/api'
+import React, { useState, useEffect, useRef } from 'react'
+import { simulationAPI, sceneVehicles, reconnectDelay } from '../utils/api'
 import { Intersection, Vehicle, SimulationMetrics } from '../types'
 import TrafficMap from '../components/TrafficMap'
 import VehicleInjector from '../components/VehicleInjector'
@@ -17,50 +17,59 @@ export default function SimulationPage({ intersectionId, onBack }: SimulationPag
   const [metrics, setMetrics] = useState<SimulationMetrics | null>(null)
   const [isRunning, setIsRunning] = useState(false)
   const [loading, setLoading] = useState(true)
+  const geometryKey = useRef<string | undefined>(undefined)
 
   useEffect(() => {
-    fetchIntersection()
+    geometryKey.current = undefined
+    fetchScene()
   }, [intersectionId])
 
   useEffect(() => {
-    let interval: NodeJS.Timeout
-
-    if (isRunning) {
-      interval = setInterval(() => {
-        fetchVehicles()
-        fetchMetrics()
-      }, 500)
+    if (!isRunning) {
+      return
     }
 
-    return () => clearInterval(interval)
-  }, [isRunning, intersectionId])
-
-  const fetchIntersection = async () => {
-    try {
-      const response = await intersectionsAPI.getById(intersectionId)
-      setIntersection(response.data)
-      setLoading(false)
-    } catch (error) {
-      console.error('Error fetching intersection:', error)
-      setLoading(false)
+    // The server pushes one shared frame per tick; reconnect with backoff if dropped
+    let socket: WebSocket
+    let reconnect: NodeJS.Timeout
+    let attempt = 0
+    const connect = () => {
+      socket = simulationAPI.stream(intersectionId, (frame) => {
+        attempt = 0
+        setVehicles(frame.vehicles)
+        setMetrics(frame.metrics)
+      })
+      socket.onclose = (event) => {
+        const delay = reconnectDelay(event.code, attempt++)
+        if (delay !== null) {
+          reconnect = setTimeout(connect, delay)
+        }
+      }
     }
-  }
+    connect()
 
-  const fetchVehicles = async () => {
-    try {
-      const response = await vehiclesAPI.getAll(intersectionId)
-      setVehicles(response.data)
-    } catch (error) {
-      console.error('Error fetching vehicles:', error)
+    return () => {
+      clearTimeout(reconnect)
+      socket.onclose = null
+      socket.close()
     }
-  }
+  }, [isRunning, intersectionId])
 
-  const fetchMetrics = async () => {
+  // One request per refresh: layout (only when it changed), vehicles and metrics of one tick
+  const fetchScene = async () => {
     try {
-      const response = await simulationAPI.getMetrics(intersectionId)
-      setMetrics(response.data)
+      const response = await simulationAPI.getScene(intersectionId, geometryKey.current)
+      const scene = response.data
+      if (scene.geometry) {
+        setIntersection(scene.geometry.intersection)
+        geometryKey.current = scene.geometry_key
+      }
+      setVehicles(sceneVehicles(scene))
+      setMetrics(scene.metrics)
     } catch (error) {
-      console.error('Error fetching metrics:', error)
+      console.error('Error fetching scene:', error)
+    } finally {
+      setLoading(false)
     }
   }
 
@@ -68,8 +77,7 @@ export default function SimulationPage({ intersectionId, onBack }: SimulationPag
     try {
       await simulationAPI.start(intersectionId)
       setIsRunning(true)
-      fetchVehicles()
-      fetchMetrics()
+      fetchScene()
     } catch (error) {
       console.error('Error starting simulation:', error)
     }
@@ -112,7 +120,7 @@ export default function SimulationPage({ intersectionId, onBack }: SimulationPag
       <div className="simulation-container">
         <div className="left-panel">
           <TrafficMap intersection={intersection} vehicles={vehicles} />
-          <VehicleInjector intersectionId={intersectionId} onVehicleAdded={fetchVehicles} />
+          <VehicleInjector intersectionId={intersectionId} onVehicleAdded={fetchScene} />
         </div>
 
         <div className="right-panel">
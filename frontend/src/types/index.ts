@@ -36,7 +36,7 @@ export interface Vehicle {
   speed: number
   state: 'WAITING' | 'MOVING' | 'STOPPED' | 'EXITED'
   is_emergency: boolean
-  waiting_time: number
+  waiting_time?: number
 }
 
 export interface Intersection {
@@ -49,6 +49,12 @@ export interface Intersection {
   description?: string
 }
 
+export type IntersectionLocation = Pick<Intersection, 'id' | 'name' | 'city_id' | 'latitude' | 'longitude'>
+
+export interface NearbyIntersection extends IntersectionLocation {
+  distance_m: number
+}
+
 export interface SimulationMetrics {
   simulation_time: number
   total_vehicles: number
@@ -57,3 +63,18 @@ export interface SimulationMetrics {
   congestion_score: number
   vehicles_per_minute: number
 }
+
+export interface SceneGeometry {
+  intersection: Intersection
+  lanes: Lane[]
+  signals: { id: number; name: string; green_duration: number; yellow_duration: number; red_duration: number }[]
+}
+
+export interface Scene {
+  intersection_id: number
+  version: number
+  geometry_key: string
+  geometry: SceneGeometry | null
+  vehicles: { fields: string[]; rows: unknown[][] }
+  metrics: SimulationMetrics
+}
@@ -1,5 +1,5 @@
 import axios from 'axios'
-import { City, Intersection, Vehicle, SimulationMetrics } from '../types'
+import { City, Intersection, IntersectionLocation, NearbyIntersection, Vehicle, SimulationMetrics, Scene } from '../types'
 
 // Determine API base URL
 const getApiBaseUrl = (): string => {
@@ -57,6 +57,10 @@ export const intersectionsAPI = {
   create: (data: Partial<Intersection>) => api.post<Intersection>('/intersections', data),
   update: (id: number, data: Partial<Intersection>) => api.put<Intersection>(`/intersections/${id}`, data),
   delete: (id: number) => api.delete(`/intersections/${id}`),
+  getWithin: (box: { min_lat: number; min_lon: number; max_lat: number; max_lon: number }, cityId?: number) =>
+    api.get<IntersectionLocation[]>('/intersections/within', { params: { ...box, city_id: cityId } }),
+  getNearest: (lat: number, lon: number, k = 5, maxDistanceM?: number) =>
+    api.get<NearbyIntersection[]>('/intersections/nearest', { params: { lat, lon, k, max_distance_m: maxDistanceM } }),
 }
 
 // Vehicles API
@@ -67,6 +71,58 @@ export const vehiclesAPI = {
     api.post<Vehicle>('/vehicles/inject', data),
 }
 
+// WebSocket URL for a path under the API prefix
+const getWebSocketUrl = (path: string): string => {
+  const base = API_BASE_URL || window.location.origin
+  return base.replace(/^http/, 'ws') + API_PREFIX + path
+}
+
+// Closed on purpose (1000) or refused by the server (1008, e.g. unknown intersection): reconnecting cannot help
+const FINAL_CLOSE_CODES = new Set([1000, 1008])
+const RECONNECT_BASE_MS = 1000
+const RECONNECT_MAX_MS = 30000
+
+// Delay before reconnect attempt `attempt` (0 for the first), or null to stop reconnecting.
+// Capped exponential backoff; the jittered half spreads clients dropped together (1013) apart.
+export const reconnectDelay = (closeCode: number, attempt: number): number | null => {
+  if (FINAL_CLOSE_CODES.has(closeCode)) {
+    return null
+  }
+  const ceiling = Math.min(RECONNECT_MAX_MS, RECONNECT_BASE_MS * 2 ** attempt)
+  return ceiling / 2 + Math.random() * (ceiling / 2)
+}
+
+export interface SimulationFrame {
+  type: 'tick'
+  intersection_id: number
+  metrics: SimulationMetrics
+  vehicles: Vehicle[]
+}
+
+export interface Viewport {
+  min_lat: number
+  min_lon: number
+  max_lat: number
+  max_lon: number
+  zoom: number
+  city_id?: number
+}
+
+// Vehicle deltas per intersection at high zoom, rows of totals (see fields) at low zoom
+export interface ViewportFrame {
+  type: 'viewport'
+  mode: 'vehicles' | 'aggregates'
+  visible: number
+  truncated: boolean
+  entered: [number, number, number][]
+  left: number[]
+  fields: string[]
+  updates: Array<
+    | { intersection_id: number; version: number; full: boolean; upserts: unknown[][]; removed: number[] }
+    | (number | boolean)[]
+  >
+}
+
 // Simulation API
 export const simulationAPI = {
   start: (intersectionId: number, duration: number = 300, speedFactor: number = 1.0) =>
@@ -74,7 +130,30 @@ export const simulationAPI = {
   stop: (intersectionId: number) => api.post(`/simulation/stop/${intersectionId}`),
   optimize: (intersectionId: number) => api.post(`/simulation/optimize/${intersectionId}`),
   getMetrics: (intersectionId: number) => api.get<SimulationMetrics>(`/simulation/metrics/${intersectionId}`),
+  getScene: (intersectionId: number, geometryKey?: string) =>
+    api.get<Scene>(`/simulation/scene/${intersectionId}`, { params: { geometry_key: geometryKey } }),
   step: (intersectionId: number, dt?: number) => api.post(`/simulation/step/${intersectionId}`, { dt }),
+  stream: (intersectionId: number, onFrame: (frame: SimulationFrame) => void): WebSocket => {
+    const socket = new WebSocket(getWebSocketUrl(`/simulation/ws/${intersectionId}`))
+    socket.onmessage = (event) => onFrame(JSON.parse(event.data))
+    return socket
+  },
+  // Send a new viewport on the returned socket whenever the map moves
+  streamViewport: (viewport: Viewport, onFrame: (frame: ViewportFrame) => void): WebSocket => {
+    const socket = new WebSocket(getWebSocketUrl('/simulation/ws/viewport'))
+    socket.onopen = () => socket.send(JSON.stringify(viewport))
+    socket.onmessage = (event) => {
+      const message = JSON.parse(event.data)
+      if (message.type === 'viewport') onFrame(message)
+    }
+    return socket
+  },
 }
 
+// Expand positional vehicle rows into objects
+export const sceneVehicles = (scene: Scene): Vehicle[] =>
+  scene.vehicles.rows.map(
+    (row) => Object.fromEntries(scene.vehicles.fields.map((field, i) => [field, row[i]])) as unknown as Vehicle
+  )
+
 export default api
@@ -30,8 +30,8 @@ if [ ! -f .env ]; then
 fi
 
 # Initialize database
-echo "🗄️ Initializing database..."
-python -c "from app.database import init_db; init_db()"
+echo "🗄️ Applying database migrations..."
+alembic upgrade head
 
 # Seed database
 echo "🌱 Seeding database with sample data..."